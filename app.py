@@ -1,21 +1,11 @@
 import sys
-import pysqlite3
-sys.modules["sqlite3"] = pysqlite3
 import os
 import streamlit as st
 import warnings
 from datetime import datetime
 from dotenv import load_dotenv
 import yaml
-import json
-from openai import OpenAI
-from crew import FinancialCrew
-import openai
-from crewai import Crew, Process
-import re
-import yfinance as yf
-from tools.macroeconom_analysis import MacroeconomicTool
-import pydantic as pd
+from key_validation import get_key_validator, looks_like_openai_key
 
 st.set_page_config(page_title="Financial Chatbot", page_icon="💬", layout="wide")
 warnings.filterwarnings("ignore")
@@ -29,13 +19,19 @@ def load_agent_configs(config_path="./config/agents.yaml"):
         return None
 
 def is_valid_openai_key(api_key: str) -> bool:
+    validator = get_key_validator()
     try:
-        client = openai.OpenAI(api_key=api_key)
-        _ = client.models.list()
-        return True
+        return validator.submit(api_key).result()
     except Exception as e:
-        print("[API KEY INVALID]", str(e))
+        print("[API KEY CHECK FAILED]", str(e))
         return False
+    finally:
+        print("[Key Validation]", validator.stats())
+
+def prefetch_key_validation():
+    # Validasi dimulai begitu key diisi, sehingga biasanya sudah selesai saat tombol ditekan
+    if looks_like_openai_key(st.session_state.api_key_input):
+        get_key_validator().submit(st.session_state.api_key_input)
 
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
@@ -44,9 +40,12 @@ if "api_key" not in st.session_state:
 if not st.session_state.authenticated:
     st.title("💬 Financial Assistant")
     st.warning("We don't save any of your API key. It is only saved in current session", icon="⚠️")
-    st.session_state.api_key = st.text_input("API Key", type="password")
+    st.session_state.api_key = st.text_input("API Key", type="password", key="api_key_input",
+                                             on_change=prefetch_key_validation)
     if st.button("Continue"):
-        if st.session_state.api_key.startswith("sk-") and len(st.session_state.api_key) > 20 and is_valid_openai_key(st.session_state.api_key):
+        with st.spinner("Checking your API key..."):
+            valid = looks_like_openai_key(st.session_state.api_key) and is_valid_openai_key(st.session_state.api_key)
+        if valid:
             st.session_state.authenticated = True
             os.environ["OPENAI_API_KEY"] = st.session_state.api_key
             st.success("Your API Key is valid. Redirecting to main page...")
@@ -55,35 +54,12 @@ if not st.session_state.authenticated:
             st.error("Your API key is not valid. input OPEN API key with 'sk-'.")
     st.stop()
 
-class GenericChatAgent:
-    def __init__(self, agent_config, api_key=None, model="gpt-3.5-turbo"):
-        self.agent_config = agent_config
-        self.api_key = api_key
-        self.model = model
-        self.system_prompt = f"Role: {agent_config.get('role', '')}\nGoal: {agent_config.get('goal', '')}\nBackstory: {agent_config.get('backstory', '')}\nInstructions: {agent_config.get('prompt', '')}"
-        self.history = [{"role": "system", "content": self.system_prompt}]
-
-    def query(self, user_prompt):
-        if not user_prompt:
-            return "Ask something..."
-        client = OpenAI(api_key=self.api_key)
-        self.history.append({"role": "user", "content": user_prompt})
-        try:
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=self.history,
-            )
-            reply = response.choices[0].message.content
-        except Exception as e:
-            reply = f"Error: {str(e)}"
-        self.history.append({"role": "assistant", "content": reply})
-        return reply
-
-def initialize_agent(agent_name, agent_configs, api_key, model):
-    if agent_configs and agent_name in agent_configs:
-        agent_config = agent_configs[agent_name]
-        return GenericChatAgent(agent_config, api_key, model=model)
-    return None
+# Stack agent (pipeline, crewai lewat crew.py) baru diimport setelah login, supaya halaman login
+# tampil tanpa menunggu import berat
+import pysqlite3
+sys.modules["sqlite3"] = pysqlite3
+from pipeline import ChatSession, stream_user_query
+import tracing
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -99,284 +75,75 @@ configs = st.session_state.agent_configs
 
 if "llm_model" not in st.session_state:
     st.session_state.llm_model = "gpt-3.5-turbo"   # atau model lain, misal "gpt-4", "gpt-3.5-turbo", dst
-if "intent_router_agent" not in st.session_state:
-    st.session_state.intent_router_agent = initialize_agent("intent_router", configs, api_key, model=st.session_state.llm_model)
-if "fundamental_agent" not in st.session_state:
-    st.session_state.fundamental_agent = initialize_agent("fundamental", configs, api_key,  model=st.session_state.llm_model)
-if "macro_agent" not in st.session_state:
-    st.session_state.macro_agent = initialize_agent("macro", configs, api_key,  model=st.session_state.llm_model)
-if "summarizer_agent" not in st.session_state:
-    st.session_state.summarizer_agent = initialize_agent("summarizer", configs, api_key, model=st.session_state.llm_model)
-if "main_conversational_agent" not in st.session_state:
-    st.session_state.main_conversational_agent = initialize_agent("conversational_agent", configs, api_key,  model=st.session_state.llm_model)
+if "chat_session" not in st.session_state:
+    st.session_state.chat_session = ChatSession(configs, api_key, model=st.session_state.llm_model)
 
 
-def get_crew():
+@st.cache_resource(max_entries=32)
+def get_crew(api_key):
+    # Dibuat sekali per API key per proses; agent/task/crew di dalamnya dipakai ulang lintas rerun
+    from crew import FinancialCrew
     return FinancialCrew(api_key=api_key)
-crew = get_crew()
-
-def is_valid_ticker(company_ticker):
-    try:
-        ticker = yf.Ticker(company_ticker)
-        inf = ticker.info
-        price_data = ticker.history(period="1d")
-        if (
-            inf is None
-            or not isinstance(inf, dict)
-            or "shortName" not in inf
-            or inf.get("regularMarketPrice") is None
-            or price_data.empty
-        ):
-            return False
-        return True
-    except Exception as e:
-        print(f"[Ticker Validation Exception] {e}")
-        return False
-
-def is_valid_company(input_text):
-    try:
-        info = yf.Ticker(input_text).info
-        return info is not None and "country" in info and info["country"] is not None
-    except Exception:
-        return False
-def is_valid_country(country_input):
-    macro_tool = MacroeconomicTool()
-    code = macro_tool.get_country_code(country_input)
-    return code is not None
-
-def is_valid_macro_input(input_text):
-    return is_valid_country(input_text) or is_valid_company(input_text)
-
-def find_latest_quarter(ticker):
-    stock = yf.Ticker(ticker)
-    qfin = stock.quarterly_financials
-    if qfin.empty:
-        return None, None
-    latest = max(qfin.columns)
-    year = latest.year
-    quarter = (latest.month - 1) // 3 + 1
-    return year, quarter
-
-def quarter_exists(ticker, year, quarter):
-    stock = yf.Ticker(ticker)
-    qfin = stock.quarterly_financials
-    if qfin.empty:
-        return False
-    for col in qfin.columns:
-        if col.year == int(year) and ((col.month - 1) // 3 + 1) == int(quarter):
-            return True
-    return False
-
-    
-def run_agent_by_intent(intent_data, crew: FinancialCrew, user_input: str):
-    entities = intent_data.get("entities", {})
-    company_ticker = (
-        entities.get("company_ticker")
-        or entities.get("ticker")
-        or entities.get("ticker_symbol")
-        or entities.get("company")
-        or entities.get("stock")
-        or entities.get("stock_symbol")
-    )
-    intent = intent_data.get("intent", "").lower()
-    print("[Intent]", intent)
-    print("[entities]", entities)
-    print("[Ticker]", company_ticker)
-    print("[Country]", entities.get("country"))
-    year    = intent_data.get("entities", {}).get("year")
-    quarter = intent_data.get("entities", {}).get("quarter")
-    
-    if intent == "fundamental_analysis" and company_ticker:
-        print(f'[Year and Quarter] {year} and {quarter}')
-        if not is_valid_ticker(company_ticker):
-            return 'Ticker not found! please input the correct ticker name (Read Disclaimer).'
-        print(f"[Dispatcher] Running fundamental analysis for {company_ticker}")
-
-        # --- Tambahan fungsi validasi quarter dan year ---
-        if year is None or quarter is None or not quarter_exists(company_ticker, year, quarter):
-            print("[INFO] Using latest available quarter for analysis")
-            year, quarter = find_latest_quarter(company_ticker)
-            if year is None or quarter is None:
-                return 'No quarterly data available for this ticker.'
-
-        fundamental_crew = Crew(
-            agents=[crew.fundamental()],
-            tasks=[crew.fundamental_task()],
-            process=Process.sequential,
-            verbose=True,
-        )
-        print("[Fundamental Input Given]", company_ticker)
-        print("[TASK DESCRIPTION]", crew.fundamental_task().description)
-
-        kickoff_inputs = {
-            "company_ticker": company_ticker,
-            "year": int(year),
-            "quarter": int(quarter)
-        }
-        result = fundamental_crew.kickoff(inputs=kickoff_inputs)
-        return result
-
-    elif intent == "technical_analysis":
-        start_date = entities.get("start_date")
-        end_date = entities.get("end_date")
-        period = entities.get("period") or intent_data.get("period")
-
-        if not is_valid_ticker(company_ticker):
-            return 'Ticker not found! please input the correct ticker name (Read Disclaimer).'
-        if not company_ticker:
-            return "Please specify the stock ticker you want technical analysis for. Example: 'Technical analysis AAPL for 3 months.'"
-
-        if not (start_date and end_date):
-            start_date = None
-            end_date = None
-
-        technical_crew = Crew(
-            agents=[crew.technical_agent()],
-            tasks=[crew.technical_task()],
-            process=Process.sequential,
-            verbose=True,
-        )
-
-        inputs = {"stock_symbol": company_ticker}
-
-        if start_date and end_date:
-            inputs["start_date"] = start_date
-            inputs["end_date"] = end_date
-            inputs["period"] = ""
-        else:
-            inputs["period"] = period or "1y"
-            inputs["start_date"] = ""
-            inputs["end_date"] = ""
-
-        print(f"[Dispatcher] Running technical analysis for {company_ticker} with inputs: {inputs}")
-
-        result = technical_crew.kickoff(inputs=inputs)
-
-        return result
-
-
-    elif intent == "macro_outlook":
-        macro_input = entities.get("country") or company_ticker or user_input
 
-        if isinstance(macro_input, dict):
-            macro_input = macro_input.get("description", "")
-        
-        print("[Normalized Macro Input]", macro_input)
-
-        valid = is_valid_macro_input(macro_input)
-        print("is_valid_macro_input:", valid)
-
-        if not valid:
-            return "Country or ticker not found! please input the correct ticker or country name (Read Descalimer)."
-        else:
-            print(f"[Dispatcher] Running macroeconomic analysis with input: {macro_input}")
-            macro_crew = Crew(
-                agents=[crew.macro()],
-                tasks=[crew.macro_task()],
-                process=Process.sequential,
-                verbose=True,
-            )
-            print("[Macro Input Given]", macro_input)
-            print("[TASK DESCRIPTION]", crew.macro_task().description)
-            if isinstance(macro_input, dict):
-                macro_input = macro_input.get("description", "") or ""
-            macro_input = str(macro_input).strip()
-            result = macro_crew.kickoff(inputs={'input' : macro_input})
-            return result
-
-    
-    elif intent == "conversation":
-        print("[Dispatcher] Running conversational agent.")
-        return st.session_state.main_conversational_agent.query(user_input)
-
-    return "Sorry, I couldn't understand your request or the input was missing."
-
-def is_error_message(report):
-    if not isinstance(report, str):
-        return False
-    msg = report.lower()
-    return any([
-        "couldn't understand" in msg,
-        "please specify the stock ticker" in msg,
-        "sorry" in msg,
-        "error" in msg,
-        "not found" in msg,
-        "no data available" in msg,
-        "missing" in msg,
-        "Please check your input" in msg
-    ])
-
-def handle_user_query(crew, prompt, chat_history):
-    intent_output = st.session_state.intent_router_agent.query(prompt)
-    print("=== INTENT DETECTED ===")
-    print(intent_output)
-
-    try:
-        intent_data = json.loads(intent_output)
-        intents_list = []
-        if "intents" in intent_data and isinstance(intent_data["intents"], list):
-            intents_list = intent_data["intents"]
-        elif "intent" in intent_data:
-            intents_list = [intent_data]
-        else:
-            raise ValueError("Invalid format: Missing 'intent' or 'intents'.")
-
-        if not intents_list:
-            raise ValueError("No intents detected.")
-
-    except Exception as e:
-        print("[Intent Parsing Error]", str(e))
-        return "Sorry, I couldn’t understand your request.", chat_history
-
-    st.session_state.last_intent_data = intents_list[-1] 
-
-    allowed_intents = ["fundamental_analysis", "technical_analysis", "macro_outlook"]
-
-    reports = []
-    for intent_entry in intents_list:
-        intent_name = intent_entry.get("intent", "").lower()
-        if intent_name not in allowed_intents:
-            print(f"[Skipping unsupported intent] {intent_name}")
-            continue
-
-        report = run_agent_by_intent(intent_entry, crew, prompt)
-
-        if report and not is_error_message(report):
-            if hasattr(report, "content"):
-                report_text = report.content
-            elif hasattr(report, "text"):
-                report_text = report.text
-            else:
-                report_text = str(report)
-            reports.append(report_text)
-        else:
-            print(f"[Error or empty report] for intent {intent_name}: {report}")
-
-    if not reports:
-        return (
-            "Hmm, I couldn't find any relevant information based on your input. "
-            "Could you please double-check the ticker or rephrase your question?"
-            , chat_history
-        )
-
-    combined_report = "\n\n---\n\n".join(reports)
-
-    summary_prompt = f"""
-    Here are the combined results for your request:
-    {combined_report}
+def clean_llm_markdown(text):
+    return text.replace("\\n", "\n").replace("\\|", "|").replace("\\\\", "\\")
 
-    User request was: "{prompt}"
+PROGRESS_LABELS = {
+    "routed": "Detected: {text}",
+    "intent_started": "Running {intent}...",
+    "step": "{intent}: {text}",
+    "intent_failed": "{intent} failed: {text}",
+    "summary_started": "Summarizing...",
+}
 
-    Please provide a concise summary highlighting key points from each analysis.
+def stream_reply(crew, prompt):
     """
-
-    summary = st.session_state.summarizer_agent.query(summary_prompt)
-    print(f"summary result {summary}")
-
-    return summary, chat_history + [{"role": "assistant", "content": summary}]
-
-def clean_llm_markdown(text):
-    return text.replace("\\n", "\n").replace("\\|", "|").replace("\\\\", "\\")
+    Renders the turn while it runs: progress in a status box, finished reports as soon as each
+    intent completes, then the summary token by token. Returns (response, updated_history).
+    """
+    status = st.status("Thinking...", expanded=False)
+    body = st.empty()
+    reports, summary, result = [], "", None
+    for event in stream_user_query(st.session_state.chat_session, crew, prompt, st.session_state.chat_history):
+        if event.kind == "done":
+            result = event.data
+        elif event.kind == "token":
+            summary += event.text
+            body.markdown(clean_llm_markdown(summary) + "▌")
+        elif event.kind in ("intent_done", "intent_cached"):
+            reports.append(event.text)
+            status.write(f"{event.intent}: finished")
+            if not summary:
+                # Laporan parsial tampil sampai token ringkasan pertama datang
+                body.markdown(clean_llm_markdown("\n\n---\n\n".join(reports)))
+        elif event.kind in PROGRESS_LABELS:
+            label = PROGRESS_LABELS[event.kind].format(intent=event.intent or "", text=event.text)
+            status.write(label)
+            if event.kind != "step":
+                status.update(label=label)
+    status.update(label="Done", state="complete")
+    response, updated_history = result
+    body.markdown(clean_llm_markdown(response))
+    return response, updated_history
+
+def render_trace_panel(trace_id):
+    """Sidebar debug panel (TRACE_ENABLED=1): span tree of the last turn with durations and attributes."""
+    records = tracing.get_tracer().trace(trace_id) if trace_id else []
+    with st.sidebar.expander("🔎 Trace of the last turn", expanded=False):
+        if not records:
+            st.caption("No trace yet.")
+            return
+        rows = [
+            {
+                "span": " " * depth + record["name"],
+                "ms": record["durationMs"],
+                "status": record["status"]["code"],
+                "attributes": ", ".join(f"{k}={v}" for k, v in record["attributes"].items()),
+            }
+            for depth, record in tracing.span_tree(records)
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"trace {trace_id} · exported to {tracing.get_tracer().path}")
 
 st.title("💬 Stock Assistant Chatbot")
 with st.expander("ℹ️Disclaimerℹ️"):
@@ -426,17 +193,20 @@ if prompt:
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response, updated_history = handle_user_query(crew, prompt, st.session_state.chat_history)
-            st.session_state.chat_history = updated_history
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.markdown(clean_llm_markdown(response))
-
-            if hasattr(st.session_state, "last_intent_data"):
-                intent = st.session_state.last_intent_data.get("intent")
-                entities = st.session_state.last_intent_data.get("entities", {})
-                if intent == "technical_analysis":
-                    ticker = entities.get("ticker")
-                    start_date = entities.get("start_date")
-                    end_date = entities.get("end_date")
-                    period = entities.get("period") or "1y"
+        with st.spinner("Loading agents..."):
+            crew = get_crew(api_key)
+        response, updated_history = stream_reply(crew, prompt)
+        st.session_state.chat_history = updated_history
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        last_intent_data = st.session_state.chat_session.last_intent_data
+        if last_intent_data:
+            intent = last_intent_data.get("intent")
+            entities = last_intent_data.get("entities", {})
+            if intent == "technical_analysis":
+                ticker = entities.get("ticker")
+                start_date = entities.get("start_date")
+                end_date = entities.get("end_date")
+                period = entities.get("period") or "1y"
+
+if tracing.enabled():
+    render_trace_panel(st.session_state.chat_session.last_trace_id)
@@ -0,0 +1,121 @@
+"""
+Country lookup: the previous DataFrame-per-call MacroeconomicTool.get_country_code versus the
+precomputed COUNTRY_INDEX.
+
+    python -m benchmarks.bench_country_lookup --rounds 200
+
+Also prints inputs where the two disagree (the old substring scan matched "US" to Australia)
+and checks the cases that must not resolve to a country: near-miss spellings without fuzzy=True
+and bare two-letter codes that are also tickers (a macro request for BA is about Boeing, not Bosnia).
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from tools.countries import COUNTRY_INDEX, COUNTRY_LIST, get_country_code
+from tools.yf_cache import YahooDataCache, set_yahoo_cache
+
+INPUTS = [
+    "Indonesia", "indonesia ", "United States", "US", "USA", "u.s.", "UK", "Britain", "Korea",
+    "South Korea", "Germany", "japan", "China", "india", "Brazil", "Russia", "UAE", "Viet Nam",
+    "New Zealand", "zealand", "indo", "Germny", "Atlantis", "(", "EUR+",
+]
+
+
+# input -> kode yang diharapkan dari get_country_code (default, tanpa fuzzy)
+EXPECTED = {
+    "Indonesia": "ID", "US": "US", "UK": "UK", "EU": "EU", "DEU": "DE", "ESP": "ES", "Viet Nam": "VN",
+    "Span": None, "Germny": None, "BA": None, "KR": None, "DE": None, "MA": None, "IT": None, "ES": None,
+    "DO": None,
+}
+# Ticker -> negara dari Yahoo info, untuk jalur ticker di MacroeconomicTool.resolve_country_code
+TICKER_COUNTRIES = {"BA": "United States", "MA": "United States", "TM": "Japan"}
+
+
+class FixtureYahooCache(YahooDataCache):
+    def _fetch(self, symbol, field, **kwargs):
+        return {"country": TICKER_COUNTRIES[symbol]} if field == "info" and symbol in TICKER_COUNTRIES else {}
+
+
+def check_cases() -> list:
+    problems = [f"get_country_code({text!r}) = {get_country_code(text)!r}, expected {code!r}"
+                for text, code in EXPECTED.items() if get_country_code(text) != code]
+    if get_country_code("Germny", fuzzy=True) != "DE":
+        problems.append("fuzzy=True no longer corrects 'Germny'")
+
+    from tools.macroeconom_analysis import MacroeconomicTool
+    set_yahoo_cache(FixtureYahooCache())
+    tool = MacroeconomicTool()
+    for ticker, country in TICKER_COUNTRIES.items():
+        expected = get_country_code(country)
+        if tool.resolve_country_code(ticker) != expected:
+            problems.append(f"macro input {ticker!r} resolved to {tool.resolve_country_code(ticker)!r}, "
+                            f"expected {expected!r} ({country})")
+    return problems
+
+
+def legacy_country_code(country_name: str):
+    """Copy of the previous implementation, kept for comparison."""
+    df = pd.DataFrame(COUNTRY_LIST, columns=['name', 'code'])
+    country_name_clean = country_name.strip().lower()
+
+    match = df[df['name'].str.lower() == country_name_clean]
+    if not match.empty:
+        return match.iloc[0]['code']
+
+    partial = df[df['name'].str.lower().str.contains(country_name_clean)]
+    if not partial.empty:
+        return partial.iloc[0]['code']
+    return None
+
+
+def safe_legacy(text):
+    try:
+        return legacy_country_code(text)
+    except Exception as e:
+        return f"error: {type(e).__name__}"
+
+
+def timed(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in INPUTS:
+            fn(text)
+    return (time.perf_counter() - started) / (rounds * len(INPUTS))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy = timed(safe_legacy, max(1, args.rounds // 20))
+    exact = timed(lambda text: COUNTRY_INDEX.resolve(text), args.rounds)
+    fuzzy = timed(lambda text: get_country_code(text, fuzzy=True), args.rounds)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        COUNTRY_INDEX.resolve_many(INPUTS)
+    batch = (time.perf_counter() - started) / (args.rounds * len(INPUTS))
+
+    print(f"legacy DataFrame scan : {legacy * 1e6:9.1f} us/lookup")
+    print(f"index (exact+prefix)  : {exact * 1e6:9.2f} us/lookup  ({legacy / exact:,.0f}x)")
+    print(f"index with fuzzy      : {fuzzy * 1e6:9.2f} us/lookup  ({legacy / fuzzy:,.0f}x)")
+    print(f"resolve_many          : {batch * 1e6:9.2f} us/lookup")
+
+    print("\ninput                  legacy        index")
+    for text in INPUTS:
+        old, new = safe_legacy(text), get_country_code(text)
+        if old != new:
+            print(f"{text!r:22s} {str(old):13s} {new}")
+
+    problems = check_cases()
+    for problem in problems:
+        print(f"CHECK FAILED: {problem}")
+    if problems:
+        raise SystemExit(1)
+    print(f"\n{len(EXPECTED) + len(TICKER_COUNTRIES) + 1} lookup cases: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-request construction overhead of FinancialCrew: building agents, tools, tasks and a crew
+on every request (previous behaviour) versus lending a prebuilt crew from the pool.
+
+    python -m benchmarks.bench_crew_startup --requests 50
+
+No LLM call is made; only object construction and input interpolation are timed. Before
+timing, two overlapping leases per intent are bound to different tickers and each task
+description is checked for its own ticker (pooled crews must not keep an earlier request's text).
+"""
+import argparse
+import os
+import time
+
+from crewai import Agent, Crew, Task, Process
+
+from crew import FinancialCrew, INTENT_CREWS
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+
+# Input kedua untuk pemeriksaan dua lease yang tumpang tindih
+OTHER_INPUTS = {
+    "fundamental_analysis": {"company_ticker": "MSFT", "year": 2024, "quarter": 2},
+    "technical_analysis": {"stock_symbol": "TSLA", "period": "1y", "start_date": "", "end_date": ""},
+    "macro_outlook": {"input": "Japan"},
+}
+SAMPLE_INPUTS = {
+    "fundamental_analysis": {"company_ticker": "AAPL", "year": 2024, "quarter": 2},
+    "technical_analysis": {"stock_symbol": "NVDA", "period": "1y", "start_date": "", "end_date": ""},
+    "macro_outlook": {"input": "Indonesia"},
+}
+CONFIG_KEYS = {"fundamental": "fundamental", "technical_agent": "technical", "macro": "macro"}
+
+
+def build_per_request(crew: FinancialCrew, intent: str) -> Crew:
+    """What the pipeline did before: fresh agent + tool for the Crew and again for the task."""
+    agent_name, task_name = INTENT_CREWS[intent]
+    tool = crew._built[agent_name].tools[0].__class__
+
+    def agent():
+        return Agent(config=crew.agents_config[CONFIG_KEYS[agent_name]], tools=[tool()],
+                     verbose=True, allow_delegation=False)
+
+    def task():
+        return Task(config=crew.tasks_config[task_name], agent=agent())
+
+    built = Crew(agents=[agent()], tasks=[task()], process=Process.sequential, verbose=True)
+    task().description  # deskripsi task dicetak lewat pemanggilan task kedua
+    return built
+
+
+def bind_inputs(crew_obj: Crew, inputs: dict):
+    # Bagian kickoff yang bergantung pada request, tanpa memanggil LLM
+    crew_obj._interpolate_inputs(inputs)
+
+
+def subject_of(inputs: dict) -> str:
+    return str(inputs.get("company_ticker") or inputs.get("stock_symbol") or inputs.get("input"))
+
+
+def check_overlapping_leases(crew: FinancialCrew) -> list:
+    """Two leases of one intent held at once, bound after the template already ran once."""
+    problems = []
+    for intent, inputs in SAMPLE_INPUTS.items():
+        other = OTHER_INPUTS[intent]
+        with crew.acquire(intent) as first:
+            bind_inputs(first, other)
+        # Lease kedua dibuat saat template masih berisi `other`; ia harus tetap bisa diisi `inputs`
+        with crew.acquire(intent) as first, crew.acquire(intent) as second:
+            bind_inputs(first, other)
+            bind_inputs(second, inputs)
+            for crew_obj, bound, wrong in ((first, other, inputs), (second, inputs, other)):
+                description = crew_obj.tasks[0].description
+                if subject_of(bound) not in description or subject_of(wrong) in description:
+                    problems.append(f"{intent}: lease bound to {subject_of(bound)} describes "
+                                    f"{description.strip().splitlines()[0][:80]!r}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    crew = FinancialCrew(api_key=None)
+    for intent in INTENT_CREWS:
+        crew.intent_crew(intent)
+    startup = time.perf_counter() - started
+    print(f"one-time build (YAML + agents + tasks + crews): {startup * 1000:.1f} ms")
+
+    problems = check_overlapping_leases(crew)
+    for problem in problems:
+        print(f"OVERLAP CHECK FAILED: {problem}")
+    if problems:
+        raise SystemExit(1)
+    print("overlapping leases keep their own inputs: ok")
+
+    for intent, inputs in SAMPLE_INPUTS.items():
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            bind_inputs(build_per_request(crew, intent), inputs)
+        before = (time.perf_counter() - started) / args.requests
+
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            with crew.acquire(intent) as crew_obj:
+                bind_inputs(crew_obj, inputs)
+        after = (time.perf_counter() - started) / args.requests
+
+        print(f"{intent:22s} per request: before {before * 1000:8.2f} ms | after {after * 1000:6.3f} ms "
+              f"| {before / after:6.1f}x")
+    print(f"crew copies made for concurrency: {crew.crew_copies}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Offline end-to-end benchmark of handle_user_query with the real FinancialCrew and tools.
+
+    python -m benchmarks.bench_end_to_end --repeats 5 --json results.json
+    python -m benchmarks.bench_end_to_end --compare results.json          # after a change
+    python -m benchmarks.bench_end_to_end --record --fixtures /tmp/live   # refresh from live services
+
+Upstreams are replaced by benchmarks.replay (yfinance, econdb, Yahoo HTML) over the fixtures in
+benchmarks/fixtures/e2e, and OpenAI by benchmarks.stub_openai. The stub plays the agents: crew
+agents call their tool once (native tool calling) and answer with a report built from the tool
+output, the LLM router answers with the rule router's reading, everything else gets a fixed
+paragraph. Each scenario runs in its own process so peak RSS and caches do not leak between them;
+every repeat starts from empty caches. Reported per scenario: p50/p95 turn latency, upstream calls
+and LLM requests per run, prompt tokens per run and peak RSS.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+SCENARIOS = {
+    "single_intent": [
+        ["Technical analysis NVDA for 6mo"],
+        ["Fundamental analysis AAPL"],
+        ["What's the macro outlook for United States?"],
+    ],
+    "multi_intent": [
+        ["Technical and fundamental analysis for MSFT"],
+        ["Technical analysis of NVDA and AAPL plus the macro outlook for United States"],
+    ],
+    "international": [
+        ["Technical analysis BBCA.JK for 3mo"],
+        ["Fundamental analysis 7203.T"],
+        ["Macro outlook for Japan and Indonesia"],
+        ["Technical analysis VOD.L"],
+    ],
+    "long_session": [[
+        "Technical analysis NVDA for 6mo",
+        "What does RSI mean?",
+        "Fundamental analysis NVDA",
+        "Technical analysis NVDA for 6mo",
+        "Is NVDA a buy right now?",
+        "Technical analysis AAPL",
+        "Macro outlook for United States",
+        "Thanks! How about fundamentals of BBRI.JK?",
+        "Fundamental analysis AAPL",
+        "Technical and fundamental analysis for MSFT",
+        "What's the macro outlook for Indonesia?",
+        "Technical analysis NVDA for 6mo",
+    ]],
+}
+REPORT_WORDS = 250
+# Opsi yang hanya berlaku di proses induk, tidak diteruskan ke worker
+PARENT_ONLY = {"--json", "--compare", "--scenarios"}
+
+
+class StubAgents:
+    """Decides what the stub OpenAI server answers, from the request alone."""
+    TECHNICAL = r"recommendation \(BUY or SELL\) for (\S+) based on"
+    PERIOD = r"specified period \((\S*) to (\S*), or (\S*) if not provided\)"
+    FUNDAMENTAL = r'identified by the ticker "([^"]+)"'
+    QUARTER = r"quarter (\d) of year (\d{4})"
+    MACRO = r'using the input "([^"]+)"'
+
+    def __init__(self, reply_tokens: int):
+        self.reply_tokens = reply_tokens
+        self.kinds = {}
+        self._lock = threading.Lock()
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.kinds[kind] = self.kinds.get(kind, 0) + 1
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self.kinds)
+
+    @staticmethod
+    def _task_text(messages: list) -> str:
+        return "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "user")
+
+    def tool_call(self, request: dict):
+        messages = request.get("messages", [])
+        if messages and messages[-1].get("role") == "tool":
+            return None
+        names = [tool["function"]["name"] for tool in request["tools"]]
+        text = self._task_text(messages)
+
+        def tool(fragment):
+            return next((name for name in names if fragment in name.lower().replace("_", "")), None)
+
+        match = re.search(self.TECHNICAL, text)
+        if match and tool("technical"):
+            start, end, period = (re.search(self.PERIOD, text) or re.match("()()()", "")).groups()
+            arguments = {"stock_symbol": match.group(1), "period": period or "1y"}
+            arguments.update({k: v for k, v in (("start_date", start), ("end_date", end)) if v})
+            self._count("agent_tool_call")
+            return tool("technical"), arguments
+        match = re.search(self.FUNDAMENTAL, text)
+        if match and tool("quarterly"):
+            quarter = re.search(self.QUARTER, text)
+            self._count("agent_tool_call")
+            return tool("quarterly"), {"ticker": match.group(1), "year": int(quarter.group(2)),
+                                       "quarter": int(quarter.group(1))}
+        match = re.search(self.MACRO, text)
+        if match and tool("macro"):
+            self._count("agent_tool_call")
+            return tool("macro"), {"description": match.group(1)}
+        return None
+
+    def reply(self, messages: list) -> str:
+        from intent_rules import route_by_rules
+        system = str(messages[0].get("content") or "") if messages else ""
+        if system.startswith("Role: Intent Classifier"):
+            self._count("router")
+            output = route_by_rules(str(messages[-1].get("content") or "")).as_router_output()
+            if not output["intents"]:
+                output = {"intents": [{"intent": "conversation", "entities": {}}]}
+            return json.dumps(output)
+        if messages and messages[-1].get("role") == "tool":
+            self._count("agent_report")
+            data = " ".join(str(messages[-1].get("content") or "").split()[:REPORT_WORDS])
+            return f"Report. Data used: {data} Recommendation: HOLD. " + " ".join(
+                f"note{i}" for i in range(self.reply_tokens // 2))
+        self._count("chat")
+        return " ".join(f"word{i}" for i in range(self.reply_tokens))
+
+
+def percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else float("nan")
+
+
+def git_revision() -> dict:
+    def run(*cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": run("git", "rev-parse", "--short", "HEAD"),
+            "dirty": bool(run("git", "status", "--porcelain", "--untracked-files=no"))}
+
+
+def offline_stack(agents: StubAgents, llm_latency: float, token_delay: float):
+    """
+    Starts the stub OpenAI server playing `agents` and builds a FinancialCrew against it. The
+    environment for crewai must be set before crew is first imported. Returns (stub, crew, agent_configs).
+    """
+    from benchmarks.stub_openai import StubOpenAIServer
+    from chat_history import count_tokens
+
+    stub = StubOpenAIServer(first_token_delay=llm_latency, token_delay=token_delay,
+                            reply=agents.reply, tool_call=agents.tool_call, token_counter=count_tokens).start()
+    os.environ.update({"OPENAI_API_KEY": "sk-stub", "OPENAI_BASE_URL": stub.url,
+                       "CREWAI_DISABLE_TELEMETRY": "true", "OTEL_SDK_DISABLED": "true"})
+
+    import yaml
+    from crew import FinancialCrew
+    from llm_clients import OpenAIClientRegistry, set_client_registry
+
+    set_client_registry(OpenAIClientRegistry(base_url=stub.url))
+    with open("config/agents.yaml", encoding="utf-8") as f:
+        agent_configs = yaml.safe_load(f)
+    return stub, FinancialCrew(api_key="sk-stub"), agent_configs
+
+
+def run_worker(args) -> dict:
+    """One scenario, in this process."""
+    agents = StubAgents(args.reply_tokens)
+    stub, crew, agent_configs = offline_stack(agents, args.llm_latency, args.llm_token_delay)
+
+    from benchmarks import replay
+    from pipeline import ChatSession, handle_user_query
+    from response_cache import MemoryTier, ResponseCache, set_response_cache
+
+    latency = {"yahoo": args.yahoo_latency, "prices": args.yahoo_latency,
+               "econdb": args.econdb_latency, "yahoo_html": args.html_latency}
+
+    latencies, runs = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for repeat in range(args.warmup + args.repeats):
+            calls = replay.install(args.fixtures, os.path.join(tmp, str(repeat)), latency, record=args.record)
+            set_response_cache(ResponseCache(tiers=[MemoryTier()]))
+            stub_before, kinds_before = dict(stub.requests), agents.counts()
+            turn_latencies = []
+            for prompts in SCENARIOS[args.worker]:
+                session = ChatSession(agent_configs, "sk-stub")
+                history = []
+                for prompt in prompts:
+                    history = history + [{"role": "user", "content": prompt}]
+                    started = time.perf_counter()
+                    _, history = handle_user_query(session, crew, prompt, history)
+                    turn_latencies.append(time.perf_counter() - started)
+            if repeat < args.warmup:
+                continue
+            latencies.extend(turn_latencies)
+            runs.append({
+                "upstream": calls.snapshot(),
+                "missing": calls.missing,
+                "llm": {k: v - kinds_before.get(k, 0) for k, v in agents.counts().items()},
+                "llm_requests": stub.requests.get("chat", 0) - stub_before.get("chat", 0),
+                "prompt_tokens": stub.requests.get("prompt_tokens", 0) - stub_before.get("prompt_tokens", 0),
+                "completion_tokens": stub.requests.get("completion_tokens", 0) - stub_before.get("completion_tokens", 0),
+            })
+    stub.stop()
+
+    def mean_counts(key):
+        names = sorted({name for run in runs for name in run[key]})
+        return {name: round(float(np.mean([run[key].get(name, 0) for run in runs])), 1) for name in names}
+
+    return {
+        "turns_per_run": len(latencies) // max(1, len(runs)),
+        "runs": len(runs),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 1),
+        "upstream_per_run": mean_counts("upstream"),
+        "llm_per_run": mean_counts("llm"),
+        "llm_requests_per_run": round(float(np.mean([run["llm_requests"] for run in runs])), 1),
+        "prompt_tokens_per_run": round(float(np.mean([run["prompt_tokens"] for run in runs])), 1),
+        "completion_tokens_per_run": round(float(np.mean([run["completion_tokens"] for run in runs])), 1),
+        # ru_maxrss dalam KB di Linux, byte di macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "missing_fixtures": sorted({item for run in runs for item in run["missing"]}),
+    }
+
+
+def run_scenario(name: str, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        path = out.name
+    try:
+        run_worker_process("benchmarks.bench_end_to_end", PARENT_ONLY, ["--worker", name, "--out", path],
+                           args.verbose, args.timeout, f"scenario {name}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(path)
+
+
+def run_worker_process(module: str, parent_only: set, extra: list, verbose: bool, timeout: float, label: str):
+    """Re-runs `module` with this process's arguments minus `parent_only` options, plus `extra`."""
+    forwarded, skip = [], False
+    for arg in sys.argv[1:]:
+        if skip:
+            skip = False
+        elif arg in parent_only:
+            skip = True
+        elif arg.split("=", 1)[0] not in parent_only:
+            forwarded.append(arg)
+    log = None if verbose else subprocess.DEVNULL
+    completed = subprocess.run([sys.executable, "-m", module, *forwarded, *extra],
+                               stdout=log, stderr=log, timeout=timeout)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{label} failed (exit {completed.returncode}); rerun with --verbose")
+
+
+def print_results(results: dict, baseline: dict = None):
+    base = (baseline or {}).get("scenarios", {})
+
+    def delta(name, key, value):
+        old = base.get(name, {}).get(key)
+        if old in (None, 0) or value is None:
+            return ""
+        return f" ({(value - old) / old:+.0%})"
+
+    print(f"{'scenario':14s} {'turns':>5s} {'p50 ms':>16s} {'p95 ms':>16s} {'upstream':>14s} {'LLM req':>12s} "
+          f"{'prompt tok':>16s} {'peak RSS MB':>16s}")
+    for name, r in results["scenarios"].items():
+        upstream = sum(r["upstream_per_run"].values())
+        r = {**r, "upstream_total": upstream}
+        print(f"{name:14s} {r['turns_per_run']:5d} "
+              f"{r['p50_ms']:8.0f}{delta(name, 'p50_ms', r['p50_ms']):>8s} "
+              f"{r['p95_ms']:8.0f}{delta(name, 'p95_ms', r['p95_ms']):>8s} "
+              f"{upstream:6.0f}{delta(name, 'upstream_total', upstream):>8s} "
+              f"{r['llm_requests_per_run']:4.0f}{delta(name, 'llm_requests_per_run', r['llm_requests_per_run']):>8s} "
+              f"{r['prompt_tokens_per_run']:8.0f}{delta(name, 'prompt_tokens_per_run', r['prompt_tokens_per_run']):>8s} "
+              f"{r['peak_rss_mb']:8.0f}{delta(name, 'peak_rss_mb', r['peak_rss_mb']):>8s}")
+    for name, r in results["scenarios"].items():
+        print(f"\n[{name}] upstream per run: {r['upstream_per_run']}")
+        print(f"[{name}] LLM per run: {r['llm_per_run']}")
+        if r["missing_fixtures"]:
+            print(f"[{name}] MISSING FIXTURES: {r['missing_fixtures']}")
+
+
+def main():
+    from benchmarks.replay import DEFAULT_FIXTURES, load_manifest
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs first (imports, crew build)")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--record", action="store_true", help="call live yfinance/econdb/Yahoo and save fixtures")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="stub delay before the first token (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.002, help="stub delay per token (s)")
+    parser.add_argument("--reply-tokens", type=int, default=150)
+    parser.add_argument("--yahoo-latency", type=float, default=0.15, help="per yfinance call (s)")
+    parser.add_argument("--econdb-latency", type=float, default=0.2, help="per econdb request (s)")
+    parser.add_argument("--html-latency", type=float, default=0.5, help="per Yahoo key-statistics page (s)")
+    parser.add_argument("--timeout", type=float, default=1800, help="per scenario (s)")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show worker output")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    if args.record:
+        args.yahoo_latency = args.econdb_latency = args.html_latency = 0.0
+    results = {
+        "meta": {
+            **git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixtures": {k: v for k, v in load_manifest(args.fixtures).items() if k in ("source", "as_of", "seed")},
+            "settings": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "verbose", "worker", "out")},
+        },
+        "scenarios": {},
+    }
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        started = time.perf_counter()
+        results["scenarios"][name] = run_scenario(name, args)
+        print(f"[{name}] done in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+    for r in results["scenarios"].values():
+        r["upstream_total"] = sum(r["upstream_per_run"].values())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"compared with {baseline['meta'].get('commit')} (settings equal: "
+              f"{baseline['meta'].get('settings') == results['meta']['settings']})")
+    meta = results["meta"]
+    print(f"commit {meta['commit']}{' (dirty)' if meta['dirty'] else ''}, fixtures {meta['fixtures']}, "
+          f"{args.repeats} runs per scenario")
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Compares tools.fundamental_batch.fundamentals_table against the previous per-quarter, per-cell
+analyze_quarter loop (one ticker at a time).
+
+Runs offline on synthetic statements with simulated fetch latency:
+    python -m benchmarks.bench_fundamental_batch --tickers 50 --quarters 8 --latency 0.05
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.fundamental_batch import fundamentals_table
+from tools.yf_cache import YahooDataCache
+
+
+def synthetic_statements(ticker_index: int, n_quarters: int, rng) -> dict:
+    dates = pd.date_range(end="2025-06-30", periods=n_quarters, freq="QE")[::-1]  # terbaru dulu, seperti yfinance
+    revenue = 1e9 * (1 + ticker_index % 7) * np.exp(np.cumsum(rng.normal(0.01, 0.05, n_quarters)))
+    net_income = revenue * rng.uniform(0.05, 0.25, n_quarters)
+    income = pd.DataFrame({
+        "Total Revenue": revenue,
+        "Gross Profit": revenue * rng.uniform(0.3, 0.6, n_quarters),
+        "Operating Income": revenue * rng.uniform(0.1, 0.3, n_quarters),
+        "Net Income": net_income,
+        "Diluted EPS": net_income / 1e9,
+    }, index=dates).T
+    assets = revenue * rng.uniform(3, 5, n_quarters)
+    balance = pd.DataFrame({
+        "Cash And Cash Equivalents": assets * 0.1,
+        "Total Debt": assets * 0.3,
+        "Net Debt": assets * 0.2,
+        "Total Current Assets": assets * 0.4,
+        "Total Current Liabilities": assets * 0.3,
+        "Total Stockholder Equity": assets * 0.45,
+        "Total Assets": assets,
+    }, index=dates).T
+    cashflow = pd.DataFrame({
+        "Free Cash Flow": net_income * 0.9,
+        "Operating Cash Flow": net_income * 1.2,
+        "Repurchase Of Capital Stock": -net_income * 0.3,
+        "Cash Dividends Paid": -net_income * 0.2,
+    }, index=dates).T
+    return {"quarterly_financials": income, "quarterly_balance_sheet": balance, "quarterly_cashflow": cashflow}
+
+
+class FixtureYahooCache(YahooDataCache):
+    def __init__(self, statements: dict, latency: float):
+        super().__init__()
+        self.statements = statements
+        self.latency = latency
+
+    def _fetch(self, symbol, field, **kwargs):
+        time.sleep(self.latency)
+        return self.statements[symbol][field]
+
+
+def legacy_analyze_quarter(q_income, q_bs, quarter_date):
+    """Copy of the previous per-cell implementation (subset: the ratios both versions report)."""
+    def get_value(df, label, date):
+        try:
+            return df.loc[label, date]
+        except Exception:
+            return None
+
+    cols = list(q_income.columns)
+    idx = cols.index(quarter_date)
+    prev_q = cols[idx + 1] if idx + 1 < len(cols) else None
+    result = {}
+    revenue = get_value(q_income, "Total Revenue", quarter_date)
+    net_income = get_value(q_income, "Net Income", quarter_date)
+    prev_revenue = get_value(q_income, "Total Revenue", prev_q) if prev_q else None
+    result["revenue_growth_vs_prev"] = ((revenue - prev_revenue) / abs(prev_revenue) * 100) if (prev_revenue and revenue) else None
+    gross_profit = get_value(q_income, "Gross Profit", quarter_date)
+    result["gross_margin"] = gross_profit / revenue * 100 if gross_profit and revenue else None
+    result["net_margin"] = net_income / revenue * 100 if net_income and revenue else None
+    current_assets = get_value(q_bs, "Total Current Assets", quarter_date)
+    current_liabilities = get_value(q_bs, "Total Current Liabilities", quarter_date)
+    result["current_ratio"] = current_assets / current_liabilities
+    total_debt = get_value(q_bs, "Total Debt", quarter_date)
+    total_equity = get_value(q_bs, "Total Stockholder Equity", quarter_date)
+    result["debt_to_equity"] = total_debt / total_equity
+    result["roe"] = net_income / total_equity * 100
+    result["roa"] = net_income / get_value(q_bs, "Total Assets", quarter_date) * 100
+    return result
+
+
+def legacy_table(tickers: list, yahoo: YahooDataCache) -> dict:
+    results = {}
+    for ticker in tickers:
+        q_income = yahoo.quarterly_financials(ticker)
+        q_bs = yahoo.quarterly_balance_sheet(ticker)
+        yahoo.quarterly_cashflow(ticker)
+        for quarter_date in q_income.columns:
+            for metric, value in legacy_analyze_quarter(q_income, q_bs, quarter_date).items():
+                results[(ticker, quarter_date, metric)] = value
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per statement fetch")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    statements = {t: synthetic_statements(i, args.quarters, rng) for i, t in enumerate(tickers)}
+
+    started = time.perf_counter()
+    legacy = legacy_table(tickers, FixtureYahooCache(statements, args.latency))
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    table = fundamentals_table(tickers, yahoo=FixtureYahooCache(statements, args.latency))
+    batch_seconds = time.perf_counter() - started
+
+    yahoo = FixtureYahooCache(statements, 0)
+    legacy_table(tickers, yahoo)
+    started = time.perf_counter()
+    legacy_table(tickers, yahoo)
+    legacy_compute = time.perf_counter() - started
+    started = time.perf_counter()
+    fundamentals_table(tickers, yahoo=yahoo)
+    batch_compute = time.perf_counter() - started
+
+    values = table.set_index(["ticker", "quarter", "metric"])["value"]
+    mismatches = sum(
+        1 for key, old in legacy.items()
+        if old is not None and not math.isclose(old, values.get(key, math.nan), rel_tol=1e-9)
+    )
+
+    print(f"{args.tickers} tickers x {args.quarters} quarters, {args.latency * 1000:.0f} ms per fetch")
+    print(f"legacy loop (fetch + compute) : {legacy_seconds:8.2f} s")
+    print(f"fundamentals_table            : {batch_seconds:8.2f} s  ({legacy_seconds / batch_seconds:.1f}x)")
+    print(f"compute only, cached fetches  : legacy {legacy_compute * 1000:.0f} ms, batch {batch_compute * 1000:.0f} ms")
+    print(f"tidy rows: {len(table)}, metrics per quarter: {table['metric'].nunique()}, "
+          f"mismatches vs legacy: {mismatches}/{len(legacy)}")
+
+
+if __name__ == "__main__":
+    main()
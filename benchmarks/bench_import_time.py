@@ -0,0 +1,90 @@
+"""
+Import-time profile of the modules loaded before and right after login, based on
+`python -X importtime`. Exits with status 1 when a module exceeds its budget or pulls in a
+heavy package that should only load once an intent needs it.
+
+    python -m benchmarks.bench_import_time              # check budgets
+    python -m benchmarks.bench_import_time --top 15     # also list the slowest imports
+    python -m benchmarks.bench_import_time --max-ms pipeline=500
+
+Each module is imported in a fresh interpreter; the budget is compared against the best of
+--repeat runs to smooth out disk cache noise.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul -> batas waktu import kumulatif (ms)
+BUDGETS_MS = {
+    "llm_clients": 300,   # dipakai halaman login
+    "pipeline": 400,      # dimuat setelah login, sebelum intent pertama
+}
+# Paket yang tidak boleh ikut termuat oleh modul di atas
+FORBIDDEN = ["crewai", "litellm", "selenium", "yfinance", "pandas", "openai"]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str) -> list:
+    """(package, self_us, cumulative_us, depth) for every import made by `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def cumulative_ms(rows: list, module: str) -> float:
+    return next(cumulative for name, _, cumulative, _ in rows if name == module) / 1000
+
+
+def loaded_forbidden(rows: list) -> list:
+    return sorted({name.split(".")[0] for name, *_ in rows} & set(FORBIDDEN))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest top-level packages")
+    parser.add_argument("--max-ms", action="append", default=[], metavar="MODULE=MS",
+                        help="override a budget, e.g. pipeline=500")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS_MS)
+    for item in args.max_ms:
+        module, value = item.split("=")
+        budgets[module] = float(value)
+
+    failed = False
+    for module, budget in budgets.items():
+        runs = [profile(module) for _ in range(max(1, args.repeat))]
+        best = min(runs, key=lambda rows: cumulative_ms(rows, module))
+        elapsed = cumulative_ms(best, module)
+        forbidden = loaded_forbidden(best)
+        ok = elapsed <= budget and not forbidden
+        failed |= not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {module:12s} {elapsed:8.1f} ms (budget {budget:.0f} ms)"
+              + (f" | loads {', '.join(forbidden)}" if forbidden else ""))
+
+        if args.top:
+            top_level = [row for row in best if row[3] == 1]
+            for name, _, cumulative, _ in sorted(top_level, key=lambda row: -row[2])[:args.top]:
+                print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
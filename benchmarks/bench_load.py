@@ -0,0 +1,321 @@
+"""
+Load test: N concurrent chat sessions driven through the app's query path.
+
+    python -m benchmarks.bench_load --sessions 1,10,50 --turns 4
+    python -m benchmarks.bench_load --sessions 50 --mix "technical=3,fundamental=1,chat=2" --yahoo-latency 0.4
+    python -m benchmarks.bench_load --sessions 50 --cache off --json load.json
+
+Every session is a thread with its own ChatSession calling stream_user_query, like a Streamlit
+script thread, and all of them share one FinancialCrew (app.get_crew) and the process-wide caches.
+Upstreams are benchmarks.replay over the e2e fixtures and OpenAI is the stub server playing the
+agents (bench_end_to_end.StubAgents), each with its own injected latency. Each concurrency level
+runs in a fresh process. Reported per level: throughput, turn latency p50/p95/p99/max, time to the
+first report, failed turns, peak Python threads / OS threads / child processes, and RSS growth
+per session.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_end_to_end import StubAgents, git_revision, offline_stack, percentile, run_worker_process
+
+PROMPTS = {
+    "technical": ["Technical analysis NVDA for 6mo", "Technical analysis AAPL", "Technical analysis MSFT for 3mo",
+                  "Technical analysis BBCA.JK for 3mo", "Technical analysis 7203.T", "Technical analysis VOD.L"],
+    "fundamental": ["Fundamental analysis AAPL", "Fundamental analysis NVDA", "Fundamental analysis MSFT",
+                    "Fundamental analysis 7203.T", "Fundamental analysis BBRI.JK"],
+    "macro": ["What's the macro outlook for United States?", "Macro outlook for Indonesia",
+              "Macro outlook for Japan", "Macro outlook for United Kingdom"],
+    "multi": ["Technical and fundamental analysis for MSFT",
+              "Technical analysis of NVDA and AAPL plus the macro outlook for United States"],
+    "chat": ["What does RSI mean?", "Is NVDA a buy right now?", "Thanks! How about fundamentals of BBRI.JK?"],
+}
+MIXES = {
+    "analysis": "technical=3,fundamental=2,macro=1",
+    "mixed": "technical=3,fundamental=2,macro=1,multi=1,chat=2",
+    "chat": "chat=1",
+}
+PARENT_ONLY = {"--json", "--sessions"}
+
+
+def parse_mix(spec: str) -> dict:
+    """'mixed' or 'technical=3,chat=1' -> {category: weight}."""
+    weights = {}
+    for part in MIXES.get(spec, spec).split(","):
+        category, _, weight = part.partition("=")
+        category = category.strip()
+        if category not in PROMPTS:
+            raise ValueError(f"unknown prompt category {category!r}; choose from {', '.join(PROMPTS)}")
+        weights[category] = float(weight or 1)
+    return weights
+
+
+def session_prompts(index: int, turns: int, weights: dict, seed: int) -> list:
+    rng = random.Random(seed * 100_003 + index)
+    categories = rng.choices(list(weights), weights=list(weights.values()), k=turns)
+    return [rng.choice(PROMPTS[category]) for category in categories]
+
+
+def _proc_status(pid="self") -> dict:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            return dict(line.rstrip("\n").split(":\t", 1) for line in f if ":\t" in line)
+    except OSError:
+        return {}
+
+
+def descendants(pid: int) -> list:
+    """Child processes (Chrome, subprocesses) of `pid`, recursively. Linux only; [] elsewhere."""
+    parents = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                ppid = _proc_status(entry).get("PPid")
+                if ppid:
+                    parents.setdefault(int(ppid), []).append(int(entry))
+    except OSError:
+        return []
+    found, stack = [], [pid]
+    while stack:
+        children = parents.get(stack.pop(), [])
+        found.extend(children)
+        stack.extend(children)
+    return found
+
+
+def rss_mb(pid="self") -> float:
+    value = _proc_status(pid).get("VmRSS")
+    if value:
+        return int(value.split()[0]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class ResourceSampler:
+    """Background thread recording peak Python threads, OS threads, child processes and RSS."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.peak = {"python_threads": 0, "os_threads": 0, "child_processes": 0, "rss_mb": 0.0, "children_rss_mb": 0.0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+
+    def sample(self):
+        children = descendants(os.getpid())
+        current = {
+            "python_threads": threading.active_count(),
+            "os_threads": int(_proc_status().get("Threads", threading.active_count())),
+            "child_processes": len(children),
+            "rss_mb": rss_mb(),
+            "children_rss_mb": sum(rss_mb(pid) for pid in children) if children else 0.0,
+        }
+        for key, value in current.items():
+            self.peak[key] = max(self.peak[key], value)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+class Session(threading.Thread):
+    """One simulated analyst: sends its prompts one after another, like the chat input would."""
+    def __init__(self, index: int, prompts: list, crew, agent_configs: dict, start_at: float, think_time: float):
+        super().__init__(name=f"session-{index}", daemon=True)
+        self.prompts = prompts
+        self.crew = crew
+        self.agent_configs = agent_configs
+        self.start_at = start_at
+        self.think_time = think_time
+        self.turns = []
+
+    def run(self):
+        from pipeline import ChatSession, stream_user_query
+
+        time.sleep(max(0.0, self.start_at - time.monotonic()))
+        session = ChatSession(self.agent_configs, "sk-stub")
+        history = []
+        for i, prompt in enumerate(self.prompts):
+            if i and self.think_time:
+                time.sleep(self.think_time)
+            history = history + [{"role": "user", "content": prompt}]
+            started = time.monotonic()
+            turn = {"prompt": prompt, "first_report": None, "error": None}
+            try:
+                for event in stream_user_query(session, self.crew, prompt, history):
+                    if event.kind in ("intent_done", "intent_cached") and turn["first_report"] is None:
+                        turn["first_report"] = time.monotonic() - started
+                    elif event.kind == "done":
+                        _, history = event.data
+            except Exception as e:
+                turn["error"] = f"{type(e).__name__}: {e}"
+            turn["latency"] = time.monotonic() - started
+            self.turns.append(turn)
+
+
+def run_level(args) -> dict:
+    """One concurrency level, in this process."""
+    agents = StubAgents(args.reply_tokens)
+    stub, crew, agent_configs = offline_stack(agents, args.llm_latency, args.llm_token_delay)
+
+    from benchmarks import replay
+    from response_cache import MemoryTier, ResponseCache, set_response_cache
+
+    latency = {"yahoo": args.yahoo_latency, "prices": args.yahoo_latency,
+               "econdb": args.econdb_latency, "yahoo_html": args.html_latency}
+    weights = parse_mix(args.mix)
+    sessions_count = args.worker_sessions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Pemanasan: import modul, build agent, dan buka koneksi di luar pengukuran
+        replay.install(args.fixtures, os.path.join(tmp, "warmup"), record=False)
+        set_response_cache(ResponseCache(enabled=False))
+        warm = Session(-1, [p[0] for p in PROMPTS.values()], crew, agent_configs, time.monotonic(), 0.0)
+        warm.start()
+        warm.join()
+
+        calls = replay.install(args.fixtures, os.path.join(tmp, "run"), latency)
+        set_response_cache(ResponseCache(tiers=[MemoryTier()], enabled=args.cache == "shared"))
+        stub_before, kinds_before = dict(stub.requests), agents.counts()
+        gc.collect()
+        rss_before = rss_mb()
+
+        now = time.monotonic()
+        sessions = [Session(i, session_prompts(i, args.turns, weights, args.seed), crew, agent_configs,
+                            now + args.ramp * i / max(1, sessions_count), args.think_time)
+                    for i in range(sessions_count)]
+        with ResourceSampler(args.sample_interval) as sampler:
+            started = time.monotonic()
+            for session in sessions:
+                session.start()
+            for session in sessions:
+                session.join()
+            wall = time.monotonic() - started
+        turns = [turn for session in sessions for turn in session.turns]
+        del sessions
+        gc.collect()
+        rss_after = rss_mb()
+    stub.stop()
+
+    latencies = [turn["latency"] for turn in turns if not turn["error"]]
+    first_reports = [turn["first_report"] for turn in turns if turn["first_report"] is not None]
+    errors = [turn["error"] for turn in turns if turn["error"]]
+    stub_delta = {k: v - stub_before.get(k, 0) for k, v in stub.requests.items()}
+    return {
+        "sessions": sessions_count,
+        "turns": len(turns),
+        "failed_turns": len(errors),
+        "errors": sorted(set(errors))[:5],
+        "wall_s": round(wall, 2),
+        "throughput_turns_per_s": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": {name: round(percentile(latencies, q) * 1000, 1)
+                       for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+        "first_report_ms": {name: round(percentile(first_reports, q) * 1000, 1) for name, q in (("p50", 50), ("p95", 95))},
+        "peak": {k: round(v, 1) for k, v in sampler.peak.items()},
+        "rss_before_mb": round(rss_before, 1),
+        "rss_growth_per_session_mb": round((sampler.peak["rss_mb"] - rss_before) / max(1, sessions_count), 2),
+        "rss_retained_per_session_mb": round((rss_after - rss_before) / max(1, sessions_count), 2),
+        "crew_copies": crew.crew_copies,
+        "upstream": calls.snapshot(),
+        "missing_fixtures": sorted(set(calls.missing)),
+        "llm": {k: v - kinds_before.get(k, 0) for k, v in agents.counts().items()},
+        "llm_requests": stub_delta.get("chat", 0),
+        "prompt_tokens": stub_delta.get("prompt_tokens", 0),
+    }
+
+
+def print_results(levels: list):
+    print(f"{'sessions':>8s} {'turns':>6s} {'failed':>6s} {'turns/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'p99 ms':>8s} {'max ms':>8s} {'1st rpt p95':>11s} {'py thr':>6s} {'os thr':>6s} {'procs':>5s} "
+          f"{'RSS MB':>7s} {'MB/sess':>7s} {'kept/sess':>9s}")
+    for r in levels:
+        latency, peak = r["latency_ms"], r["peak"]
+        print(f"{r['sessions']:8d} {r['turns']:6d} {r['failed_turns']:6d} {r['throughput_turns_per_s']:8.2f} "
+              f"{latency['p50']:8.0f} {latency['p95']:8.0f} {latency['p99']:8.0f} {latency['max']:8.0f} "
+              f"{r['first_report_ms']['p95']:11.0f} {peak['python_threads']:6.0f} {peak['os_threads']:6.0f} "
+              f"{peak['child_processes']:5.0f} {peak['rss_mb']:7.0f} {r['rss_growth_per_session_mb']:7.2f} "
+              f"{r['rss_retained_per_session_mb']:9.2f}")
+    for r in levels:
+        print(f"\n[{r['sessions']} sessions] upstream: {r['upstream']}")
+        print(f"[{r['sessions']} sessions] LLM: {r['llm']} ({r['llm_requests']} requests, "
+              f"{r['prompt_tokens']} prompt tokens), crew copies: {r['crew_copies']}")
+        for error in r["errors"]:
+            print(f"[{r['sessions']} sessions] ERROR: {error}")
+        if r["missing_fixtures"]:
+            print(f"[{r['sessions']} sessions] MISSING FIXTURES: {r['missing_fixtures']}")
+
+
+def main():
+    from benchmarks.replay import DEFAULT_FIXTURES
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="1,10,50", help="comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=3, help="prompts per session")
+    parser.add_argument("--mix", default="mixed", help=f"one of {', '.join(MIXES)} or e.g. 'technical=3,chat=1'")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ramp", type=float, default=0.0, help="spread session starts over this many seconds")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pause between a session's turns (s)")
+    parser.add_argument("--cache", choices=("shared", "off"), default="shared",
+                        help="shared: one response cache for all sessions, as in the app; off: every turn runs")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="stub delay before the first token (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.002, help="stub delay per token (s)")
+    parser.add_argument("--reply-tokens", type=int, default=150)
+    parser.add_argument("--yahoo-latency", type=float, default=0.15, help="per yfinance call (s)")
+    parser.add_argument("--econdb-latency", type=float, default=0.2, help="per econdb request (s)")
+    parser.add_argument("--html-latency", type=float, default=0.5, help="per Yahoo key-statistics page (s)")
+    parser.add_argument("--sample-interval", type=float, default=0.2, help="thread/process/RSS sampling (s)")
+    parser.add_argument("--timeout", type=float, default=3600, help="per level (s)")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--verbose", action="store_true", help="show worker output")
+    parser.add_argument("--worker-sessions", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    if args.worker_sessions is not None:
+        result = run_level(args)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    levels = []
+    for sessions in [int(n) for n in args.sessions.split(",") if n.strip()]:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+            path = out.name
+        try:
+            run_worker_process("benchmarks.bench_load", PARENT_ONLY,
+                               ["--worker-sessions", str(sessions), "--out", path],
+                               args.verbose, args.timeout, f"{sessions} sessions")
+            with open(path, encoding="utf-8") as f:
+                levels.append(json.load(f))
+        finally:
+            os.unlink(path)
+        print(f"[{sessions} sessions] done in {levels[-1]['wall_s']:.0f}s", file=sys.stderr)
+
+    print(f"commit {git_revision()['commit']}, mix {args.mix} {parse_mix(args.mix)}, {args.turns} turns per session, "
+          f"cache {args.cache}, latency llm={args.llm_latency}s yahoo={args.yahoo_latency}s "
+          f"econdb={args.econdb_latency}s html={args.html_latency}s")
+    print_results(levels)
+    if args.json:
+        settings = {k: v for k, v in vars(args).items() if k not in ("json", "verbose", "worker_sessions", "out")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": {**git_revision(), "settings": settings}, "levels": levels}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
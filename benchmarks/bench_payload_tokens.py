@@ -0,0 +1,126 @@
+"""
+Prompt tokens of each tool's output before (str(dict), what the agent used to receive) and after
+tools.payload.encode_payload.
+
+    python -m benchmarks.bench_payload_tokens
+    python -m benchmarks.bench_payload_tokens --format json --budget 800 --show
+
+Runs offline: technical bars are synthetic, macro series come from generated CSV fixtures and the
+fundamental reports are built with the same keys and numpy types the tools produce.
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_technical_batch import FrameProvider, synthetic_frames
+from chat_history import count_tokens
+from tools.macro_data import CSVFixtureProvider, DEFAULT_SERIES, EXTRA_SERIES, MacroSeriesStore, set_macro_store
+from tools.payload import encode_payload
+from tools.price_store import PriceStore, set_price_store
+
+
+def technical_result():
+    from tools.technical_analysis import TechnicalAnalysisTool
+    frames = synthetic_frames(1, 300, seed=7)
+    set_price_store(PriceStore(":memory:", provider=FrameProvider(frames)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return TechnicalAnalysisTool().analyze("SYM0000", period="1y")
+
+
+def write_macro_fixtures(directory: str, country_codes: list):
+    rng = np.random.default_rng(3)
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=26 * 12, freq="MS")
+    for code in country_codes:
+        for prefix in list(DEFAULT_SERIES.values()) + list(EXTRA_SERIES.values()):
+            values = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+            pd.DataFrame({"Date": dates, "value": values}).to_csv(f"{directory}/{prefix}{code}.csv", index=False)
+
+
+def macro_results(directory: str):
+    from tools.macroeconom_analysis import MacroeconomicTool
+    write_macro_fixtures(directory, ["ID", "MY", "TH"])
+    set_macro_store(MacroSeriesStore(CSVFixtureProvider(directory), cache_dir=None))
+    tool = MacroeconomicTool()
+    return {
+        "macro (1 country)": tool.get_macro_report("Indonesia"),
+        "macro (3 countries + extras)": tool.get_macro_report(
+            "Indonesia, Malaysia, Thailand", extra_series="Policy rate, 10Y bond yield"),
+    }
+
+
+def fundamental_quarter_result():
+    f = np.float64
+    return {
+        "Company Name": "Apple Inc.", "Sector": "Technology", "Industry": "Consumer Electronics",
+        "Quarter": "2024-06-30",
+        "Financial Ratios": {
+            "Gross Margin (%)": f(46.25776397515528), "Operating Margin (%)": f(29.55590062111801),
+            "Net Margin (%)": f(25.00310559006211), "Current Ratio": f(0.9529924451665327),
+            "Debt to Equity": f(1.5142857142857142), "ROE (%)": f(32.92034757312155),
+            "ROA (%)": f(6.066086405285312),
+        },
+        "Growth Rates": {"Revenue Growth QoQ": f(-5.0632911392405067), "Net Income Growth QoQ": f(-8.072327044025157)},
+        "EPS": f(1.4), "Free Cash Flow": f(26707000000.0), "Operating Cash Flow": f(28858000000.0),
+        "Cash & Equivalents": f(25565000000.0), "Total Debt": f(101304000000.0),
+        "Net Debt": f(76686000000.0), "Buyback": f(-26522000000.0), "Dividend": f(-3895000000.0),
+        "Valuation Measures": {
+            "Market Cap": "3.28T", "Enterprise Value": "3.31T", "Trailing P/E": "32.47",
+            "Forward P/E": "30.03", "PEG Ratio (5yr expected)": "2.98", "Price/Sales": "8.53",
+            "Price/Book": "48.60", "Enterprise Value/Revenue": "8.58", "Enterprise Value/EBITDA": "24.89",
+        },
+        "Data Retrieval Date": "2024-08-15",
+    }
+
+
+def fundamental_result():
+    f = np.float64
+    return {
+        "Company Name": "Apple Inc.", "Sector": "Technology", "Industry": "Consumer Electronics",
+        "Financial Ratios": {
+            "P/E Ratio": f(32.47211), "Forward P/E": f(30.028545), "P/B Ratio": f(48.604046),
+            "P/S Ratio": f(8.529834), "PEG Ratio": None, "Debt to Equity": f(151.862),
+            "Current Ratio": f(0.953), "Quick Ratio": f(0.826), "ROE": f(1.60583), "ROA": f(0.22612),
+            "ROIC": None, "Gross Margin": f(0.45962), "Operating Margin": f(0.29556),
+            "Net Profit Margin": f(0.26441), "Dividend Yield": f(0.0044), "Payout Ratio": f(0.1493),
+        },
+        "Growth Rates": {"Revenue Growth (3Y)": f(7.786421763003925), "Net Income Growth (3Y)": f(5.405092847510838)},
+        "DCF Valuation": f(2913449021738.9785),
+        "Future Estimation": {"Next Year EPS Estimate": f(7.46), "Next Year Revenue Estimate": None,
+                              "Long-term Growth Rate": None},
+        "Last Updated": "2023-09-30", "Data Retrieval Date": "2024-08-15",
+        "Interpretations": {"P/E Ratio": "High", "Debt to Equity": "High Leverage", "ROE": "Strong",
+                            "Revenue Growth": "Moderate Growth"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default TOOL_PAYLOAD_TOKEN_BUDGET)")
+    parser.add_argument("--show", action="store_true", help="print the encoded payloads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "technical": technical_result(),
+            "fundamental (quarterly)": fundamental_quarter_result(),
+            "fundamental (annual)": fundamental_result(),
+            **macro_results(directory),
+        }
+
+    print(f"{'tool output':30s} {'before':>8s} {'after':>8s} {'saved':>7s}")
+    for name, result in results.items():
+        before = count_tokens(str(result))
+        encoded = encode_payload(result, fmt=args.format, token_budget=args.budget)
+        after = count_tokens(encoded)
+        print(f"{name:30s} {before:8d} {after:8d} {1 - after / before:7.0%}")
+        if args.show:
+            print(encoded, "\n")
+
+
+if __name__ == "__main__":
+    main()
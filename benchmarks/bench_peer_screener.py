@@ -0,0 +1,126 @@
+"""
+Peer screener on a synthetic 500-name universe with simulated Yahoo latency.
+
+    python -m benchmarks.bench_peer_screener --names 500 --latency 0.2 --budget 10
+
+Times a screen before the universe is warmed (ticker + one retry batch), the background
+universe warm-up, a screen on the warmed universe, a repeat screen (everything cached) and the
+previous approach of one get_fundamental_data call per peer, and checks that a screen stays
+inside the configured budget even when some symbols are very slow.
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+
+from tools.peer_screener import PeerScreener, PeerUniverse
+from tools.yf_cache import YahooDataCache, set_yahoo_cache
+
+SECTORS = {
+    "Technology": ["Software", "Semiconductors", "Consumer Electronics"],
+    "Financial Services": ["Banks - Regional", "Insurance", "Asset Management"],
+    "Healthcare": ["Drug Manufacturers", "Medical Devices"],
+    "Energy": ["Oil & Gas Integrated", "Oil & Gas E&P"],
+    "Consumer Defensive": ["Packaged Foods", "Beverages"],
+}
+
+
+def synthetic_infos(n_names: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    pairs = [(sector, industry) for sector, industries in SECTORS.items() for industry in industries]
+    infos = {}
+    for i in range(n_names):
+        sector, industry = pairs[i % len(pairs)]
+        infos[f"P{i:04d}"] = {
+            "shortName": f"Company {i}", "sector": sector, "industry": industry, "country": "United States",
+            "marketCap": float(rng.lognormal(23, 1.5)),
+            "trailingPE": float(rng.normal(22, 10)), "forwardPE": float(rng.normal(18, 6)),
+            "priceToBook": float(rng.lognormal(1, 0.6)),
+            "grossMargins": float(rng.uniform(0.1, 0.7)), "operatingMargins": float(rng.uniform(-0.05, 0.4)),
+            "profitMargins": float(rng.uniform(-0.1, 0.3)), "returnOnEquity": float(rng.normal(0.15, 0.1)),
+            "debtToEquity": float(rng.lognormal(4, 0.7)),
+            "revenueGrowth": float(rng.normal(0.06, 0.1)), "earningsGrowth": float(rng.normal(0.08, 0.2)),
+        }
+    return infos
+
+
+class FixtureYahooCache(YahooDataCache):
+    def __init__(self, infos: dict, latency: float, slow: set = (), slow_latency: float = 60):
+        super().__init__()
+        self.infos = infos
+        self.latency = latency
+        self.slow = set(slow)
+        self.slow_latency = slow_latency
+
+    def _fetch(self, symbol, field, **kwargs):
+        time.sleep(self.slow_latency if symbol in self.slow else self.latency)
+        if field != "info":
+            raise KeyError(field)
+        return self.infos.get(symbol, {})
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per info call")
+    parser.add_argument("--budget", type=float, default=10.0, help="screen time budget in seconds")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    infos = synthetic_infos(args.names)
+    symbols = list(infos)
+    target = symbols[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        yahoo = FixtureYahooCache(infos, args.latency)
+        universe = PeerUniverse(f"{directory}/universe.csv", yahoo=yahoo)
+        screener = PeerScreener(universe, yahoo=yahoo, candidates=symbols, max_workers=args.workers,
+                                budget_seconds=args.budget)
+        cold, cold_report = timed(lambda: screener.screen(target, max_peers=0))
+        warmup, _ = timed(screener.warm_universe)
+        first, report = timed(lambda: screener.screen(target, max_peers=0))
+        warm, _ = timed(lambda: screener.screen(target, max_peers=0))
+        reloaded = PeerUniverse(f"{directory}/universe.csv", yahoo=yahoo)
+
+        # 5% simbol sangat lambat: screen harus tetap selesai dalam budget dan melaporkannya
+        slow = set(symbols[1::20])
+        slow_yahoo = FixtureYahooCache(infos, args.latency, slow=slow, slow_latency=2 * args.budget)
+        slow_screener = PeerScreener(PeerUniverse(None, yahoo=slow_yahoo), yahoo=slow_yahoo, candidates=symbols,
+                                     max_workers=args.workers, budget_seconds=args.budget)
+        slow_screener.warm_universe(args.budget)
+        budgeted, slow_report = timed(lambda: slow_screener.screen(target, max_peers=0))
+
+    from tools.fundamental_analysis import FundamentalAnalysisTool
+    peers = [s for s in symbols if infos[s]["industry"] == infos[target]["industry"]]
+    legacy_yahoo = FixtureYahooCache(infos, args.latency)
+    set_yahoo_cache(legacy_yahoo)
+    tool = FundamentalAnalysisTool()
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy, _ = timed(lambda: [tool.get_fundamental_data(s) for s in peers])
+
+    print(f"universe {args.names} names, {args.latency * 1000:.0f} ms per info call, {args.workers} workers")
+    print(f"peer group            : {report['Peer Group']} ({report['Peers Compared']} peers)")
+    print(f"legacy, one call/peer : {legacy:8.2f} s  (ratios only, no ranking)")
+    print(f"screen, cold universe : {cold:8.2f} s  ({cold_report.get('Peers Compared', 0)} peers, "
+          f"{cold_report.get('Universe Pending', 0)} symbols still pending)")
+    print(f"universe warm-up      : {warmup:8.2f} s  (background thread in the app)")
+    print(f"screen, warmed        : {first:8.2f} s")
+    print(f"screen, repeat        : {warm * 1000:8.1f} ms")
+    print(f"universe reloaded     : {len(reloaded)} rows from disk")
+    print(f"5% slow symbols       : {budgeted:8.2f} s (budget {args.budget:.0f} s), "
+          f"{slow_report.get('Peers Compared', 0)} peers, {slow_report.get('Skipped (time budget)', 0)} skipped, "
+          f"{slow_report.get('Universe Pending', 0)} pending")
+    print(f"{target}: rank {report['Overall Rank']}, score {report['Composite Score (0-100)']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures the rule-based intent router on a labeled prompt corpus.
+
+    python -m benchmarks.bench_router                 # rules vs labels (offline)
+    python -m benchmarks.bench_router --llm           # also asks the LLM router (needs OPENAI_API_KEY)
+
+Hit rate is the share of prompts the rules answer without the LLM; accuracy is measured on
+those hits only, since the rest fall back to the LLM anyway.
+"""
+import argparse
+import json
+import os
+import time
+
+import yaml
+
+from intent_rules import route_by_rules
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "router_corpus.jsonl")
+COMPARED_FIELDS = ["period", "start_date", "end_date", "year", "quarter"]
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize(intents: list) -> set:
+    """Router output or labels -> comparable set of (intent, subject, field values)."""
+    items = set()
+    for item in intents:
+        entities = item.get("entities", item)
+        subject = entities.get("ticker") or entities.get("country") or entities.get("subject")
+        values = tuple(str(entities.get(field)) if entities.get(field) is not None else None for field in COMPARED_FIELDS)
+        items.add((item["intent"], str(subject).upper() if subject else None, values))
+    return items
+
+
+def matches(predicted: list, expected: list) -> bool:
+    return normalize(predicted) == normalize(expected)
+
+
+def llm_route(agent, prompt: str) -> list:
+    output = agent.query(prompt)
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return []
+    return data.get("intents", [data] if "intent" in data else [])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm", action="store_true", help="compare against the LLM intent router")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    agent = None
+    if args.llm:
+        from pipeline import GenericChatAgent
+        with open("config/agents.yaml", encoding="utf-8") as f:
+            config = yaml.safe_load(f)["intent_router"]
+        agent = GenericChatAgent(config, api_key=os.environ["OPENAI_API_KEY"], name="intent_router", stateless=True)
+
+    hits = correct = llm_correct = agreement = 0
+    rule_seconds = llm_seconds = 0.0
+    for row in corpus:
+        started = time.perf_counter()
+        route = route_by_rules(row["prompt"])
+        rule_seconds += time.perf_counter() - started
+
+        if route.confident:
+            hits += 1
+            ok = matches(route.intents, row["intents"])
+            correct += ok
+            if args.verbose and not ok:
+                print(f"[MISS] {row['prompt']!r}\n  got      {sorted(normalize(route.intents), key=str)}"
+                      f"\n  expected {sorted(normalize(row['intents']), key=str)}")
+        elif args.verbose:
+            print(f"[FALLBACK] {row['prompt']!r}: {', '.join(route.reasons)}")
+
+        if agent is not None:
+            started = time.perf_counter()
+            llm_intents = llm_route(agent, row["prompt"])
+            llm_seconds += time.perf_counter() - started
+            llm_correct += matches(llm_intents, row["intents"])
+            if route.confident:
+                agreement += matches(route.intents, llm_intents)
+
+    total = len(corpus)
+    print(f"prompts          : {total}")
+    print(f"rule hit rate    : {hits / total:.0%} ({hits} prompts without an LLM call)")
+    print(f"rule accuracy    : {correct / hits:.0%} on hits" if hits else "rule accuracy    : n/a")
+    print(f"rule latency     : {rule_seconds / total * 1000:.3f} ms/prompt")
+    if agent is not None:
+        print(f"LLM accuracy     : {llm_correct / total:.0%}")
+        print(f"rules == LLM     : {agreement / hits:.0%} on hits" if hits else "rules == LLM     : n/a")
+        print(f"LLM latency      : {llm_seconds / total * 1000:.0f} ms/prompt")
+
+
+if __name__ == "__main__":
+    main()
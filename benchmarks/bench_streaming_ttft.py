@@ -0,0 +1,119 @@
+"""
+Time to first token: blocking completions versus streaming, against the local stub server.
+
+    python -m benchmarks.bench_streaming_ttft --first-token 0.3 --token-delay 0.01 --crew-seconds 3
+
+Part 1 calls GenericChatAgent directly. Part 2 runs a two-intent turn through handle_user_query
+(what the UI used to wait for) and stream_user_query with a simulated crew, and reports when the
+first progress event, the first finished report and the first summary token arrive.
+Exits with status 1 when the streamed summary's first token is slower than --max-ttft.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from benchmarks.stub_openai import StubOpenAIServer
+from llm_clients import OpenAIClientRegistry, set_client_registry, get_client_registry
+from pipeline import ChatSession, GenericChatAgent, handle_user_query, stream_user_query
+from progress import crew_step_callback
+from response_cache import MemoryTier, ResponseCache, set_response_cache
+
+AGENT_CONFIGS = {
+    name: {"role": name, "goal": "benchmark", "backstory": "", "prompt": ""}
+    for name in ["intent_router", "fundamental", "macro", "summarizer", "conversational_agent"]
+}
+PROMPT = "technical analysis for NVDA and AAPL"
+
+
+class SimulatedCrew:
+    """acquire()/kickoff() like FinancialCrew, with one tool step and a fixed run time."""
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    @contextmanager
+    def acquire(self, intent):
+        yield self
+
+    async def kickoff(self, crew_obj, inputs):
+        return await asyncio.to_thread(self._run, inputs)
+
+    def _run(self, inputs):
+        crew_step_callback(SimpleNamespace(tool="TechnicalAnalysisTool", tool_input=inputs))
+        time.sleep(self.seconds)
+        return f"Technical report for {inputs['stock_symbol']}: trend bullish, RSI 55, MACD positive."
+
+
+def direct_agent(rounds: int):
+    agent = GenericChatAgent(AGENT_CONFIGS["summarizer"], api_key="sk-stub", stateless=True)
+    blocking, first_tokens, streamed = [], [], []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        agent.query("Summarize.")
+        blocking.append(time.perf_counter() - started)
+
+        first = []
+        started = time.perf_counter()
+        agent.query("Summarize.", on_token=lambda text: first or first.append(time.perf_counter() - started))
+        streamed.append(time.perf_counter() - started)
+        first_tokens.append(first[0])
+    return min(blocking), min(first_tokens), min(streamed)
+
+
+def full_turn(crew_seconds: float):
+    crew = SimulatedCrew(crew_seconds)
+
+    set_response_cache(ResponseCache(tiers=[MemoryTier()]))
+    session = ChatSession(AGENT_CONFIGS, "sk-stub")
+    started = time.perf_counter()
+    handle_user_query(session, crew, PROMPT, [])
+    blocking = time.perf_counter() - started
+
+    set_response_cache(ResponseCache(tiers=[MemoryTier()]))
+    session = ChatSession(AGENT_CONFIGS, "sk-stub")
+    firsts = {}
+    started = time.perf_counter()
+    for event in stream_user_query(session, crew, PROMPT, []):
+        firsts.setdefault(event.kind, time.perf_counter() - started)
+    return blocking, firsts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first-token", type=float, default=0.3, help="stub delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="stub delay between tokens (s)")
+    parser.add_argument("--reply-tokens", type=int, default=300)
+    parser.add_argument("--crew-seconds", type=float, default=3.0, help="simulated kickoff time per intent")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-ttft", type=float, default=1.5, help="fail if summary TTFT exceeds this (s)")
+    args = parser.parse_args()
+
+    with StubOpenAIServer(first_token_delay=args.first_token, token_delay=args.token_delay,
+                          reply_tokens=args.reply_tokens) as stub:
+        set_client_registry(OpenAIClientRegistry(base_url=stub.url))
+        with contextlib.redirect_stdout(io.StringIO()):
+            blocking, first_token, streamed = direct_agent(args.rounds)
+            turn_blocking, firsts = full_turn(args.crew_seconds)
+
+    summary_ttft = firsts["token"] - firsts["summary_started"]
+    print(f"stub: {args.first_token * 1000:.0f} ms to first token, {args.reply_tokens} tokens "
+          f"x {args.token_delay * 1000:.0f} ms; simulated crew {args.crew_seconds:.1f} s per intent")
+    print(f"agent, blocking reply        : {blocking:6.2f} s until any text")
+    print(f"agent, streamed first token  : {first_token:6.2f} s  (full reply {streamed:.2f} s)")
+    print(f"turn, handle_user_query      : {turn_blocking:6.2f} s until any text")
+    for kind in ["routed", "intent_started", "step", "intent_done", "summary_started", "token", "done"]:
+        if kind in firsts:
+            print(f"turn, first {kind:17s}: {firsts[kind]:6.2f} s")
+    print(f"summary TTFT after crews     : {summary_ttft:6.2f} s")
+    print("[LLM Clients]", get_client_registry().stats()["first_token_ms"])
+    if summary_ttft > args.max_ttft:
+        print(f"FAIL: summary TTFT {summary_ttft:.2f} s > {args.max_ttft:.2f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
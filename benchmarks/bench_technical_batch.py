@@ -0,0 +1,95 @@
+"""
+Compares tools.technical_batch.analyze_batch against looping TechnicalAnalysisTool.analyze.
+
+Runs fully offline on synthetic bars: python -m benchmarks.bench_technical_batch --symbols 500
+"""
+import argparse
+import contextlib
+import io
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.price_store import OHLCV_COLUMNS, PriceStore, set_price_store
+from tools.technical_analysis import TechnicalAnalysisTool
+from tools.technical_batch import analyze_batch
+
+
+class FrameProvider:
+    def __init__(self, frames: dict):
+        self.frames = frames
+
+    def fetch(self, symbol, start, end):
+        data = self.frames[symbol]
+        return data.loc[(data.index >= start) & (data.index < end)]
+
+
+def synthetic_frames(n_symbols: int, n_bars: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars)
+    frames = {}
+    for i in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+        spread = np.abs(rng.normal(0, 0.01, n_bars)) * close
+        frames[f"SYM{i:04d}"] = pd.DataFrame({
+            "Open": close + rng.normal(0, 0.5, n_bars),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, n_bars).astype(float),
+        }, index=index)
+    return frames
+
+
+def multi_ticker_frame(frames: dict) -> pd.DataFrame:
+    # Bentuk kolom sama dengan yf.download(list, group_by="column"): (Price, Ticker)
+    data = pd.concat({symbol: frame[OHLCV_COLUMNS] for symbol, frame in frames.items()}, axis=1)
+    return data.swaplevel(axis=1).sort_index(axis=1)
+
+
+def max_abs_diff(a, b) -> float:
+    if isinstance(a, dict):
+        return max((max_abs_diff(a[k], b[k]) for k in a), default=0.0)
+    if isinstance(a, str) or a is None:
+        return 0.0 if a == b else math.inf
+    a, b = float(a), float(b)
+    if math.isnan(a) and math.isnan(b):
+        return 0.0
+    return abs(a - b) / max(1.0, abs(a))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=260)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.symbols, args.bars)
+    symbols = list(frames)
+    set_price_store(PriceStore(":memory:", provider=FrameProvider(frames)))
+    tool = TechnicalAnalysisTool()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for symbol in symbols:
+            tool.analyze(symbol, period="2y")  # isi store dulu supaya yang diukur hanya komputasi
+
+        started = time.perf_counter()
+        looped = {symbol: tool.analyze(symbol, period="2y") for symbol in symbols}
+        loop_seconds = time.perf_counter() - started
+
+    data = multi_ticker_frame(frames)
+    started = time.perf_counter()
+    batched = analyze_batch(symbols, data)
+    batch_seconds = time.perf_counter() - started
+
+    worst = max(max_abs_diff(looped[s], batched[s]) for s in symbols)
+    print(f"symbols={args.symbols} bars={args.bars}")
+    print(f"loop analyze   : {loop_seconds:8.3f}s")
+    print(f"analyze_batch  : {batch_seconds:8.3f}s  ({loop_seconds / batch_seconds:.1f}x faster)")
+    print(f"max relative difference vs analyze: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Cost of the tracing layer, plus one traced turn against the local stub server.
+
+    python -m benchmarks.bench_tracing_overhead --calls 200000
+
+Part 1 times `with span(...)`, a @traced function and tracing.add() with tracing off and on.
+Part 2 runs a two-intent turn through handle_user_query with a simulated crew whose tool step
+reads the Yahoo cache, then prints the span tree of that turn.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import tracing
+from benchmarks.bench_streaming_ttft import AGENT_CONFIGS, PROMPT, SimulatedCrew
+from benchmarks.stub_openai import StubOpenAIServer
+from llm_clients import OpenAIClientRegistry, set_client_registry
+from pipeline import ChatSession, handle_user_query
+from response_cache import MemoryTier, ResponseCache, set_response_cache
+from tools.payload import encode_payload
+from tools.yf_cache import YahooDataCache, set_yahoo_cache
+
+
+@tracing.traced("bench.noop")
+def traced_noop():
+    return None
+
+
+def plain_noop():
+    return None
+
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - started) / calls
+
+
+def span_once():
+    with tracing.span("bench.span", symbol="AAPL"):
+        pass
+
+
+def micro(calls: int) -> dict:
+    return {
+        "plain call": per_call_ns(plain_noop, calls),
+        "@traced call": per_call_ns(traced_noop, calls),
+        "with span()": per_call_ns(span_once, calls),
+        "tracing.add()": per_call_ns(lambda: tracing.add("hits"), calls),
+    }
+
+
+class OfflineYahooCache(YahooDataCache):
+    """Answers from memory after a short fake upstream delay."""
+    def _fetch(self, symbol, field, **kwargs):
+        time.sleep(0.02)
+        return {"symbol": symbol, "trailingPE": 31.2, "priceToBook": 48.1}
+
+
+class ToolCrew(SimulatedCrew):
+    """SimulatedCrew whose step runs a traced 'tool' that reads the Yahoo cache and encodes a payload."""
+    @tracing.traced("tool.BenchTool")
+    def _tool(self, symbol):
+        cache = get_cache()
+        cache.info(symbol)
+        cache.info(symbol)
+        return encode_payload({"symbol": symbol, "ratios": cache.info(symbol)})
+
+    def _run(self, inputs):
+        self._tool(inputs["stock_symbol"])
+        return super()._run(inputs)
+
+
+_cache = OfflineYahooCache()
+
+
+def get_cache():
+    return _cache
+
+
+def traced_turn(crew_seconds: float) -> list:
+    set_yahoo_cache(_cache)
+    set_response_cache(ResponseCache(tiers=[MemoryTier()]))
+    session = ChatSession(AGENT_CONFIGS, "sk-stub")
+    with contextlib.redirect_stdout(io.StringIO()):
+        handle_user_query(session, ToolCrew(crew_seconds), PROMPT, [])
+    return tracing.get_tracer().trace(session.last_trace_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--crew-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    tracing.set_tracer(tracing.Tracer(enabled=False))
+    off = micro(args.calls)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracing.set_tracer(tracing.Tracer(enabled=True, path=path))
+        with tracing.span("bench.root"):
+            on = micro(args.calls // 10)
+
+        print(f"{'':16s} {'off (ns)':>10s} {'on (ns)':>10s}")
+        for name in off:
+            print(f"{name:16s} {off[name]:10.0f} {on[name]:10.0f}")
+
+        tracing.get_tracer().clear()
+        with StubOpenAIServer(first_token_delay=0.05, token_delay=0.0) as stub:
+            set_client_registry(OpenAIClientRegistry(base_url=stub.url))
+            records = traced_turn(args.crew_seconds)
+        with open(path, encoding="utf-8") as f:
+            exported = sum(1 for _ in f)
+
+    print(f"\ntraced turn: {len(records)} spans ({exported} JSONL lines exported in total)")
+    for depth, record in tracing.span_tree(records):
+        attributes = ", ".join(f"{k}={v}" for k, v in record["attributes"].items())
+        print(f"{'  ' * depth}{record['name']:<{34 - 2 * depth}s} {record['durationMs']:9.1f} ms  "
+              f"{record['status']['code']:5s} {attributes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Yahoo key-statistics parsing and the ValuationMeasuresProvider fetch paths, against a saved page
+(benchmarks/fixtures/valuation). No network or browser is used.
+
+    python -m benchmarks.bench_valuation_parser --rounds 200
+
+Checks that the parsed quarters and values match the page, that past quarters are cached on
+disk, that a page without the valuation table falls through to the browser, and that an empty
+result from both paths is not cached (the next call fetches again). Exits non-zero on a mismatch.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from tools.valuation_measures import ValuationMeasuresProvider, parse_key_statistics
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "valuation", "AAPL_key_statistics.html")
+EXPECTED_COLUMNS = ["Current", "3/31/2025", "12/31/2024", "9/30/2024", "6/30/2024", "3/31/2024"]
+# Sel yang dibaca langsung dari halaman fixture
+EXPECTED_VALUES = {
+    ("Current", "Market Cap"): "3.00T",
+    ("3/31/2025", "Trailing P/E"): "35.35",
+    ("12/31/2024", "PEG Ratio (5yr expected)"): "2.36",
+    ("9/30/2024", "Price/Book"): "53.61",
+    ("3/31/2024", "Enterprise Value/EBITDA"): "20.21",
+}
+EXPECTED_MEASURES = 9
+EMPTY_PAGE = "<html><body><table><tr><td>Previous Close</td><td>199.95</td></tr></table></body></html>"
+
+
+class FakeResponse:
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+
+class FakeSession:
+    def __init__(self, text: str, status_code: int = 200):
+        self.response = FakeResponse(text, status_code)
+        self.headers = {}
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return self.response
+
+
+class FakeBrowserPool:
+    def __init__(self, html: str = None):
+        self.html = html
+        self.calls = 0
+
+    def fetch_html(self, url: str) -> str:
+        self.calls += 1
+        if self.html is None:
+            raise TimeoutError("no table on page")
+        return self.html
+
+    def close_all(self):
+        pass
+
+
+def check_parser(html: str) -> list:
+    problems = []
+    columns = parse_key_statistics(html)
+    if list(columns) != EXPECTED_COLUMNS:
+        problems.append(f"columns {list(columns)}, expected {EXPECTED_COLUMNS}")
+    for (column, measure), value in EXPECTED_VALUES.items():
+        got = columns.get(column, {}).get(measure)
+        if got != value:
+            problems.append(f"{column} / {measure} = {got!r}, expected {value!r}")
+    short = [column for column, values in columns.items() if len(values) != EXPECTED_MEASURES]
+    if short:
+        problems.append(f"columns without all {EXPECTED_MEASURES} measures: {short}")
+    if "Fiscal Year Ends" in columns.get("Current", {}) or "Previous Close" in columns.get("Current", {}):
+        problems.append("rows from another table were parsed")
+    if parse_key_statistics(EMPTY_PAGE):
+        problems.append("page without the valuation table parsed as non-empty")
+    return problems
+
+
+def check_provider(html: str, directory: str) -> list:
+    problems = []
+
+    # HTTP berhasil: browser tidak dipakai, kuartal lampau masuk cache disk
+    session, browser = FakeSession(html), FakeBrowserPool(html)
+    provider = ValuationMeasuresProvider(cache_dir=os.path.join(directory, "http"), browser_pool=browser,
+                                         session=session)
+    values = provider.get("AAPL", 2025, 1)
+    if (values or {}).get("Trailing P/E") != "35.35" or browser.calls:
+        problems.append(f"HTTP path: got {values}, browser calls {browser.calls}")
+    fresh = ValuationMeasuresProvider(cache_dir=os.path.join(directory, "http"), browser_pool=FakeBrowserPool(),
+                                      session=FakeSession(EMPTY_PAGE))
+    if (fresh.get("AAPL", 2024, 4) or {}).get("PEG Ratio (5yr expected)") != "2.36" or fresh.session.calls:
+        problems.append("past quarter not served from the disk cache")
+
+    # HTTP tanpa tabel valuasi: lanjut ke browser
+    session, browser = FakeSession(EMPTY_PAGE), FakeBrowserPool(html)
+    provider = ValuationMeasuresProvider(cache_dir=os.path.join(directory, "fallback"), browser_pool=browser,
+                                         session=session)
+    values = provider.get("AAPL", 2024, 3)
+    if (values or {}).get("Price/Book") != "53.61" or browser.calls != 1:
+        problems.append(f"browser fallback: got {values}, browser calls {browser.calls}")
+
+    # HTTP error dan browser gagal: hasil kosong tidak di-cache, panggilan berikutnya mencoba lagi
+    session, browser = FakeSession("", status_code=503), FakeBrowserPool(None)
+    provider = ValuationMeasuresProvider(cache_dir=os.path.join(directory, "empty"), browser_pool=browser,
+                                         session=session)
+    first = provider.get("AAPL", 2025, 1)
+    session.response = FakeResponse(html)
+    second = provider.get("AAPL", 2025, 1)
+    if first is not None or (second or {}).get("Trailing P/E") != "35.35" or session.calls != 2:
+        problems.append(f"empty result was cached: first {first}, second {second}, HTTP calls {session.calls}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        parse_key_statistics(html)
+    parse_ms = (time.perf_counter() - started) / args.rounds * 1000
+
+    problems = check_parser(html)
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        problems += check_provider(html, directory)
+
+    print(f"parse_key_statistics  : {parse_ms:8.3f} ms/page ({len(html) / 1024:.1f} KB fixture)")
+    for problem in problems:
+        print(f"CHECK FAILED: {problem}")
+    if problems:
+        raise SystemExit(1)
+    print("parser and fetch paths: ok")
+
+
+if __name__ == "__main__":
+    main()
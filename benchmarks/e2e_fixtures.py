@@ -0,0 +1,146 @@
+"""
+Fixture set for the offline end-to-end benchmark (benchmarks/fixtures/e2e).
+
+    python -m benchmarks.e2e_fixtures            # deterministic synthetic set (committed)
+    python -m benchmarks.bench_end_to_end --record --fixtures <dir>   # live recording instead
+
+Layout, read by benchmarks.replay:
+    manifest.json                          as_of date, seed, symbols, countries
+    yahoo/<SYMBOL>/info.json               yfinance Ticker.info
+    yahoo/<SYMBOL>/<statement>.csv         quarterly_financials, quarterly_balance_sheet, ...
+    prices/<SYMBOL>.csv                    daily OHLCV with a Date column
+    http/<sanitized url>.json              econdb CSV and Yahoo key-statistics responses
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_fundamental_batch import synthetic_statements
+from benchmarks.replay import DEFAULT_FIXTURES, KEY_STATISTICS_URL, ECONDB_URL, http_fixture_path, write_http_fixture
+from tools.macro_data import DEFAULT_SERIES
+
+AS_OF = "2025-06-30"
+SYMBOLS = {
+    "NVDA": ("NVIDIA Corporation", "NMS", "United States", "Technology", "Semiconductors", 150.0),
+    "AAPL": ("Apple Inc.", "NMS", "United States", "Technology", "Consumer Electronics", 200.0),
+    "MSFT": ("Microsoft Corporation", "NMS", "United States", "Technology", "Software - Infrastructure", 450.0),
+    "BBCA.JK": ("PT Bank Central Asia Tbk", "JKT", "Indonesia", "Financial Services", "Banks - Regional", 9000.0),
+    "BBRI.JK": ("PT Bank Rakyat Indonesia (Persero) Tbk", "JKT", "Indonesia", "Financial Services",
+                "Banks - Regional", 4000.0),
+    "7203.T": ("Toyota Motor Corporation", "JPX", "Japan", "Consumer Cyclical", "Auto Manufacturers", 2800.0),
+    "VOD.L": ("Vodafone Group Public Limited Company", "LSE", "United Kingdom", "Communication Services",
+              "Telecom Services", 70.0),
+}
+COUNTRIES = {"US": "United States", "ID": "Indonesia", "JP": "Japan", "UK": "United Kingdom"}
+PRICE_BARS = 800
+STATEMENT_QUARTERS = 8
+SERIES_MONTHS = 20 * 12
+VALUATION_ROWS = ["Market Cap", "Enterprise Value", "Trailing P/E", "Forward P/E", "PEG Ratio (5yr expected)",
+                  "Price/Sales", "Price/Book", "Enterprise Value/Revenue", "Enterprise Value/EBITDA"]
+# Halaman Yahoo asli ~1 MB; blok pengisi membuat biaya parsing mendekati halaman sebenarnya
+PAGE_FILLER_BLOCKS = 1500
+
+
+def price_frame(start_price: float, rng) -> pd.DataFrame:
+    index = pd.bdate_range(end=AS_OF, periods=PRICE_BARS)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0004, 0.018, PRICE_BARS)))
+    spread = np.abs(rng.normal(0, 0.008, PRICE_BARS)) * close
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.004, PRICE_BARS)),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, PRICE_BARS).astype(float),
+    }, index=pd.Index(index, name="Date"))
+
+
+def info(symbol: str, prices: pd.DataFrame, rng) -> dict:
+    name, exchange, country, sector, industry, _ = SYMBOLS[symbol]
+    price = float(prices["Close"].iloc[-1])
+    shares = float(rng.uniform(1e9, 2.5e10))
+    return {
+        "symbol": symbol, "shortName": name, "longName": name, "exchange": exchange, "country": country,
+        "sector": sector, "industry": industry, "currency": "USD" if country == "United States" else "LCL",
+        "regularMarketPrice": price, "marketCap": price * shares, "sharesOutstanding": shares,
+        "trailingPE": float(rng.uniform(8, 60)), "forwardPE": float(rng.uniform(8, 45)),
+        "priceToBook": float(rng.uniform(1, 40)), "priceToSalesTrailing12Months": float(rng.uniform(1, 25)),
+        "debtToEquity": float(rng.uniform(10, 180)), "currentRatio": float(rng.uniform(0.8, 3)),
+        "quickRatio": float(rng.uniform(0.5, 2.5)), "returnOnEquity": float(rng.uniform(0.05, 0.6)),
+        "returnOnAssets": float(rng.uniform(0.01, 0.25)), "grossMargins": float(rng.uniform(0.2, 0.75)),
+        "operatingMargins": float(rng.uniform(0.1, 0.5)), "profitMargins": float(rng.uniform(0.05, 0.45)),
+        "revenueGrowth": float(rng.normal(0.1, 0.1)), "earningsGrowth": float(rng.normal(0.1, 0.2)),
+        "dividendYield": float(rng.uniform(0, 0.05)), "beta": float(rng.uniform(0.5, 2)),
+    }
+
+
+def key_statistics_html(symbol: str, quarters: list, rng) -> str:
+    header = "".join(f"<th>{q.month}/{q.day}/{q.year}</th>" for q in quarters)
+    rows = []
+    for measure in VALUATION_ROWS:
+        values = "".join(f"<td>{rng.uniform(1, 90):.2f}</td>" for _ in range(len(quarters) + 1))
+        rows.append(f"<tr><td>{measure}</td>{values}</tr>")
+    filler = "".join(f'<div class="c{i % 17}"><span>{symbol} news item {i}</span></div>'
+                     for i in range(PAGE_FILLER_BLOCKS))
+    return (f"<html><head><title>{symbol} key statistics</title></head><body>{filler}"
+            f"<table><thead><tr><th></th><th>Current</th>{header}</tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody></table></body></html>")
+
+
+def series_csv(code: str, rng) -> str:
+    dates = pd.date_range(end=AS_OF, periods=SERIES_MONTHS, freq="MS")
+    values = 100 + np.cumsum(rng.normal(0.2, 1.0, SERIES_MONTHS))
+    return pd.DataFrame({"Date": dates.strftime("%Y-%m-%d"), code: values.round(3)}).to_csv(index=False)
+
+
+def generate(directory: str = DEFAULT_FIXTURES, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    for sub in ("yahoo", "prices", "http"):
+        os.makedirs(os.path.join(directory, sub))
+
+    for index, (symbol, spec) in enumerate(SYMBOLS.items()):
+        prices = price_frame(spec[-1], rng)
+        prices.round(4).to_csv(os.path.join(directory, "prices", f"{symbol}.csv"))
+        symbol_dir = os.path.join(directory, "yahoo", symbol)
+        os.makedirs(symbol_dir)
+        with open(os.path.join(symbol_dir, "info.json"), "w", encoding="utf-8") as f:
+            json.dump(info(symbol, prices, rng), f, indent=1)
+        statements = synthetic_statements(index, STATEMENT_QUARTERS, rng)
+        for field, frame in statements.items():
+            frame.to_csv(os.path.join(symbol_dir, f"{field}.csv"))
+        annual = {"financials": statements["quarterly_financials"], "cashflow": statements["quarterly_cashflow"]}
+        for field, frame in annual.items():
+            frame.iloc[:, ::4].to_csv(os.path.join(symbol_dir, f"{field}.csv"))
+        quarters = list(statements["quarterly_financials"].columns[:5])
+        write_http_fixture(directory, KEY_STATISTICS_URL.format(ticker=symbol), {}, 200,
+                           {"Content-Type": "text/html"}, key_statistics_html(symbol, quarters, rng))
+
+    for country in COUNTRIES:
+        for prefix in DEFAULT_SERIES.values():
+            code = prefix + country
+            write_http_fixture(directory, ECONDB_URL.format(code=code), {"format": "csv"}, 200,
+                               {"Content-Type": "text/csv", "ETag": f'"{code}-{seed}"'}, series_csv(code, rng))
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"as_of": AS_OF, "seed": seed, "source": "synthetic", "symbols": list(SYMBOLS),
+                   "countries": COUNTRIES}, f, indent=1)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    directory = generate(args.fixtures, args.seed)
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+    print(f"wrote {directory} ({size / 1e6:.1f} MB); example: {http_fixture_path(directory, KEY_STATISTICS_URL.format(ticker='NVDA'), {})}")
+
+
+if __name__ == "__main__":
+    main()
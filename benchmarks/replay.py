@@ -0,0 +1,286 @@
+"""
+Record/replay stand-ins for the four upstreams the pipeline talks to, for offline benchmarks.
+
+    calls = install(DEFAULT_FIXTURES, work_dir, latency={"yahoo": 0.1, "econdb": 0.15})
+
+- yfinance metadata/statements: ReplayYahooCache (a YahooDataCache whose _fetch reads fixtures)
+- yfinance daily bars: ReplayPriceProvider behind a fresh PriceStore
+- econdb CSV and Yahoo key-statistics HTML: ReplaySession, a requests.Session stand-in used by
+  the real EconDBProvider and ValuationMeasuresProvider, so parsing and caching code still runs
+- OpenAI: benchmarks.stub_openai (not installed here)
+
+With record=True every call goes to the live service first and the answer is written to the
+fixture directory. Dated data is re-anchored so the latest bar / observation lands where it did
+relative to the fixture's `as_of` date, which keeps results independent of the day they run.
+"""
+import io
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlencode
+
+import pandas as pd
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from tools.macro_data import ECONDB_URL, EconDBProvider, MacroSeriesStore, set_macro_store
+from tools.price_store import OHLCV_COLUMNS, PriceStore, YFinanceProvider, normalize_ohlcv, set_price_store
+from tools.symbol_index import SymbolIndex, set_symbol_index
+from tools.valuation_measures import KEY_STATISTICS_URL, ValuationMeasuresProvider, set_valuation_provider
+from tools.yf_cache import YahooDataCache, set_yahoo_cache
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "e2e")
+# Parameter yang tidak ikut jadi kunci fixture (rahasia / berubah tiap panggilan)
+IGNORED_PARAMS = {"token"}
+
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+
+class UpstreamCalls:
+    """Thread-safe per-upstream call counters plus the fixtures that were asked for but missing."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.missing = []
+
+    def count(self, upstream: str, amount: int = 1):
+        with self._lock:
+            self.counts[upstream] = self.counts.get(upstream, 0) + amount
+
+    def miss(self, what: str):
+        with self._lock:
+            self.missing.append(what)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(sorted(self.counts.items()))
+
+
+def _cached(path: str, load):
+    """Fixture files are parsed once per process; callers get copies where mutation is possible."""
+    with _file_cache_lock:
+        if path in _file_cache:
+            return _file_cache[path]
+    value = load(path)
+    with _file_cache_lock:
+        _file_cache[path] = value
+    return value
+
+
+def load_manifest(directory: str) -> dict:
+    path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(path):
+        return {"as_of": pd.Timestamp.today().strftime("%Y-%m-%d"), "source": "empty"}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_key(url: str, params: dict = None) -> str:
+    params = {k: v for k, v in (params or {}).items() if k not in IGNORED_PARAMS}
+    full = url.split("://", 1)[-1] + ("?" + urlencode(sorted(params.items())) if params else "")
+    return re.sub(r"[^A-Za-z0-9.-]+", "_", full).strip("_")[:150]
+
+
+def http_fixture_path(directory: str, url: str, params: dict = None) -> str:
+    return os.path.join(directory, "http", fixture_key(url, params) + ".json")
+
+
+def write_http_fixture(directory: str, url: str, params: dict, status: int, headers: dict, body: str):
+    path = http_fixture_path(directory, url, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"url": url, "params": {k: v for k, v in params.items() if k not in IGNORED_PARAMS},
+                   "status": status, "headers": dict(headers), "body": body}, f)
+
+
+def _load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _response(url: str, status: int, headers: dict, body: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = (body or "").encode("utf-8")
+    response.encoding = "utf-8"
+    return response
+
+
+def shift_series_csv(body: str, months: int) -> str:
+    """Moves every Date of an econdb CSV `months` months forward (month starts stay month starts)."""
+    if not months or not body:
+        return body
+    frame = pd.read_csv(io.StringIO(body), parse_dates=["Date"])
+    frame["Date"] = (frame["Date"] + pd.DateOffset(months=months)).dt.strftime("%Y-%m-%d")
+    return frame.to_csv(index=False)
+
+
+class ReplaySession:
+    """
+    requests.Session stand-in: `get` answers from `<directory>/http/<url key>.json`. A request
+    carrying the recorded ETag in If-None-Match gets a 304, like econdb. Missing fixtures are
+    answered with 404 and reported through `calls.missing`.
+    """
+    def __init__(self, directory: str, calls: UpstreamCalls, latency: dict = None, record: bool = False,
+                 series_shift_months: int = 0):
+        self.directory = directory
+        self.calls = calls
+        self.latency = latency or {}
+        self.record = record
+        self.series_shift_months = series_shift_months
+        self.headers = {}
+        self._live = requests.Session() if record else None
+
+    @staticmethod
+    def upstream(url: str) -> str:
+        return "econdb" if "econdb.com" in url else "yahoo_html"
+
+    def get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        upstream = self.upstream(url)
+        self.calls.count(upstream)
+        params = dict(params or {})
+        path = http_fixture_path(self.directory, url, params)
+        if self.record:
+            live = self._live.get(url, params=params, headers={**self.headers, **(headers or {})}, timeout=timeout)
+            if live.status_code != 304:
+                write_http_fixture(self.directory, url, params, live.status_code,
+                                   {k: v for k, v in live.headers.items() if k in ("Content-Type", "ETag", "Last-Modified")},
+                                   live.text)
+            return live
+
+        time.sleep(self.latency.get(upstream, 0.0))
+        if not os.path.exists(path):
+            self.calls.miss(f"{upstream}: {fixture_key(url, params)}")
+            return _response(url, 404, {}, "")
+        recorded = _cached(path, _load_json)
+        etag = recorded["headers"].get("ETag")
+        if etag and (headers or {}).get("If-None-Match") == etag:
+            return _response(url, 304, recorded["headers"], "")
+        body = recorded["body"]
+        if upstream == "econdb" and self.series_shift_months:
+            body = _cached((path, self.series_shift_months), lambda key: shift_series_csv(recorded["body"], key[1]))
+        return _response(url, recorded["status"], recorded["headers"], body)
+
+
+class ReplayYahooCache(YahooDataCache):
+    """YahooDataCache whose upstream is `<directory>/yahoo/<SYMBOL>/<field>.json|csv`."""
+    def __init__(self, directory: str, calls: UpstreamCalls, latency: float = 0.0, record: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.calls = calls
+        self.latency = latency
+        self.record = record
+
+    def _path(self, symbol: str, field: str) -> str:
+        suffix = "json" if field == "info" else "csv"
+        return os.path.join(self.directory, "yahoo", symbol.strip().upper(), f"{field}.{suffix}")
+
+    def _fetch(self, symbol: str, field: str, **kwargs):
+        self.calls.count(f"yahoo.{field}")
+        path = self._path(symbol, field)
+        if self.record:
+            value = super()._fetch(symbol, field, **kwargs)
+            self._save(path, value)
+            return value
+
+        time.sleep(self.latency)
+        if not os.path.exists(path):
+            self.calls.miss(f"yahoo.{field}: {symbol}")
+            return {} if field == "info" else pd.DataFrame()
+        if field == "info":
+            return dict(_cached(path, _load_json))
+        return _cached(path, self._load_frame).copy()
+
+    @staticmethod
+    def _load_frame(path: str) -> pd.DataFrame:
+        frame = pd.read_csv(path, index_col=0)
+        if os.path.basename(path).startswith("history"):
+            frame.index = pd.to_datetime(frame.index)
+        else:
+            frame.columns = pd.to_datetime(frame.columns)
+        return frame
+
+    @staticmethod
+    def _save(path: str, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(value, dict):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(value, f, indent=1, default=str)
+        elif isinstance(value, pd.DataFrame):
+            value.to_csv(path)
+
+
+class ReplayPriceProvider:
+    """
+    PriceStore provider over `<directory>/prices/<SYMBOL>.csv`. The recorded bars are re-indexed
+    so the last one falls on the latest business day, i.e. "1y" always means the same bars.
+    """
+    def __init__(self, directory: str, calls: UpstreamCalls, latency: float = 0.0, record: bool = False):
+        self.directory = directory
+        self.calls = calls
+        self.latency = latency
+        self.record = record
+        self._live = YFinanceProvider() if record else None
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, "prices", f"{symbol.strip().upper()}.csv")
+
+    @staticmethod
+    def _load(path: str) -> pd.DataFrame:
+        data = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        last_bday = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=1)[0]
+        data.index = pd.bdate_range(end=last_bday, periods=len(data), name="Date")
+        return data
+
+    def fetch(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        self.calls.count("yahoo.prices")
+        path = self._path(symbol)
+        if self.record:
+            data = self._live.fetch(symbol, start, end)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                stored = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+                data = pd.concat([stored, data])
+                data = data[~data.index.duplicated(keep="last")].sort_index()
+            data.to_csv(path, index_label="Date")
+            return data.loc[(data.index >= start) & (data.index < end)]
+
+        time.sleep(self.latency)
+        if not os.path.exists(path):
+            self.calls.miss(f"yahoo.prices: {symbol}")
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        data = normalize_ohlcv(_cached(path, self._load), symbol)
+        return data.loc[(data.index >= start) & (data.index < end)]
+
+
+def months_between(earlier: pd.Timestamp, later: pd.Timestamp) -> int:
+    return (later.year - earlier.year) * 12 + later.month - earlier.month
+
+
+def install(directory: str, work_dir: str, latency: dict = None, record: bool = False) -> UpstreamCalls:
+    """
+    Points the shared Yahoo cache, price store, macro store, valuation provider and symbol index
+    at fresh stand-ins (caches under `work_dir`). `latency` is per upstream in seconds:
+    yahoo, prices, econdb, yahoo_html.
+    """
+    latency = latency or {}
+    calls = UpstreamCalls()
+    manifest = load_manifest(directory)
+    shift = 0 if record else months_between(pd.Timestamp(manifest["as_of"]), pd.Timestamp.today())
+    os.makedirs(work_dir, exist_ok=True)
+
+    yahoo = ReplayYahooCache(directory, calls, latency.get("yahoo", 0.0), record)
+    set_yahoo_cache(yahoo)
+    set_price_store(PriceStore(os.path.join(work_dir, "prices.sqlite"),
+                               provider=ReplayPriceProvider(directory, calls, latency.get("prices", 0.0), record)))
+    session = ReplaySession(directory, calls, latency, record, series_shift_months=shift)
+    set_macro_store(MacroSeriesStore(EconDBProvider(session=session), cache_dir=os.path.join(work_dir, "econdb")))
+    set_valuation_provider(ValuationMeasuresProvider(cache_dir=os.path.join(work_dir, "valuation"),
+                                                     use_browser_fallback=False, session=session))
+    set_symbol_index(SymbolIndex(learned_path=None))
+    return calls
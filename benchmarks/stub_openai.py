@@ -0,0 +1,186 @@
+"""
+Local OpenAI-compatible stub for offline benchmarks.
+
+Serves POST /v1/chat/completions (plain and `stream=True` server-sent events) and
+GET /v1/models/<id> with configurable latency:
+
+    with StubOpenAIServer(first_token_delay=0.3, token_delay=0.01) as stub:
+        registry = OpenAIClientRegistry(base_url=stub.url)
+
+`reply` decides the completion text from the request messages; the default is a fixed
+paragraph of `reply_tokens` words. When the request offers `tools`, `tool_call(request)` may
+return (tool name, arguments dict) to answer with a function call instead (crewai agents use
+native tool calling). Prompt and completion tokens are tallied with `token_counter`.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+
+def default_reply(messages: list, n_tokens: int = 120) -> str:
+    return " ".join(f"word{i}" for i in range(n_tokens))
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    calls = message.get("tool_calls") or []
+    return " ".join([str(content)] + [json.dumps(call.get("function", {})) for call in calls])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StubOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.count("models")
+        if self.path.startswith("/v1/models/"):
+            self._send_json(200, {"id": self.path.rsplit("/", 1)[-1], "object": "model", "owned_by": "stub"})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        stub.count("chat")
+        messages = request.get("messages", [])
+        model = request.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        prompt_tokens = sum(stub.token_counter(message_text(m)) for m in messages)
+        if request.get("tools"):
+            prompt_tokens += stub.token_counter(json.dumps(request["tools"]))
+        stub.count("prompt_tokens", prompt_tokens)
+
+        call = stub.tool_call(request) if request.get("tools") and stub.tool_call else None
+        time.sleep(stub.first_token_delay)
+        if call is not None:
+            self._send_tool_call(request, model, completion_id, prompt_tokens, *call)
+            return
+
+        words = stub.reply(messages).split(" ")
+        stub.count("completion_tokens", stub.token_counter(" ".join(words)))
+        if not request.get("stream"):
+            time.sleep(stub.token_delay * max(0, len(words) - 1))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(stub.token_delay)
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": None,
+                             "delta": {"role": "assistant", "content": word if i == 0 else " " + word}}],
+            }
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        final = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                 "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}
+        self._send_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_tool_call(self, request, model, completion_id, prompt_tokens, name, arguments):
+        stub = self.server.stub
+        stub.count("tool_calls")
+        call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)}}
+        completion_tokens = stub.token_counter(json.dumps(call["function"]))
+        stub.count("completion_tokens", completion_tokens)
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "tool_calls",
+                             "message": {"role": "assistant", "content": None, "tool_calls": [call]}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for delta, finish in [({"role": "assistant", "tool_calls": [{"index": 0, **call}]}, None), ({}, "tool_calls")]:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "finish_reason": finish, "delta": delta}]}
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+
+class StubOpenAIServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_delay: float = 0.3,
+                 token_delay: float = 0.01, reply: Callable[[list], str] = None, reply_tokens: int = 120,
+                 tool_call: Callable[[dict], Optional[tuple]] = None, token_counter: Callable[[str], int] = word_count):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.reply = reply or (lambda messages: default_reply(messages, reply_tokens))
+        self.tool_call = tool_call
+        self.token_counter = token_counter
+        self.requests = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, kind: str, amount: int = 1):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + amount
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,124 @@
+import os
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_STRATEGY = os.getenv("HISTORY_STRATEGY", "window")  # "window" atau "summarize"
+# Ringkasan baru dibuat kalau turn yang terbuang sudah cukup banyak, supaya tidak memanggil LLM tiap turn
+SUMMARIZE_MIN_TOKENS = int(os.getenv("HISTORY_SUMMARIZE_MIN_TOKENS", "500"))
+
+_encodings = {}
+
+
+def _encoding(model: str):
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        encoding = None
+    _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: dict, model: str = "gpt-3.5-turbo") -> int:
+    # ~4 token overhead per pesan untuk role dan pemisah pada format chat
+    return 4 + count_tokens(message.get("content") or "", model)
+
+
+class ConversationHistory:
+    """
+    Token-budgeted chat history for one agent.
+
+    The system prompt, the rolling summary (if any) and the newest message are always sent;
+    older turns are added newest-first while they fit in `max_tokens`. With the "summarize"
+    strategy, turns that fall out of the window are handed back by pop_evicted() so the agent
+    can fold them into `summary`.
+    """
+    def __init__(self, system_prompt: str, max_tokens: int = HISTORY_TOKEN_BUDGET,
+                 strategy: str = HISTORY_STRATEGY, model: str = "gpt-3.5-turbo"):
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.model = model
+        self.turns = []
+        self.summary = None
+        self._evicted = []
+        self.evicted_tokens = 0
+        self.last_sent_tokens = 0
+        self.last_saved_tokens = 0
+        self.total_saved_tokens = 0
+
+    def _with_tokens(self, role: str, content: str) -> dict:
+        message = {"role": role, "content": content}
+        return {"message": message, "tokens": message_tokens(message, self.model)}
+
+    def append(self, role: str, content: str):
+        self.turns.append(self._with_tokens(role, content))
+
+    def _head(self) -> list:
+        head = [self._with_tokens("system", self.system_prompt)]
+        if self.summary:
+            head.append(self._with_tokens("system", f"Summary of the earlier conversation:\n{self.summary}"))
+        return head
+
+    def build(self) -> list:
+        """Returns the messages to send and updates the token accounting."""
+        head = self._head()
+        used = sum(item["tokens"] for item in head)
+        # Ukuran kalau seluruh percakapan dikirim apa adanya (tanpa ringkasan)
+        full = head[0]["tokens"] + self.evicted_tokens + sum(item["tokens"] for item in self.turns)
+
+        kept = []
+        for index in range(len(self.turns) - 1, -1, -1):
+            item = self.turns[index]
+            if kept and used + item["tokens"] > self.max_tokens:
+                break
+            kept.append(item)
+            used += item["tokens"]
+        kept.reverse()
+
+        dropped = len(self.turns) - len(kept)
+        if dropped:
+            # Turn lama tidak pernah dikirim lagi, jadi dibuang dari memori juga
+            self.evicted_tokens += sum(item["tokens"] for item in self.turns[:dropped])
+            if self.strategy == "summarize":
+                self._evicted.extend(item["message"] for item in self.turns[:dropped])
+            self.turns = self.turns[dropped:]
+
+        self.last_sent_tokens = used
+        self.last_saved_tokens = max(full - used, 0)
+        self.total_saved_tokens += self.last_saved_tokens
+        return [item["message"] for item in head + kept]
+
+    def pop_evicted(self, min_tokens: int = SUMMARIZE_MIN_TOKENS) -> list:
+        """Evicted turns waiting to be summarized, once they add up to `min_tokens`."""
+        if sum(message_tokens(m, self.model) for m in self._evicted) < min_tokens:
+            return []
+        evicted, self._evicted = self._evicted, []
+        return evicted
+
+    def summary_prompt(self, evicted: list) -> list:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+        previous = f"Existing summary:\n{self.summary}\n\n" if self.summary else ""
+        return [
+            {"role": "system", "content": "You compress chat transcripts into short factual summaries."},
+            {"role": "user", "content": (
+                f"{previous}Update the summary with these older turns. Keep tickers, countries, "
+                f"periods and conclusions; drop raw tables and numbers that are not conclusions.\n\n{transcript}"
+            )},
+        ]
+
+    def as_messages(self) -> list:
+        return [item["message"] for item in self._head() + self.turns]
@@ -1,27 +1,70 @@
 
+import asyncio
+import threading
+from contextlib import contextmanager
 from crewai import Agent, Crew, Task, Process
-from tools.fundamental_analysis import FundamentalAnalysisTool
-from tools.fundamental_analysis_quarter import FundamentalAnalysisQuarterlyTool
-from tools.technical_analysis import TechnicalAnalysisTool
-from tools.macroeconom_analysis import MacroeconomicTool
 import yaml
+from progress import crew_step_callback, crew_task_callback
+
+# intent -> (nama method agent, nama method task) untuk crew satu-agent per intent
+INTENT_CREWS = {
+    "fundamental_analysis": ("fundamental", "fundamental_task"),
+    "technical_analysis": ("technical_agent", "technical_task"),
+    "macro_outlook": ("macro", "macro_task"),
+}
+
 
 class FinancialCrew:
+    """
+    Agents, tools and tasks are built once per instance and reused; create one instance per
+    process. Per-request values are bound through kickoff inputs, which crewai interpolates
+    into the original task templates on every kickoff.
+    """
     def __init__(self, api_key: str):
         with open("config/agents.yaml", encoding="utf-8") as f:
             self.agents_config = yaml.safe_load(f)
         with open("config/tasks.yaml", encoding="utf-8") as f:
             self.tasks_config = yaml.safe_load(f)
+        self._built = {}
+        self._build_lock = threading.RLock()
+        self._idle_crews = {intent: [] for intent in INTENT_CREWS}
+        self._pool_lock = threading.Lock()
+        self._lent_templates = set()
+        # id(crew) -> Event yang di-set saat thread kickoff crew itu selesai
+        self._running = {}
+        self.crew_copies = 0
+        self.crews_discarded = 0
+
+    def _once(self, name, factory):
+        with self._build_lock:
+            if name not in self._built:
+                self._built[name] = factory()
+            return self._built[name]
 
     def fundamental(self) -> Agent:
+        return self._once("fundamental", self._new_fundamental)
+
+    def technical_agent(self) -> Agent:
+        return self._once("technical_agent", self._new_technical_agent)
+
+    def macro(self) -> Agent:
+        return self._once("macro", self._new_macro)
+
+    # Tool diimport di dalam method supaya modulnya (yfinance, pandas, scraper) baru dimuat
+    # saat intent yang membutuhkannya pertama kali dijalankan. Method _new_* selalu membuat
+    # objek baru; dipakai untuk template dan untuk crew tambahan di pool.
+    def _new_fundamental(self) -> Agent:
+        from tools.fundamental_analysis import PeerComparisonTool
+        from tools.fundamental_analysis_quarter import FundamentalAnalysisQuarterlyTool, FundamentalTrendTool
         return Agent(
-            config=self.agents_config['fundamental'],   
-            tools=[FundamentalAnalysisQuarterlyTool()],
+            config=self.agents_config['fundamental'],
+            tools=[FundamentalAnalysisQuarterlyTool(), FundamentalTrendTool(), PeerComparisonTool()],
             verbose=True,
             allow_delegation=False,
         )
 
-    def technical_agent(self) -> Agent:
+    def _new_technical_agent(self) -> Agent:
+        from tools.technical_analysis import TechnicalAnalysisTool
         return Agent(
             config=self.agents_config['technical'],
             tools=[TechnicalAnalysisTool()],
@@ -29,7 +72,8 @@ class FinancialCrew:
             allow_delegation=False,
         )
 
-    def macro(self) -> Agent:
+    def _new_macro(self) -> Agent:
+        from tools.macroeconom_analysis import MacroeconomicTool
         return Agent(
             config=self.agents_config['macro'],
             tools=[MacroeconomicTool()],
@@ -38,62 +82,140 @@ class FinancialCrew:
         )
 
     def summarizer(self) -> Agent:
-        return Agent(
+        return self._once("summarizer", lambda: Agent(
             config=self.agents_config['summarizer'],
             tools=[],
             verbose=True,
             allow_delegation=False,
-        )
+        ))
 
     def intent_router(self) -> Agent:
-        return Agent(
+        return self._once("intent_router", lambda: Agent(
             config=self.agents_config['intent_router'],
             tools=[],
             verbose=True,
             allow_delegation=False,
-        )
+        ))
 
     def conversational_agent(self) -> Agent:
-        return Agent(
+        return self._once("conversational_agent", lambda: Agent(
             config=self.agents_config['conversational_agent'],
             tools=[],
             verbose=True,
             allow_delegation=False,
-        )
+        ))
 
     # Tasks
     def macro_task(self) -> Task:
-        return Task(
+        return self._once("macro_task", lambda: Task(
             config=self.tasks_config['macro_task'],
             agent=self.macro()
-        )
+        ))
 
     def technical_task(self) -> Task:
-        return Task(
+        return self._once("technical_task", lambda: Task(
             config=self.tasks_config['technical_task'],
             agent=self.technical_agent()
-        )
+        ))
 
     def fundamental_task(self) -> Task:
-        return Task(
+        return self._once("fundamental_task", lambda: Task(
             config=self.tasks_config['fundamental_task'],
             agent=self.fundamental()
-        )
+        ))
 
     def summarizer_task(self) -> Task:
-        return Task(
+        return self._once("summarizer_task", lambda: Task(
             config=self.tasks_config['summarizer_task'],
             agent=self.summarizer()
-        )
+        ))
 
     def intent_router_task(self) -> Task:
-        return Task(
+        return self._once("intent_router_task", lambda: Task(
             config=self.tasks_config['intent_router_task'],
             agent=self.intent_router()
+        ))
+
+    # Crews
+    def intent_crew(self, intent: str) -> Crew:
+        """Template crew for one intent; use acquire() to run it."""
+        agent_name, task_name = INTENT_CREWS[intent]
+        return self._once(f"crew:{intent}", lambda: self._new_intent_crew(
+            getattr(self, agent_name)(), getattr(self, task_name)()
+        ))
+
+    def _fresh_intent_crew(self, intent: str) -> Crew:
+        """
+        A crew built from new Agent/Task objects. crewai's Crew.copy() copies the task text as
+        last interpolated and not the original template, so a copy of a crew that has already
+        been kicked off would keep the previous request's ticker.
+        """
+        agent_name, task_name = INTENT_CREWS[intent]
+        agent = getattr(self, f"_new_{agent_name}")()
+        return self._new_intent_crew(agent, Task(config=self.tasks_config[task_name], agent=agent))
+
+    @staticmethod
+    def _new_intent_crew(agent: Agent, task: Task) -> Crew:
+        return Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True,
+            # Callback tetap; event diarahkan ke request yang sedang berjalan lewat progress sink
+            step_callback=crew_step_callback,
+            task_callback=crew_task_callback,
         )
 
+    @contextmanager
+    def acquire(self, intent: str):
+        """
+        Lends an idle crew for `intent`. A crew keeps run state during kickoff, so concurrent
+        requests for the same intent get a freshly built crew; those return to the pool too.
+        A crew whose kickoff thread is still running when the lease ends (the request timed out
+        or was cancelled) is dropped instead, so two kickoffs never share one crew.
+        """
+        with self._pool_lock:
+            idle = self._idle_crews[intent]
+            crew_obj = idle.pop() if idle else None
+        if crew_obj is None:
+            template = self.intent_crew(intent)
+            with self._pool_lock:
+                first_use = intent not in self._lent_templates
+                self._lent_templates.add(intent)
+                if not first_use:
+                    self.crew_copies += 1
+            crew_obj = template if first_use else self._fresh_intent_crew(intent)
+        try:
+            yield crew_obj
+        finally:
+            with self._pool_lock:
+                done = self._running.pop(id(crew_obj), None)
+                if done is None or done.is_set():
+                    self._idle_crews[intent].append(crew_obj)
+                else:
+                    # Tidak dikembalikan ke pool; request berikutnya memakai crew baru
+                    self.crews_discarded += 1
+                    print(f"[Crew] {intent} crew still running after its request ended; not reused")
+
+    async def kickoff(self, crew_obj: Crew, inputs: dict):
+        """
+        Runs `crew_obj.kickoff` in a worker thread (what crewai's kickoff_async does) and records
+        when that thread finishes, which acquire() checks before pooling the crew again.
+        """
+        done = threading.Event()
+        with self._pool_lock:
+            self._running[id(crew_obj)] = done
+
+        def run():
+            try:
+                return crew_obj.kickoff(inputs=inputs)
+            finally:
+                done.set()
+
+        return await asyncio.to_thread(run)
+
     def crew(self) -> Crew:
-        return Crew(
+        return self._once("crew", lambda: Crew(
             agents=[
                 self.intent_router(),
                 self.fundamental(),
@@ -111,4 +233,4 @@ class FinancialCrew:
             ],
             process=Process.sequential,
             verbose=True
-        )
+        ))
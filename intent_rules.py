@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+
+from tools.countries import COUNTRY_LIST
+from tools.symbol_index import get_symbol_index
+
+# Di bawah ambang ini prompt tetap dikirim ke LLM intent router
+RULES_MIN_CONFIDENCE = float(os.getenv("ROUTER_RULES_MIN_CONFIDENCE", "0.8"))
+
+INTENT_KEYWORDS = {
+    "technical_analysis": [
+        "technical", "technicals", "rsi", "macd", "bollinger", "moving average", "ema", "sma", "stochastic", "atr",
+        "obv", "fibonacci", "support", "resistance", "breakout", "momentum", "candlestick", "chart",
+        "price action", "overbought", "oversold",
+    ],
+    "fundamental_analysis": [
+        "fundamental", "fundamentals", "earnings", "eps", "revenue", "p/e", "pe ratio", "valuation", "balance sheet",
+        "income statement", "cash flow", "cashflow", "dcf", "roe", "roa", "margin", "margins", "debt to equity",
+        "dividend", "dividends", "financials", "profitability", "quarterly report",
+    ],
+    "macro_outlook": [
+        "macro", "macroeconomic", "gdp", "inflation", "cpi", "unemployment", "economy", "economic", "economics",
+        "interest rate",
+    ],
+}
+
+# Keyword yang dikembalikan di entitas "keyword" (indikator/metrik spesifik)
+METRIC_KEYWORDS = {
+    "rsi": "RSI", "macd": "MACD", "bollinger": "Bollinger Bands", "ema": "EMA", "stochastic": "Stochastic",
+    "atr": "ATR", "obv": "OBV", "fibonacci": "Fibonacci", "eps": "EPS", "p/e": "P/E", "roe": "ROE",
+    "roa": "ROA", "dcf": "DCF", "gdp": "GDP", "inflation": "Inflation", "cpi": "CPI",
+    "unemployment": "Unemployment",
+}
+
+# Token huruf besar yang bukan ticker
+NON_TICKERS = {
+    "I", "A", "AN", "AND", "OR", "THE", "FOR", "OF", "IN", "ON", "TO", "VS", "ME", "MY", "IS", "IT",
+    "RSI", "MACD", "EMA", "SMA", "MA", "ATR", "OBV", "EPS", "PE", "PB", "ROE", "ROA", "DCF", "GDP",
+    "CPI", "YTD", "YOY", "QOQ", "Q1", "Q2", "Q3", "Q4", "FY", "USD", "IDR", "TA", "FA", "AI", "CEO",
+    "US", "USA", "UK", "EU", "UAE", "OK", "PLEASE", "SHOW", "GIVE", "IMO", "IMHO", "FYI", "ETF", "ETFS", "IPO",
+    "ESG", "EV", "EBIT", "EBITDA", "FCF", "NAV", "AUM", "SEC", "FED", "ECB", "BI", "DMA",
+}
+
+CONVERSATION_CUES = ["what is", "what's a", "explain", "why ", "how does", "how do", "difference between",
+                     "hello", "hi ", "thanks", "thank you", "should i", "recommend"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december"]
+RELATIVE_DATE_CUES = ["since", "last quarter", "previous quarter", "this quarter", "last year", "yesterday",
+                      "between", " until ", " till "]
+COUNTRY_ALIASES = {"usa": "United States", "u.s.": "United States", "america": "United States",
+                   "uk": "United Kingdom", "britain": "United Kingdom", "korea": "South Korea",
+                   "russia": "Russian Federation", "uae": "United Arab Emirates"}
+
+_TICKER_RE = re.compile(r"(?<![\w$.])\$?([A-Z0-9]{1,6}(?:[.\-][A-Z]{1,3})?)(?![\w])")
+_PERIOD_RE = re.compile(r"\b(\d{1,2})\s*-?\s*(d|days?|w|wks?|weeks?|mo|mos|months?|y|yrs?|years?)\b", re.I)
+# Angka sebelum nama indikator adalah jendela indikator ("50 day moving average", "14-day RSI"), bukan periode
+_INDICATOR_WINDOW_RE = re.compile(
+    r"\s*(?:simple\s+|exponential\s+)?(?:moving\s+averages?|ma|sma|ema|dma|rsi|atr|macd|high|low|average|window)\b",
+    re.I,
+)
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d{2})\b")
+_QUARTER_RE = re.compile(r"\b(?:q([1-4])|quarter\s*([1-4])|([1-4])(?:st|nd|rd|th)\s+quarter|(first|second|third|fourth)\s+quarter)\b", re.I)
+_ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_COUNTRY_PATTERNS = [
+    (re.compile(r"\b" + re.escape(name.lower()) + r"\b"), name)
+    for name in sorted([name for name, _ in COUNTRY_LIST] + list(COUNTRY_ALIASES), key=len, reverse=True)
+]
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+
+class RuleRoute:
+    def __init__(self, intents: list, confidence: float, reasons: list):
+        self.intents = intents
+        self.confidence = confidence
+        self.reasons = reasons
+
+    @property
+    def confident(self) -> bool:
+        return bool(self.intents) and self.confidence >= RULES_MIN_CONFIDENCE
+
+    def as_router_output(self) -> dict:
+        return {"intents": self.intents}
+
+
+def _normalize_period(value: str, unit: str) -> str:
+    unit = unit.lower()
+    if unit.startswith("d"):
+        return f"{int(value)}d"
+    if unit.startswith("w"):
+        return f"{int(value)}wk"
+    if unit.startswith("m"):
+        return f"{int(value)}mo"
+    return f"{int(value)}y"
+
+
+def extract_period(prompt: str):
+    for match in _PERIOD_RE.finditer(prompt):
+        if _INDICATOR_WINDOW_RE.match(prompt, match.end()):
+            continue
+        return _normalize_period(*match.groups())
+    return None
+
+
+def extract_tickers(prompt: str) -> list:
+    tickers = []
+    for match in _TICKER_RE.finditer(prompt):
+        token = match.group(1)
+        if token in NON_TICKERS or not any(c.isalpha() for c in token):
+            continue
+        if len(token) == 1 and not match.group(0).startswith("$"):
+            continue
+        if _YEAR_RE.fullmatch(token):
+            continue
+        if token not in tickers:
+            tickers.append(token)
+    return tickers
+
+
+def extract_countries(prompt: str) -> list:
+    text = prompt.lower()
+    countries = []
+    for pattern, name in _COUNTRY_PATTERNS:
+        if pattern.search(text):
+            canonical = COUNTRY_ALIASES.get(name, name)
+            if canonical not in countries:
+                countries.append(canonical)
+            text = pattern.sub(" ", text)
+    return countries
+
+
+def extract_quarter(prompt: str):
+    match = _QUARTER_RE.search(prompt)
+    if not match:
+        return None
+    for group in match.groups():
+        if group:
+            return _ORDINALS.get(group.lower()) or int(group)
+    return None
+
+
+def route_by_rules(prompt: str) -> RuleRoute:
+    """
+    Local pattern-based intent routing. Returns the same {"intents": [...]} structure as the LLM
+    intent router plus a confidence score; callers fall back to the LLM when it is too low.
+    """
+    text = f" {prompt.lower()} "
+    reasons = []
+    confidence = 1.0
+
+    detected = [
+        intent for intent, keywords in INTENT_KEYWORDS.items()
+        if any(re.search(r"\b" + re.escape(k) + r"\b", text) for k in keywords)
+    ]
+    if not detected:
+        return RuleRoute([], 0.0, ["no analysis keyword"])
+
+    tickers = extract_tickers(prompt)
+    # Hanya cek tabel lokal (tanpa jaringan); token yang tidak dikenal diserahkan ke LLM router
+    index = get_symbol_index()
+    unknown = [ticker for ticker in tickers if index.get(ticker) is None]
+    if unknown:
+        confidence -= 0.5
+        reasons.append(f"unknown ticker {', '.join(unknown)}")
+    countries = extract_countries(prompt)
+    keywords = [label for key, label in METRIC_KEYWORDS.items() if re.search(r"\b" + re.escape(key) + r"\b", text)]
+
+    period = extract_period(prompt)
+    if period is None and ("ytd" in text or "year to date" in text):
+        period = "ytd"
+
+    dates = _ISO_DATE_RE.findall(prompt)
+    start_date, end_date = (dates[0], dates[1]) if len(dates) >= 2 else (None, None)
+    if len(dates) == 1:
+        confidence -= 0.3
+        reasons.append("single date without range")
+
+    years = _YEAR_RE.findall(" ".join(_ISO_DATE_RE.sub(" ", prompt).split()))
+    year = int(years[0]) if years else None
+    quarter = extract_quarter(prompt)
+    if len(set(years)) > 1:
+        confidence -= 0.3
+        reasons.append("several years mentioned")
+
+    if any(month in text for month in MONTHS) and not (start_date and end_date):
+        confidence -= 0.4
+        reasons.append("month names need date resolution")
+    if any(cue in text for cue in RELATIVE_DATE_CUES):
+        confidence -= 0.4
+        reasons.append("relative date phrase")
+    letters = [c for c in prompt if c.isalpha()]
+    if letters and sum(c.isupper() for c in letters) / len(letters) > 0.8:
+        confidence -= 0.4
+        reasons.append("all-caps prompt, tickers ambiguous")
+    if any(cue in text for cue in CONVERSATION_CUES):
+        confidence -= 0.3
+        reasons.append("conversational phrasing")
+
+    intents = []
+    for intent in detected:
+        base = {"ticker": None, "country": None, "period": None, "start_date": None, "end_date": None,
+                "keyword": keywords or None, "year": None, "quarter": None}
+        if intent == "technical_analysis":
+            if not tickers:
+                confidence -= 0.5
+                reasons.append("technical intent without ticker")
+            for ticker in tickers:
+                entities = dict(base, ticker=ticker)
+                if start_date and end_date:
+                    entities.update(start_date=start_date, end_date=end_date)
+                elif year is not None and period is None:
+                    # Satu tahun kalender: 1 Jan s/d 1 Jan tahun berikutnya (end_date eksklusif)
+                    entities.update(start_date=f"{year}-01-01", end_date=f"{year + 1}-01-01")
+                else:
+                    entities["period"] = period
+                intents.append({"intent": intent, "entities": entities})
+        elif intent == "fundamental_analysis":
+            if not tickers:
+                confidence -= 0.5
+                reasons.append("fundamental intent without ticker")
+            if quarter is not None and year is None:
+                confidence -= 0.2
+                reasons.append("quarter without year")
+            for ticker in tickers:
+                intents.append({"intent": intent, "entities": dict(base, ticker=ticker, year=year, quarter=quarter)})
+        else:
+            if countries:
+                for country in countries:
+                    intents.append({"intent": intent, "entities": dict(base, country=country)})
+            elif tickers:
+                for ticker in tickers:
+                    intents.append({"intent": intent, "entities": dict(base, ticker=ticker)})
+            else:
+                confidence -= 0.5
+                reasons.append("macro intent without country or ticker")
+
+    if len(detected) > 1 and len(tickers) > 1:
+        # Tiap intent akan dipasangkan dengan tiap ticker; "technical AAPL, fundamentals MSFT"
+        # butuh pemasangan yang hanya bisa dibaca LLM router
+        confidence -= 0.5
+        reasons.append("several intents and several tickers, pairing ambiguous")
+    if len(detected) == 1 and detected[0] != "macro_outlook" and countries and not tickers:
+        confidence -= 0.3
+        reasons.append("country given for a company analysis")
+
+    return RuleRoute(intents, max(confidence, 0.0), reasons)
+
+
+class RouterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rule_hits = 0
+        self.llm_fallbacks = 0
+
+    def record(self, used_rules: bool):
+        with self._lock:
+            if used_rules:
+                self.rule_hits += 1
+            else:
+                self.llm_fallbacks += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            total = self.rule_hits + self.llm_fallbacks
+            return {
+                "rule_hits": self.rule_hits,
+                "llm_fallbacks": self.llm_fallbacks,
+                "hit_rate": self.rule_hits / total if total else 0.0,
+            }
+
+
+router_stats = RouterStats()
+
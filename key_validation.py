@@ -0,0 +1,146 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from llm_clients import get_client_registry
+
+KEY_VALIDATION_TTL_SECONDS = float(os.getenv("KEY_VALIDATION_TTL_SECONDS", "3600"))
+KEY_VALIDATION_TIMEOUT_SECONDS = float(os.getenv("KEY_VALIDATION_TIMEOUT_SECONDS", "10"))
+# Model kecil yang diambil metadata-nya; 404 tetap berarti key lolos autentikasi
+KEY_VALIDATION_MODEL = os.getenv("KEY_VALIDATION_MODEL", "gpt-3.5-turbo")
+
+
+def looks_like_openai_key(api_key: str) -> bool:
+    return bool(api_key) and api_key.startswith("sk-") and len(api_key) > 20
+
+
+class KeyValidator:
+    """
+    Checks OpenAI API keys with a single model lookup instead of listing the whole catalog.
+
+    Positive results are cached per HMAC of the key with a per-process random salt (or
+    KEY_VALIDATION_SALT), so the plain key is never stored. Negative results are not cached,
+    so a key that was just activated is accepted on the next try.
+    """
+    def __init__(self, registry=None, ttl: float = KEY_VALIDATION_TTL_SECONDS,
+                 timeout: float = KEY_VALIDATION_TIMEOUT_SECONDS, model: str = KEY_VALIDATION_MODEL,
+                 salt: bytes = None, max_workers: int = 4, max_samples: int = 1000):
+        self.registry = registry
+        self.ttl = ttl
+        self.timeout = timeout
+        self.model = model
+        self._salt = salt or os.getenv("KEY_VALIDATION_SALT", "").encode() or os.urandom(16)
+        self._valid_until = {}
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="key-validation")
+        self.cache_hits = 0
+        self.checks = 0
+        self.latencies = deque(maxlen=max_samples)
+
+    def _key(self, api_key: str) -> str:
+        return hmac.new(self._salt, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def cached(self, api_key: str) -> bool:
+        key = self._key(api_key)
+        with self._lock:
+            valid_until = self._valid_until.get(key)
+            if valid_until is None:
+                return False
+            if valid_until < time.monotonic():
+                del self._valid_until[key]
+                return False
+            self.cache_hits += 1
+            return True
+
+    def _check(self, api_key: str) -> bool:
+        from openai import AuthenticationError, PermissionDeniedError, NotFoundError
+
+        registry = self.registry or get_client_registry()
+        client = registry.get(api_key).with_options(max_retries=0, timeout=self.timeout)
+        started = time.perf_counter()
+        try:
+            client.models.retrieve(self.model)
+            valid = True
+        except NotFoundError:
+            valid = True
+        except (AuthenticationError, PermissionDeniedError) as e:
+            print("[API KEY INVALID]", str(e))
+            valid = False
+        finally:
+            with self._lock:
+                self.checks += 1
+                self.latencies.append(time.perf_counter() - started)
+
+        if valid:
+            with self._lock:
+                self._valid_until[self._key(api_key)] = time.monotonic() + self.ttl
+        return valid
+
+    def validate(self, api_key: str) -> bool:
+        """Blocking check. Network errors raise instead of being reported as an invalid key."""
+        if not looks_like_openai_key(api_key):
+            return False
+        if self.cached(api_key):
+            return True
+        return self._check(api_key)
+
+    def submit(self, api_key: str) -> Future:
+        """
+        Starts validation in the background and returns a Future[bool]. Calls for the same key
+        while a check is running share that check.
+        """
+        if not looks_like_openai_key(api_key) or self.cached(api_key):
+            future = Future()
+            future.set_result(looks_like_openai_key(api_key))
+            return future
+        key = self._key(api_key)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._check, api_key)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            checks, cache_hits = self.checks, self.cache_hits
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "checks": checks,
+            "cache_hits": cache_hits,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95)},
+        }
+
+
+_default_validator = None
+_default_validator_lock = threading.Lock()
+
+
+def get_key_validator() -> KeyValidator:
+    global _default_validator
+    with _default_validator_lock:
+        if _default_validator is None:
+            _default_validator = KeyValidator()
+        return _default_validator
+
+
+def set_key_validator(validator: KeyValidator):
+    global _default_validator
+    with _default_validator_lock:
+        _default_validator = validator
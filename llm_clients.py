@@ -0,0 +1,207 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from typing import TYPE_CHECKING
+
+import httpx
+
+import tracing
+
+if TYPE_CHECKING:
+    # openai (~1 detik saat import) baru dimuat ketika client pertama dibuat
+    from openai import OpenAI, AsyncOpenAI
+
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "900"))
+
+
+class ClientMetrics:
+    """
+    Counts HTTP requests and newly opened TCP connections (via the httpcore trace extension)
+    plus per-call latencies, so connection reuse can be measured.
+    """
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.latencies = deque(maxlen=max_samples)
+        self.first_tokens = deque(maxlen=max_samples)
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.started":
+            with self._lock:
+                self.new_connections += 1
+
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def aon_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._atrace
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def observe_first_token(self, seconds: float):
+        with self._lock:
+            self.first_tokens.append(seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            requests, new_connections = self.requests, self.new_connections
+            latencies = sorted(self.latencies)
+            first_tokens = sorted(self.first_tokens)
+
+        def percentile(p, samples=latencies):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "requests": requests,
+            "new_connections": new_connections,
+            "reuse_rate": (1 - new_connections / requests) if requests else None,
+            "latency_ms": {
+                "count": len(latencies),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+            },
+            "first_token_ms": {
+                "count": len(first_tokens),
+                "p50": percentile(0.5, first_tokens),
+                "p95": percentile(0.95, first_tokens),
+            },
+        }
+
+
+class _Entry:
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class OpenAIClientRegistry:
+    """
+    Reuses one OpenAI client (and its keep-alive connection pool) per API key across turns and
+    sessions. Clients unused for `idle_seconds` are closed. Async clients belong to the event loop
+    that created them, so they are only used from the pipeline's shared loop.
+    """
+    def __init__(self, max_connections: int = LLM_POOL_MAX_CONNECTIONS,
+                 max_keepalive: int = LLM_POOL_MAX_KEEPALIVE,
+                 keepalive_expiry: float = LLM_POOL_KEEPALIVE_EXPIRY,
+                 timeout: float = LLM_TIMEOUT_SECONDS,
+                 idle_seconds: float = LLM_CLIENT_IDLE_SECONDS,
+                 base_url: str = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.metrics = ClientMetrics()
+        self._clients = {}
+        self._async_clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+    def get(self, api_key: str) -> "OpenAI":
+        key = self._key(api_key)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                with tracing.span("llm.client_create", kind="sync"):
+                    from openai import OpenAI
+                    http_client = httpx.Client(
+                        limits=self.limits,
+                        timeout=self.timeout,
+                        event_hooks={"request": [self.metrics.on_request]},
+                    )
+                    entry = _Entry(OpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client))
+                self._clients[key] = entry
+            entry.last_used = time.monotonic()
+        self.close_idle()
+        return entry.client
+
+    def get_async(self, api_key: str) -> "AsyncOpenAI":
+        key = self._key(api_key)
+        with self._lock:
+            entry = self._async_clients.get(key)
+            if entry is None:
+                with tracing.span("llm.client_create", kind="async"):
+                    from openai import AsyncOpenAI
+                    http_client = httpx.AsyncClient(
+                        limits=self.limits,
+                        timeout=self.timeout,
+                        event_hooks={"request": [self.metrics.aon_request]},
+                    )
+                    entry = _Entry(AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client))
+                self._async_clients[key] = entry
+            entry.last_used = time.monotonic()
+        self.close_idle()
+        return entry.client
+
+    def close_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [k for k, e in self._clients.items() if e.last_used < cutoff]
+            idle_sync = [self._clients.pop(k).client for k in idle]
+            idle = [k for k, e in self._async_clients.items() if e.last_used < cutoff]
+            idle_async = [self._async_clients.pop(k).client for k in idle]
+        for client in idle_sync:
+            client.close()
+        if idle_async:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            for client in idle_async:
+                if loop is not None:
+                    loop.create_task(client.close())
+
+    def observe(self, seconds: float):
+        self.metrics.observe(seconds)
+
+    def observe_first_token(self, seconds: float):
+        self.metrics.observe_first_token(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = len(self._clients) + len(self._async_clients)
+        return {"clients": clients, **self.metrics.summary()}
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> OpenAIClientRegistry:
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = OpenAIClientRegistry()
+        return _default_registry
+
+
+def set_client_registry(registry: OpenAIClientRegistry):
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = registry
@@ -0,0 +1,652 @@
+import os
+import json
+import asyncio
+import time
+import queue
+import threading
+from typing import TYPE_CHECKING
+from llm_clients import get_client_registry
+from intent_rules import route_by_rules, router_stats
+from chat_history import ConversationHistory, HISTORY_TOKEN_BUDGET, HISTORY_STRATEGY
+from tools.yf_cache import get_yahoo_cache
+from tools.symbol_index import get_symbol_index
+from tools.countries import get_country_code
+from response_cache import get_response_cache
+from progress import ProgressEvent, emit, intent_scope, progress_sink, token_emitter
+import tracing
+
+if TYPE_CHECKING:
+    # crewai dan tools baru dimuat ketika ada intent yang butuh crew
+    from crew import FinancialCrew
+    from crewai import Crew
+
+INTENT_MAX_WORKERS = int(os.getenv("INTENT_MAX_WORKERS", "3"))
+INTENT_TIMEOUT_SECONDS = float(os.getenv("INTENT_TIMEOUT_SECONDS", "180"))
+ROUTER_STATELESS = os.getenv("ROUTER_STATELESS", "1") != "0"
+ALLOWED_INTENTS = ["fundamental_analysis", "technical_analysis", "macro_outlook"]
+
+
+class GenericChatAgent:
+    def __init__(self, agent_config, api_key=None, model="gpt-3.5-turbo", name=None, stateless=False,
+                 max_history_tokens=HISTORY_TOKEN_BUDGET, history_strategy=HISTORY_STRATEGY):
+        self.agent_config = agent_config
+        self.api_key = api_key
+        self.model = model
+        self.name = name or agent_config.get('role', 'agent')
+        self.stateless = stateless
+        self.system_prompt = f"Role: {agent_config.get('role', '')}\nGoal: {agent_config.get('goal', '')}\nBackstory: {agent_config.get('backstory', '')}\nInstructions: {agent_config.get('prompt', '')}"
+        self.history = ConversationHistory(self.system_prompt, max_tokens=max_history_tokens,
+                                           strategy=history_strategy, model=model)
+        # Ringkasan history berjalan di background setelah balasan dikirim
+        self._summary_job = None
+        self._summary_task = None
+
+    def _messages_for(self, user_prompt):
+        if self.stateless:
+            return [{"role": "system", "content": self.system_prompt}, {"role": "user", "content": user_prompt}]
+        self.history.append("user", user_prompt)
+        messages = self.history.build()
+        print(f"[History] {self.name}: sent ~{self.history.last_sent_tokens} tokens, "
+              f"saved {self.history.last_saved_tokens} (total saved {self.history.total_saved_tokens})")
+        return messages
+
+    def _remember(self, reply):
+        if not self.stateless:
+            self.history.append("assistant", reply)
+
+    def _llm_span(self, messages, streaming):
+        return tracing.span("llm.chat", **{"gen_ai.system": "openai", "gen_ai.request.model": self.model,
+                                           "agent": self.name, "stream": streaming, "messages": len(messages)})
+
+    @staticmethod
+    def _record_usage(llm_span, response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            llm_span.set("gen_ai.usage.input_tokens", usage.prompt_tokens)
+            llm_span.set("gen_ai.usage.output_tokens", usage.completion_tokens)
+
+    def _record_stream(self, llm_span, messages, reply):
+        # Stream tidak membawa usage; token dihitung lokal hanya saat tracing aktif
+        if tracing.enabled():
+            from chat_history import count_tokens
+            llm_span.set("gen_ai.usage.input_tokens", sum(count_tokens(str(m.get("content", "")), self.model) for m in messages))
+            llm_span.set("gen_ai.usage.output_tokens", count_tokens(reply, self.model))
+
+    def _complete(self, client, messages, on_token, started):
+        with self._llm_span(messages, on_token is not None) as llm_span:
+            if on_token is None:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                )
+                self._record_usage(llm_span, response)
+                return response.choices[0].message.content
+            parts = []
+            for chunk in client.chat.completions.create(model=self.model, messages=messages, stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not parts:
+                        get_client_registry().observe_first_token(time.perf_counter() - started)
+                        llm_span.set("first_token_ms", round((time.perf_counter() - started) * 1000, 1))
+                    parts.append(delta)
+                    on_token(delta)
+            reply = "".join(parts)
+            self._record_stream(llm_span, messages, reply)
+            return reply
+
+    async def _acomplete(self, client, messages, on_token, started):
+        with self._llm_span(messages, on_token is not None) as llm_span:
+            if on_token is None:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                )
+                self._record_usage(llm_span, response)
+                return response.choices[0].message.content
+            parts = []
+            async for chunk in await client.chat.completions.create(model=self.model, messages=messages, stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not parts:
+                        get_client_registry().observe_first_token(time.perf_counter() - started)
+                        llm_span.set("first_token_ms", round((time.perf_counter() - started) * 1000, 1))
+                    parts.append(delta)
+                    on_token(delta)
+            reply = "".join(parts)
+            self._record_stream(llm_span, messages, reply)
+            return reply
+
+    def query(self, user_prompt, on_token=None):
+        """
+        Chat completion with history. With `on_token`, the reply is streamed and every text
+        delta is passed to it as it arrives; the full reply is returned either way.
+        """
+        if not user_prompt:
+            return "Ask something..."
+        registry = get_client_registry()
+        client = registry.get(self.api_key)
+        messages = self._messages_for(user_prompt)
+        started = time.perf_counter()
+        try:
+            reply = self._complete(client, messages, on_token, started)
+        except Exception as e:
+            reply = f"Error: {str(e)}"
+        registry.observe(time.perf_counter() - started)
+        self._remember(reply)
+        evicted = self.history.pop_evicted()
+        if evicted:
+            # Diringkas setelah balasan dikembalikan; turn berikutnya memakai ringkasan yang sudah ada
+            previous = self._summary_job
+            self._summary_job = threading.Thread(
+                target=self._summarize, args=(client, evicted, previous), name="history-summary", daemon=True
+            )
+            self._summary_job.start()
+        return reply
+
+    def _summarize(self, client, evicted, previous):
+        if previous is not None:
+            previous.join()
+        try:
+            with tracing.span("llm.history_summary", **{"gen_ai.request.model": self.model, "agent": self.name}) as llm_span:
+                response = client.chat.completions.create(model=self.model, messages=self.history.summary_prompt(evicted))
+                self._record_usage(llm_span, response)
+            self.history.summary = response.choices[0].message.content
+        except Exception as e:
+            print(f"[History] {self.name}: summarization failed: {e}")
+
+    async def aquery(self, user_prompt, on_token=None):
+        if not user_prompt:
+            return "Ask something..."
+        registry = get_client_registry()
+        client = registry.get_async(self.api_key)
+        messages = self._messages_for(user_prompt)
+        started = time.perf_counter()
+        try:
+            reply = await self._acomplete(client, messages, on_token, started)
+        except Exception as e:
+            reply = f"Error: {str(e)}"
+        registry.observe(time.perf_counter() - started)
+        self._remember(reply)
+        evicted = self.history.pop_evicted()
+        if evicted:
+            self._summary_task = asyncio.get_running_loop().create_task(
+                self._asummarize(client, evicted, self._summary_task)
+            )
+        return reply
+
+    async def _asummarize(self, client, evicted, previous):
+        # Ringkasan sebelumnya harus selesai dulu supaya turn yang lebih baru dilipat di atasnya
+        if previous is not None and previous.get_loop() is asyncio.get_running_loop():
+            await asyncio.wait([previous])
+        try:
+            with tracing.span("llm.history_summary", **{"gen_ai.request.model": self.model, "agent": self.name}) as llm_span:
+                response = await client.chat.completions.create(model=self.model, messages=self.history.summary_prompt(evicted))
+                self._record_usage(llm_span, response)
+            self.history.summary = response.choices[0].message.content
+        except Exception as e:
+            print(f"[History] {self.name}: summarization failed: {e}")
+
+
+def initialize_agent(agent_name, agent_configs, api_key, model, **kwargs):
+    if agent_configs and agent_name in agent_configs:
+        agent_config = agent_configs[agent_name]
+        return GenericChatAgent(agent_config, api_key, model=model, name=agent_name, **kwargs)
+    return None
+
+
+class ChatSession:
+    """
+    Per-conversation state: the chat agents and the last detected intent.
+    """
+    def __init__(self, agent_configs, api_key, model="gpt-3.5-turbo"):
+        self.api_key = api_key
+        self.model = model
+        # Router cukup melihat prompt terbaru; riwayat JSON sebelumnya hanya menambah token
+        self.intent_router_agent = initialize_agent("intent_router", agent_configs, api_key, model=model,
+                                                    stateless=ROUTER_STATELESS)
+        self.fundamental_agent = initialize_agent("fundamental", agent_configs, api_key, model=model)
+        self.macro_agent = initialize_agent("macro", agent_configs, api_key, model=model)
+        self.summarizer_agent = initialize_agent("summarizer", agent_configs, api_key, model=model)
+        self.main_conversational_agent = initialize_agent("conversational_agent", agent_configs, api_key, model=model)
+        self.last_intent_data = None
+        self.last_trace_id = None
+
+
+class _EventLoopThread:
+    """
+    One long-lived event loop in a daemon thread. The sync facade submits coroutines to it,
+    so every Streamlit session shares the same loop instead of creating one per call.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="pipeline-loop", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+
+_loop_thread = None
+_loop_thread_lock = threading.Lock()
+
+
+def _shared_loop() -> _EventLoopThread:
+    global _loop_thread
+    with _loop_thread_lock:
+        if _loop_thread is None:
+            _loop_thread = _EventLoopThread()
+    return _loop_thread
+
+
+def run_sync(coro, timeout=None):
+    return _shared_loop().run(coro, timeout)
+
+
+# --- Validasi input (blocking, dipanggil lewat asyncio.to_thread di jalur async) ---
+
+@tracing.traced("validate.ticker")
+def is_valid_ticker(company_ticker):
+    # Indeks simbol lokal dulu; jaringan hanya untuk simbol yang belum dikenal
+    return get_symbol_index().is_valid(company_ticker)
+
+def is_valid_company(input_text):
+    info = get_symbol_index().resolve(input_text)
+    return info is not None and info.country is not None
+
+def ticker_not_found_message(company_ticker):
+    message = 'Ticker not found! please input the correct ticker name (Read Disclaimer).'
+    suggestions = get_symbol_index().suggest(company_ticker, limit=3)
+    if suggestions:
+        message += " Did you mean: " + ", ".join(f"{s.symbol} ({s.name})" for s in suggestions) + "?"
+    return message
+
+def is_valid_country(country_input):
+    return get_country_code(country_input) is not None
+
+@tracing.traced("validate.macro_input")
+def is_valid_macro_input(input_text):
+    return is_valid_country(input_text) or is_valid_company(input_text)
+
+@tracing.traced("validate.latest_quarter")
+def find_latest_quarter(ticker):
+    qfin = get_yahoo_cache().quarterly_financials(ticker)
+    if qfin.empty:
+        return None, None
+    latest = max(qfin.columns)
+    year = latest.year
+    quarter = (latest.month - 1) // 3 + 1
+    return year, quarter
+
+@tracing.traced("validate.quarter_exists")
+def quarter_exists(ticker, year, quarter):
+    qfin = get_yahoo_cache().quarterly_financials(ticker)
+    if qfin.empty:
+        return False
+    for col in qfin.columns:
+        if col.year == int(year) and ((col.month - 1) // 3 + 1) == int(quarter):
+            return True
+    return False
+
+
+def _extract_ticker(entities):
+    return (
+        entities.get("company_ticker")
+        or entities.get("ticker")
+        or entities.get("ticker_symbol")
+        or entities.get("company")
+        or entities.get("stock")
+        or entities.get("stock_symbol")
+    )
+
+
+async def _kickoff(crew: "FinancialCrew", crew_obj: "Crew", inputs: dict):
+    with tracing.span("crew.kickoff", inputs=json.dumps(inputs, default=str)) as kickoff_span:
+        output = await crew.kickoff(crew_obj, inputs)
+        usage = getattr(output, "token_usage", None)
+        if usage is not None:
+            kickoff_span.set("gen_ai.usage.input_tokens", getattr(usage, "prompt_tokens", None))
+            kickoff_span.set("gen_ai.usage.output_tokens", getattr(usage, "completion_tokens", None))
+            kickoff_span.set("llm.requests", getattr(usage, "successful_requests", None))
+        return output
+
+
+@tracing.traced("run_agent_by_intent")
+async def arun_agent_by_intent(intent_data, crew: "FinancialCrew", user_input: str, session: ChatSession = None):
+    entities = intent_data.get("entities", {})
+    company_ticker = _extract_ticker(entities)
+    intent = intent_data.get("intent", "").lower()
+    tracing.set_attribute("intent", intent)
+    tracing.set_attribute("ticker", company_ticker)
+    print("[Intent]", intent)
+    print("[entities]", entities)
+    print("[Ticker]", company_ticker)
+    print("[Country]", entities.get("country"))
+    year    = intent_data.get("entities", {}).get("year")
+    quarter = intent_data.get("entities", {}).get("quarter")
+
+    if intent == "fundamental_analysis" and company_ticker:
+        print(f'[Year and Quarter] {year} and {quarter}')
+        has_quarter = year is not None and quarter is not None
+        # Validasi ticker dan pengecekan quarter saling independen, jadi dijalankan bersamaan
+        valid, quarter_found = await asyncio.gather(
+            asyncio.to_thread(is_valid_ticker, company_ticker),
+            asyncio.to_thread(quarter_exists, company_ticker, year, quarter) if has_quarter else asyncio.sleep(0, False),
+            return_exceptions=True,
+        )
+        if valid is not True:
+            return ticker_not_found_message(company_ticker)
+        print(f"[Dispatcher] Running fundamental analysis for {company_ticker}")
+
+        if quarter_found is not True:
+            print("[INFO] Using latest available quarter for analysis")
+            year, quarter = await asyncio.to_thread(find_latest_quarter, company_ticker)
+            if year is None or quarter is None:
+                return 'No quarterly data available for this ticker.'
+
+        print("[Fundamental Input Given]", company_ticker)
+        print("[TASK DESCRIPTION]", crew.fundamental_task().description)
+
+        kickoff_inputs = {
+            "company_ticker": company_ticker,
+            "year": int(year),
+            "quarter": int(quarter)
+        }
+        with crew.acquire("fundamental_analysis") as fundamental_crew:
+            return await _kickoff(crew, fundamental_crew, kickoff_inputs)
+
+    elif intent == "technical_analysis":
+        start_date = entities.get("start_date")
+        end_date = entities.get("end_date")
+        period = entities.get("period") or intent_data.get("period")
+
+        if not company_ticker:
+            return "Please specify the stock ticker you want technical analysis for. Example: 'Technical analysis AAPL for 3 months.'"
+        if not await asyncio.to_thread(is_valid_ticker, company_ticker):
+            return ticker_not_found_message(company_ticker)
+
+        if not (start_date and end_date):
+            start_date = None
+            end_date = None
+
+        inputs = {"stock_symbol": company_ticker}
+
+        if start_date and end_date:
+            inputs["start_date"] = start_date
+            inputs["end_date"] = end_date
+            inputs["period"] = ""
+        else:
+            inputs["period"] = period or "1y"
+            inputs["start_date"] = ""
+            inputs["end_date"] = ""
+
+        print(f"[Dispatcher] Running technical analysis for {company_ticker} with inputs: {inputs}")
+        with crew.acquire("technical_analysis") as technical_crew:
+            return await _kickoff(crew, technical_crew, inputs)
+
+    elif intent == "macro_outlook":
+        macro_input = entities.get("country") or company_ticker or user_input
+
+        if isinstance(macro_input, dict):
+            macro_input = macro_input.get("description", "")
+
+        print("[Normalized Macro Input]", macro_input)
+
+        valid = await asyncio.to_thread(is_valid_macro_input, macro_input)
+        print("is_valid_macro_input:", valid)
+
+        if not valid:
+            return "Country or ticker not found! please input the correct ticker or country name (Read Descalimer)."
+        else:
+            print(f"[Dispatcher] Running macroeconomic analysis with input: {macro_input}")
+            print("[Macro Input Given]", macro_input)
+            print("[TASK DESCRIPTION]", crew.macro_task().description)
+            macro_input = str(macro_input).strip()
+            with crew.acquire("macro_outlook") as macro_crew:
+                return await _kickoff(crew, macro_crew, {'input': macro_input})
+
+    elif intent == "conversation" and session is not None:
+        print("[Dispatcher] Running conversational agent.")
+        return await session.main_conversational_agent.aquery(user_input)
+
+    return "Sorry, I couldn't understand your request or the input was missing."
+
+
+def run_agent_by_intent(intent_data, crew: "FinancialCrew", user_input: str, session: ChatSession = None):
+    return run_sync(arun_agent_by_intent(intent_data, crew, user_input, session))
+
+
+def is_error_message(report):
+    if not isinstance(report, str):
+        return False
+    msg = report.lower()
+    return any([
+        "couldn't understand" in msg,
+        "please specify the stock ticker" in msg,
+        "sorry" in msg,
+        "error" in msg,
+        "not found" in msg,
+        "no data available" in msg,
+        "missing" in msg,
+        "Please check your input" in msg
+    ])
+
+def report_to_text(report):
+    if hasattr(report, "content"):
+        return report.content
+    elif hasattr(report, "text"):
+        return report.text
+    return str(report)
+
+def task_outputs_of(report):
+    """Raw output of every task in a CrewOutput, kept next to the report in the response cache."""
+    return [
+        {"agent": getattr(task, "agent", None), "raw": getattr(task, "raw", None)}
+        for task in getattr(report, "tasks_output", None) or []
+    ]
+
+def describe_intent(intent_entry):
+    entities = intent_entry.get("entities", {}) or {}
+    target = entities.get("ticker") or entities.get("company_ticker") or entities.get("country")
+    name = intent_entry.get("intent", "")
+    return f"{name} ({target})" if target else name
+
+
+async def arun_intents_concurrently(intents_list, crew, prompt, session=None,
+                                    max_workers=INTENT_MAX_WORKERS, timeout=INTENT_TIMEOUT_SECONDS):
+    """
+    Runs independent intents concurrently and returns (intent_entry, report, error) tuples
+    in the original intent order. The timeout of each intent starts once it holds a worker slot.
+    Reports found in the response cache are returned without running the crew.
+    """
+    slots = asyncio.Semaphore(max(1, max_workers))
+    cache = get_response_cache()
+
+    async def run(intent_entry):
+        with tracing.span("intent", intent=describe_intent(intent_entry)) as intent_span:
+            return await run_traced(intent_entry, intent_span)
+
+    async def run_traced(intent_entry, intent_span):
+        cached = await asyncio.to_thread(cache.get_report, intent_entry)
+        intent_span.set("cache.hit", cached is not None)
+        if cached is not None:
+            print(f"[Response Cache] report hit for {describe_intent(intent_entry)}")
+            emit("intent_cached", cached["report"], intent=describe_intent(intent_entry))
+            return intent_entry, cached["report"], None
+        queued = time.perf_counter()
+        async with slots:
+            intent_span.set("queue_ms", round((time.perf_counter() - queued) * 1000, 1))
+            with intent_scope(describe_intent(intent_entry)):
+                emit("intent_started")
+                try:
+                    report = await asyncio.wait_for(arun_agent_by_intent(intent_entry, crew, prompt, session), timeout)
+                except asyncio.TimeoutError:
+                    emit("intent_failed", f"timed out after {timeout:.0f}s")
+                    intent_span.fail(f"timed out after {timeout:.0f}s")
+                    return intent_entry, None, f"timed out after {timeout:.0f}s"
+                except Exception as e:
+                    emit("intent_failed", str(e))
+                    intent_span.fail(e)
+                    return intent_entry, None, str(e)
+                if report and not is_error_message(report):
+                    emit("intent_done", report_to_text(report))
+                    intent_span.set("report.chars", len(report_to_text(report)))
+                    await asyncio.to_thread(cache.set_report, intent_entry, report_to_text(report), task_outputs_of(report))
+                else:
+                    emit("intent_failed", report_to_text(report) if report else "empty report")
+                    intent_span.fail(report_to_text(report) if report else "empty report")
+                return intent_entry, report, None
+
+    return list(await asyncio.gather(*(run(entry) for entry in intents_list)))
+
+
+def parse_intents(intent_output):
+    intent_data = json.loads(intent_output)
+    if "intents" in intent_data and isinstance(intent_data["intents"], list):
+        intents_list = intent_data["intents"]
+    elif "intent" in intent_data:
+        intents_list = [intent_data]
+    else:
+        raise ValueError("Invalid format: Missing 'intent' or 'intents'.")
+    if not intents_list:
+        raise ValueError("No intents detected.")
+    return intents_list
+
+
+async def ahandle_user_query(session: ChatSession, crew, prompt, chat_history):
+    cache_stats_before = get_yahoo_cache().stats()
+    try:
+        with tracing.span("turn", **{"prompt.chars": len(prompt or "")}) as turn:
+            session.last_trace_id = turn.trace_id
+            return await _ahandle_user_query(session, crew, prompt, chat_history)
+    finally:
+        cache_stats_after = get_yahoo_cache().stats()
+        print("[YF Cache] turn:", get_yahoo_cache().stats_delta(cache_stats_before, cache_stats_after),
+              "| total hit rate: {:.0%}".format(cache_stats_after["hit_rate"]))
+        print("[LLM Clients]", get_client_registry().stats())
+        print("[Router]", router_stats.summary())
+        print("[Response Cache]", get_response_cache().stats())
+
+
+async def aroute_intents(session: ChatSession, prompt):
+    """
+    Tries the local rule router first and only calls the LLM intent router when it is unsure.
+    """
+    with tracing.span("route") as route_span:
+        route = route_by_rules(prompt)
+        router_stats.record(route.confident)
+        route_span.set("router", "rules" if route.confident else "llm")
+        route_span.set("confidence", round(route.confidence, 3))
+        if route.confident:
+            print(f"[Router] rules (confidence {route.confidence:.2f})")
+            return json.dumps(route.as_router_output())
+        print(f"[Router] LLM fallback (confidence {route.confidence:.2f}: {', '.join(route.reasons)})")
+        return await session.intent_router_agent.aquery(prompt)
+
+
+async def _ahandle_user_query(session: ChatSession, crew, prompt, chat_history):
+    intent_output = await aroute_intents(session, prompt)
+    print("=== INTENT DETECTED ===")
+    print(intent_output)
+
+    try:
+        intents_list = parse_intents(intent_output)
+    except Exception as e:
+        print("[Intent Parsing Error]", str(e))
+        return "Sorry, I couldn’t understand your request.", chat_history
+
+    session.last_intent_data = intents_list[-1]
+    tracing.set_attribute("intents", ", ".join(describe_intent(entry) for entry in intents_list))
+    emit("routed", ", ".join(describe_intent(entry) for entry in intents_list), data=intents_list)
+
+    runnable = []
+    for intent_entry in intents_list:
+        intent_name = intent_entry.get("intent", "").lower()
+        if intent_name not in ALLOWED_INTENTS:
+            print(f"[Skipping unsupported intent] {intent_name}")
+            continue
+        runnable.append(intent_entry)
+
+    cache = get_response_cache()
+    cached_summary = await asyncio.to_thread(cache.get_summary, runnable, prompt) if runnable else None
+    tracing.set_attribute("cache.summary_hit", cached_summary is not None)
+    if cached_summary is not None:
+        print("[Response Cache] summary hit, skipping agents and summarizer")
+        summary = cached_summary["summary"]
+        emit("token", summary)
+        return summary, chat_history + [{"role": "assistant", "content": summary}]
+
+    reports = []
+    failures = []
+    for intent_entry, report, error in await arun_intents_concurrently(runnable, crew, prompt, session):
+        intent_name = intent_entry.get("intent", "").lower()
+        if error is None and report and not is_error_message(report):
+            reports.append(report_to_text(report))
+        else:
+            reason = error or (report_to_text(report) if report else "empty report")
+            print(f"[Error or empty report] for intent {intent_name}: {reason}")
+            failures.append(f"- {describe_intent(intent_entry)}: {reason}")
+
+    failure_note = ""
+    if failures:
+        failure_note = "\n\n⚠️ Some analyses could not be completed:\n" + "\n".join(failures)
+
+    if not reports:
+        return (
+            "Hmm, I couldn't find any relevant information based on your input. "
+            "Could you please double-check the ticker or rephrase your question?"
+            + failure_note
+            , chat_history
+        )
+
+    combined_report = "\n\n---\n\n".join(reports)
+
+    summary_prompt = f"""
+    Here are the combined results for your request:
+    {combined_report}
+
+    User request was: "{prompt}"
+
+    Please provide a concise summary highlighting key points from each analysis.
+    """
+
+    emit("summary_started")
+    with tracing.span("summarize", reports=len(reports), **{"prompt.chars": len(summary_prompt)}):
+        summary = await session.summarizer_agent.aquery(summary_prompt, on_token=token_emitter())
+    print(f"summary result {summary}")
+    if not failures:
+        await asyncio.to_thread(cache.set_summary, runnable, prompt, summary, reports)
+    summary += failure_note
+
+    return summary, chat_history + [{"role": "assistant", "content": summary}]
+
+
+def handle_user_query(session: ChatSession, crew, prompt, chat_history):
+    """
+    Sync facade over ahandle_user_query for the Streamlit script thread.
+    """
+    return run_sync(ahandle_user_query(session, crew, prompt, chat_history))
+
+
+def stream_user_query(session: ChatSession, crew, prompt, chat_history):
+    """
+    Like handle_user_query, but yields ProgressEvents while the turn runs: routing, per-intent
+    start / crew steps / finished reports, then the summary token by token. The last event is
+    `done` with data=(response, updated_history).
+    """
+    events = queue.Queue()
+
+    async def run():
+        with progress_sink(events.put):
+            return await ahandle_user_query(session, crew, prompt, chat_history)
+
+    future = _shared_loop().submit(run())
+    future.add_done_callback(lambda _: events.put(None))
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+    yield ProgressEvent("done", data=future.result(), at=time.monotonic())
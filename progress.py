@@ -0,0 +1,92 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, NamedTuple, Optional
+
+# Sink untuk request yang sedang berjalan. ContextVar ikut terbawa ke task asyncio dan
+# asyncio.to_thread, jadi callback crew di thread worker tetap tahu ke mana event dikirim.
+_sink = contextvars.ContextVar("progress_sink", default=None)
+_intent = contextvars.ContextVar("progress_intent", default=None)
+
+STEP_TEXT_LIMIT = 200
+
+
+class ProgressEvent(NamedTuple):
+    """
+    kind: routed, intent_started, intent_cached, step, intent_done, intent_failed,
+    summary_started, token, done.
+    """
+    kind: str
+    intent: Optional[str] = None
+    text: str = ""
+    data: Any = None
+    at: float = 0.0
+
+
+def active() -> bool:
+    return _sink.get() is not None
+
+
+def emit(kind: str, text: str = "", intent: str = None, data=None):
+    """Sends an event to the current sink; a no-op when nobody is listening."""
+    sink = _sink.get()
+    if sink is None:
+        return
+    try:
+        sink(ProgressEvent(kind, intent or _intent.get(), text, data, time.monotonic()))
+    except Exception as e:
+        print(f"[Progress] sink failed: {e}")
+
+
+@contextmanager
+def progress_sink(sink: Callable[[ProgressEvent], None]):
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+@contextmanager
+def intent_scope(intent: str):
+    """Labels every event emitted inside (including crew callbacks) with `intent`."""
+    token = _intent.set(intent)
+    try:
+        yield
+    finally:
+        _intent.reset(token)
+
+
+def token_emitter() -> Optional[Callable[[str], None]]:
+    """on_token callback for GenericChatAgent, or None (no streaming) without a sink."""
+    if not active():
+        return None
+    return lambda text: emit("token", text)
+
+
+def _short(text) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= STEP_TEXT_LIMIT else text[:STEP_TEXT_LIMIT - 3] + "..."
+
+
+def crew_step_callback(step):
+    """
+    Crew step_callback: tool calls and agent thoughts become `step` events. Installed once per
+    crew (crewai keeps the first callback on each agent), routing happens through the sink.
+    """
+    if not active():
+        return
+    tool = getattr(step, "tool", None)
+    if tool:
+        emit("step", f"{tool}({_short(getattr(step, 'tool_input', ''))})")
+        return
+    thought = getattr(step, "thought", None)
+    if thought:
+        emit("step", _short(thought))
+
+
+def crew_task_callback(output):
+    """Crew task_callback; the full report follows as the intent_done event."""
+    if not active():
+        return
+    emit("step", f"Task finished: {_short(getattr(output, 'summary', None) or getattr(output, 'description', ''))}")
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(".cache", "responses.sqlite"))
+MACRO_CACHE_HOURS = float(os.getenv("MACRO_CACHE_HOURS", "24"))
+# Batas atas TTL fundamental, karena tanggal rilis laporan hanya perkiraan
+FUNDAMENTAL_CACHE_MAX_DAYS = float(os.getenv("FUNDAMENTAL_CACHE_MAX_DAYS", "30"))
+# Perkiraan tanggal rilis laporan kuartalan (~45 hari setelah akhir kuartal)
+FILING_DATES = [(2, 14), (5, 15), (8, 14), (11, 14)]
+
+
+def intent_key(intent_entry: dict) -> tuple:
+    """
+    Normalized key for one intent: (intent, subject, period, start_date, end_date, year, quarter).
+    Missing values take the same defaults the dispatcher uses, so equivalent requests share a key.
+    """
+    entities = intent_entry.get("entities", {}) or {}
+    intent = intent_entry.get("intent", "").lower()
+    subject = (
+        entities.get("company_ticker") or entities.get("ticker") or entities.get("ticker_symbol")
+        or entities.get("company") or entities.get("stock") or entities.get("stock_symbol")
+    )
+    if intent == "macro_outlook":
+        subject = entities.get("country") or subject
+    subject = str(subject).strip().upper() if subject else None
+
+    period = start_date = end_date = year = quarter = None
+    if intent == "technical_analysis":
+        start_date, end_date = entities.get("start_date"), entities.get("end_date")
+        if not (start_date and end_date):
+            start_date = end_date = None
+            period = (entities.get("period") or intent_entry.get("period") or "1y").lower()
+    elif intent == "fundamental_analysis":
+        year, quarter = entities.get("year"), entities.get("quarter")
+        if year is None or quarter is None:
+            year = quarter = None
+        else:
+            year, quarter = int(year), int(quarter)
+    return (intent, subject, period, start_date, end_date, year, quarter)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercased, whitespace-collapsed prompt; part of the summary key since the summary answers it."""
+    return " ".join(str(prompt or "").lower().split()).strip(" .!?")
+
+
+def is_cacheable(key: tuple) -> bool:
+    # Tanpa ticker/negara hasilnya bergantung pada teks prompt, jadi tidak di-cache
+    return key[0] in ("technical_analysis", "fundamental_analysis", "macro_outlook") and key[1] is not None
+
+
+def _next_filing_date(now: datetime) -> datetime:
+    for year in (now.year, now.year + 1):
+        for month, day in FILING_DATES:
+            candidate = datetime(year, month, day)
+            if candidate > now:
+                return candidate
+
+
+def ttl_for(intent: str, now: datetime = None) -> float:
+    """Seconds a result for `intent` stays fresh, following how often its data changes."""
+    now = now or datetime.now()
+    if intent == "technical_analysis":
+        # Sampai akhir hari (data harian berganti setelah penutupan)
+        next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (next_day - now).total_seconds()
+    if intent == "fundamental_analysis":
+        until_filing = (_next_filing_date(now) - now).total_seconds()
+        return min(until_filing, FUNDAMENTAL_CACHE_MAX_DAYS * 86400)
+    if intent == "macro_outlook":
+        return MACRO_CACHE_HOURS * 3600
+    return 0
+
+
+class MemoryTier:
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: dict, expires_at: float):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+
+class SQLiteTier:
+    """Shared tier: several Streamlit worker processes can point at the same file."""
+    def __init__(self, path: str = RESPONSE_CACHE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, expires_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), expires_at),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, predicate):
+        with self._lock, self._conn:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM responses")]
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys if predicate(k)])
+
+
+class ResponseCache:
+    """
+    Cache of finished analyses keyed on normalized intents.
+
+    Two kinds of entries are stored: per-intent agent reports ("report") and the final summary
+    for a whole set of intents ("summary"). Reports depend only on the intent entities; a summary
+    also answers the user's wording (e.g. "is the RSI overbought?"), so its key includes the
+    normalized prompt. Lookups go through the tiers in order and a hit in a
+    slower tier is copied into the faster ones.
+    """
+    def __init__(self, tiers: list = None, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.enabled = enabled
+        self.tiers = tiers if tiers is not None else [MemoryTier(), SQLiteTier()]
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    @staticmethod
+    def _key(kind: str, keys, prompt: str = None) -> str:
+        return json.dumps([kind, keys, prompt], default=str)
+
+    def _count(self, counter: dict, kind: str):
+        with self._lock:
+            counter[kind] = counter.get(kind, 0) + 1
+
+    def _get(self, kind: str, keys, prompt: str = None):
+        if not self.enabled or not all(is_cacheable(key) for key in keys):
+            return None
+        key = self._key(kind, keys, prompt)
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value, value["expires_at"])
+                self._count(self.hits, kind)
+                return value["payload"]
+        self._count(self.misses, kind)
+        return None
+
+    def _set(self, kind: str, keys, payload: dict, ttl: float, prompt: str = None):
+        if not self.enabled or ttl <= 0 or not all(is_cacheable(key) for key in keys):
+            return
+        expires_at = time.time() + ttl
+        value = {"payload": payload, "expires_at": expires_at, "stored_at": time.time()}
+        key = self._key(kind, keys, prompt)
+        for tier in self.tiers:
+            tier.set(key, value, expires_at)
+
+    def get_report(self, intent_entry: dict):
+        return self._get("report", [intent_key(intent_entry)])
+
+    def set_report(self, intent_entry: dict, report: str, task_outputs: list = None):
+        key = intent_key(intent_entry)
+        self._set("report", [key], {"report": report, "task_outputs": task_outputs or []}, ttl_for(key[0]))
+
+    def get_summary(self, intent_entries: list, prompt: str):
+        return self._get("summary", [intent_key(entry) for entry in intent_entries], normalize_prompt(prompt))
+
+    def set_summary(self, intent_entries: list, prompt: str, summary: str, reports: list):
+        keys = [intent_key(entry) for entry in intent_entries]
+        ttl = min((ttl_for(key[0]) for key in keys), default=0)
+        self._set("summary", keys, {"summary": summary, "reports": reports}, ttl, normalize_prompt(prompt))
+
+    def invalidate(self, intent: str = None, subject: str = None):
+        """
+        Drops every entry mentioning the given intent and/or subject (ticker or country).
+        Memory tiers of other processes keep their copies until those expire.
+        """
+        subject = subject.strip().upper() if subject else None
+
+        def matches(key: str) -> bool:
+            keys = json.loads(key)[1]
+            return any(
+                (intent is None or k[0] == intent) and (subject is None or k[1] == subject)
+                for k in keys
+            )
+
+        for tier in self.tiers:
+            tier.delete(matches)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = dict(self.hits), dict(self.misses)
+        result = {}
+        for kind in sorted(set(hits) | set(misses)):
+            total = hits.get(kind, 0) + misses.get(kind, 0)
+            result[kind] = {
+                "hits": hits.get(kind, 0),
+                "misses": misses.get(kind, 0),
+                "hit_rate": hits.get(kind, 0) / total if total else 0.0,
+            }
+        return result
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def set_response_cache(cache: ResponseCache):
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
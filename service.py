@@ -0,0 +1,627 @@
+"""
+Headless entry point: a JSON HTTP API and a CLI over the same pipeline the Streamlit app uses.
+
+    python service.py serve --port 8000
+    python service.py run technical NVDA --period 6mo
+    python service.py run chat "Technical and fundamental analysis for MSFT"
+    python service.py batch fundamental --file tickers.txt --out fundamentals.jsonl
+
+Every analysis runs as a job on one bounded WorkerPool. When all workers are busy and the queue
+is full, new API requests are refused with 429 instead of piling up. Batch items wait for a free
+slot instead, and all batches together hold at most half of the workers, so interactive requests
+still get through while a 200-ticker batch runs.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import yaml
+
+from pipeline import (ChatSession, ahandle_user_query, arun_intents_concurrently, is_error_message,
+                      report_to_text, run_sync)
+from progress import progress_sink
+
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+# Analisis yang berjalan bersamaan; tiap analisis memegang satu crew dari pool FinancialCrew
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+# Analisis yang boleh menunggu worker sebelum request baru ditolak (429)
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "32"))
+SERVICE_MODEL = os.getenv("SERVICE_MODEL", "gpt-3.5-turbo")
+SERVICE_BATCH_MAX = int(os.getenv("SERVICE_BATCH_MAX", "500"))
+# Item batch yang boleh berjalan/antre sekaligus (semua batch bersama); sisanya untuk request interaktif
+SERVICE_BATCH_INFLIGHT = int(os.getenv("SERVICE_BATCH_INFLIGHT", "0")) or None
+# Job selesai yang disimpan untuk GET /v1/jobs/<id>; chat session yang disimpan per session_id
+SERVICE_JOB_HISTORY = int(os.getenv("SERVICE_JOB_HISTORY", "200"))
+SERVICE_SESSIONS = int(os.getenv("SERVICE_SESSIONS", "100"))
+JOB_EVENT_LIMIT = 50
+
+ANALYSIS_KINDS = ("technical", "fundamental", "macro")
+
+
+class QueueFull(Exception):
+    """The worker pool has no free worker and no free queue slot."""
+
+
+class InvalidRequest(ValueError):
+    pass
+
+
+class NotCancellable(Exception):
+    pass
+
+
+class WorkerPool:
+    """
+    ThreadPoolExecutor with a hard cap on running + queued work. `submit` raises QueueFull when
+    the cap is reached, or waits for a slot with block=True.
+    """
+    def __init__(self, workers: int = SERVICE_WORKERS, queue_size: int = SERVICE_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="service-worker")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, block: bool = False, timeout: float = None):
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(f"{self.workers} workers busy and {self.queue_size} analyses queued")
+        with self._lock:
+            self.pending += 1
+
+        def run():
+            with self._lock:
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        def release(_):
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+            self._slots.release()
+
+        try:
+            future = self._executor.submit(run)
+        except RuntimeError:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "queue_size": self.queue_size, "running": self.running,
+                    "queued": self.pending - self.running, "completed": self.completed, "rejected": self.rejected}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class Job:
+    """One analysis, chat turn or batch. Everything the API returns about it comes from `as_dict`."""
+    def __init__(self, kind: str, params: dict, total: int = 1):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.result = None
+        self.error = None
+        self.events = deque(maxlen=JOB_EVENT_LIMIT)
+        self.future = None
+        self.cancelled = threading.Event()
+        self.finished_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.started is None:
+                self.started = time.time()
+                self.status = "running"
+
+    def record_event(self, event):
+        if event.kind == "token":
+            return
+        self.events.append({"at": round(time.time(), 3), "kind": event.kind, "intent": event.intent,
+                            "text": event.text[:200]})
+
+    def advance(self, failed: bool = False):
+        with self._lock:
+            self.done += 1
+            self.failed += int(failed)
+
+    def finish(self, result=None, error: str = None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            if self.cancelled.is_set():
+                self.status = "cancelled"
+            else:
+                self.status = "failed" if error else "done"
+        self.finished_event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self.finished_event.wait(timeout)
+
+    def as_dict(self, include_result: bool = True) -> dict:
+        with self._lock:
+            data = {
+                "id": self.id, "kind": self.kind, "status": self.status, "params": self.params,
+                "progress": {"done": self.done, "failed": self.failed, "total": self.total},
+                "created": self.created, "started": self.started, "finished": self.finished,
+                "error": self.error,
+            }
+            if include_result:
+                data["result"] = self.result
+                data["events"] = list(self.events)
+        return data
+
+
+def intent_entry(kind: str, target: str, params: dict = None) -> dict:
+    """Intent entry in the router's format for one analysis of `target` (ticker or country)."""
+    params = params or {}
+    target = str(target or "").strip()
+    if not target:
+        raise InvalidRequest("target (ticker or country) is required")
+    if kind == "technical":
+        return {"intent": "technical_analysis", "entities": {
+            "ticker": target.upper(), "period": params.get("period"),
+            "start_date": params.get("start_date"), "end_date": params.get("end_date")}}
+    if kind == "fundamental":
+        year, quarter = params.get("year"), params.get("quarter")
+        try:
+            year = int(year) if year is not None else None
+            quarter = int(quarter) if quarter is not None else None
+        except (TypeError, ValueError):
+            raise InvalidRequest("year and quarter must be integers")
+        if quarter is not None and not 1 <= quarter <= 4:
+            raise InvalidRequest("quarter must be between 1 and 4")
+        return {"intent": "fundamental_analysis", "entities": {"ticker": target.upper(), "year": year, "quarter": quarter}}
+    if kind == "macro":
+        return {"intent": "macro_outlook", "entities": {"country": target}}
+    raise InvalidRequest(f"unknown analysis kind {kind!r}; expected one of {', '.join(ANALYSIS_KINDS)}")
+
+
+class AnalysisService:
+    """
+    Runs analyses and chat turns on a WorkerPool with the shared FinancialCrew. Jobs are kept in
+    memory: the last SERVICE_JOB_HISTORY finished ones stay readable.
+    """
+    def __init__(self, api_key: str = None, pool: WorkerPool = None, model: str = SERVICE_MODEL,
+                 agent_config_path: str = "config/agents.yaml"):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.model = model
+        self.pool = pool or WorkerPool()
+        with open(agent_config_path, encoding="utf-8") as f:
+            self.agent_configs = yaml.safe_load(f)
+        self._crew = None
+        self._crew_lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.batch_inflight = SERVICE_BATCH_INFLIGHT or max(1, self.pool.workers // 2)
+        self._batch_slots = threading.BoundedSemaphore(self.batch_inflight)
+
+    @property
+    def crew(self):
+        # Dibuat sekali per proses seperti get_crew() di app.py; crewai baru dimuat saat dibutuhkan
+        with self._crew_lock:
+            if self._crew is None:
+                from crew import FinancialCrew
+                self._crew = FinancialCrew(api_key=self.api_key)
+            return self._crew
+
+    # --- job registry ---
+
+    def _register(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, j in self._jobs.items() if j.finished is not None]
+            for job_id in finished[:max(0, len(finished) - SERVICE_JOB_HISTORY)]:
+                del self._jobs[job_id]
+        return job
+
+    def get_job(self, job_id: str) -> Job:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.as_dict(include_result=False) for job in reversed(jobs)]
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancels a queued job, or stops a batch (items not yet started are skipped). A running
+        analysis or chat turn cannot be interrupted: NotCancellable.
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        if job.finished is not None:
+            raise NotCancellable(f"job {job.status}")
+        if job.future is None:
+            job.cancelled.set()
+        elif job.future.cancel():
+            job.cancelled.set()
+            job.finish(error="cancelled before it started")
+        else:
+            raise NotCancellable("job is already running and cannot be cancelled")
+        return job
+
+    def _session(self, session_id: str) -> dict:
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state is None:
+                state = {"session": ChatSession(self.agent_configs, self.api_key, model=self.model),
+                         "history": [], "lock": threading.Lock()}
+            self._sessions[session_id] = state
+            while len(self._sessions) > SERVICE_SESSIONS:
+                self._sessions.popitem(last=False)
+        return state
+
+    # --- work ---
+
+    def _run_intent(self, job: Job, entry: dict) -> dict:
+        """Runs one intent through the pipeline (response cache, timeout, progress) and returns its result."""
+        async def run():
+            with progress_sink(job.record_event):
+                return await arun_intents_concurrently([entry], self.crew, "", None)
+
+        [(_, report, error)] = run_sync(run())
+        if error is None and report and not is_error_message(report):
+            return {"status": "done", "report": report_to_text(report)}
+        return {"status": "failed", "error": error or (report_to_text(report) if report else "empty report")}
+
+    def _analysis_job(self, job: Job, entry: dict):
+        job.start()
+        try:
+            outcome = self._run_intent(job, entry)
+        except Exception as e:
+            job.advance(failed=True)
+            job.finish(error=f"{type(e).__name__}: {e}")
+            return
+        job.advance(failed=outcome["status"] == "failed")
+        job.finish(result=outcome.get("report"), error=outcome.get("error"))
+
+    def _chat_job(self, job: Job, session_id: str, message: str):
+        job.start()
+        state = self._session(session_id)
+        try:
+            # Satu giliran per session pada satu waktu, sama seperti satu tab Streamlit
+            with state["lock"]:
+                history = state["history"] + [{"role": "user", "content": message}]
+
+                async def run():
+                    with progress_sink(job.record_event):
+                        return await ahandle_user_query(state["session"], self.crew, message, history)
+
+                response, state["history"] = run_sync(run())
+        except Exception as e:
+            job.advance(failed=True)
+            job.finish(error=f"{type(e).__name__}: {e}")
+            return
+        job.advance()
+        job.finish(result=response)
+
+    def _batch_item(self, job: Job, target: str, entry: dict, results: dict):
+        try:
+            job.start()
+            if job.cancelled.is_set():
+                outcome = {"status": "cancelled"}
+            else:
+                try:
+                    outcome = self._run_intent(job, entry)
+                except Exception as e:
+                    outcome = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            results[target] = outcome
+            job.advance(failed=outcome["status"] == "failed")
+        finally:
+            self._batch_slots.release()
+
+    def _feed_batch(self, job: Job, items: list):
+        """
+        Submits batch items one by one, then closes the job. All batches together hold at most
+        `batch_inflight` pool slots, so interactive requests keep the rest of the workers.
+        """
+        results, futures = {}, []
+        try:
+            for target, entry in items:
+                self._batch_slots.acquire()
+                if job.cancelled.is_set():
+                    self._batch_slots.release()
+                    break
+                try:
+                    futures.append(self.pool.submit(self._batch_item, job, target, entry, results, block=True))
+                except Exception:
+                    self._batch_slots.release()
+                    raise
+            for future in futures:
+                future.exception()
+        except Exception as e:
+            job.finish(result=results, error=f"{type(e).__name__}: {e}")
+            return
+        ordered = {target: results.get(target, {"status": "cancelled"}) for target, _ in items}
+        job.finish(result=ordered, error=f"{job.failed} of {job.total} failed" if job.failed else None)
+
+    # --- public API ---
+
+    def submit_analysis(self, kind: str, target: str, params: dict = None) -> Job:
+        entry = intent_entry(kind, target, params)
+        job = Job(kind, {"target": target, **(params or {})})
+        job.future = self.pool.submit(self._analysis_job, job, entry)
+        return self._register(job)
+
+    def submit_chat(self, message: str, session_id: str = None) -> Job:
+        if not str(message or "").strip():
+            raise InvalidRequest("message is required")
+        session_id = session_id or uuid.uuid4().hex[:16]
+        job = Job("chat", {"message": message, "session_id": session_id})
+        job.future = self.pool.submit(self._chat_job, job, session_id, message)
+        return self._register(job)
+
+    def submit_batch(self, kind: str, targets: list, params: dict = None) -> Job:
+        targets = list(OrderedDict.fromkeys(str(t).strip() for t in targets or [] if str(t).strip()))
+        if not targets:
+            raise InvalidRequest("targets must be a non-empty list")
+        if len(targets) > SERVICE_BATCH_MAX:
+            raise InvalidRequest(f"at most {SERVICE_BATCH_MAX} targets per batch")
+        items = [(target, intent_entry(kind, target, params)) for target in targets]
+        job = Job(f"batch:{kind}", {"targets": len(targets), **(params or {})}, total=len(targets))
+        job.start()
+        self._register(job)
+        threading.Thread(target=self._feed_batch, args=(job, items), name=f"batch-{job.id}", daemon=True).start()
+        return job
+
+    def health(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {"status": "ok", "pool": {**self.pool.stats(), "batch_inflight": self.batch_inflight},
+                "jobs": {status: sum(1 for j in jobs if j.status == status)
+                         for status in ("queued", "running", "done", "failed", "cancelled")}}
+
+
+# --- HTTP API ---
+
+def _wait_seconds(value):
+    """
+    `wait` of a request: false/absent -> False (answer 202 at once), true -> None (wait until
+    done), a number of seconds -> that limit, after which the answer is 202.
+    """
+    if value in (None, False, "", "0", "false"):
+        return False
+    if value is True or value in ("1", "true"):
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise InvalidRequest(f"wait must be true, false or a number of seconds, not {value!r}")
+    if not seconds >= 0:
+        raise InvalidRequest("wait must not be negative")
+    return seconds or False
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        print(f"[Service] {self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise InvalidRequest(f"invalid JSON body: {e}")
+        if not isinstance(body, dict):
+            raise InvalidRequest("JSON body must be an object")
+        return body
+
+    def _query(self) -> dict:
+        return dict(parse_qsl(self.path.split("?", 1)[1])) if "?" in self.path else {}
+
+    def _route(self):
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def _handle(self, method: str):
+        service = self.server.service
+        parts = self._route()
+        try:
+            if method == "GET" and parts == ["health"]:
+                return self._send(200, service.health())
+            if method == "GET" and parts == ["v1", "jobs"]:
+                return self._send(200, {"jobs": service.list_jobs()})
+            if len(parts) == 3 and parts[:2] == ["v1", "jobs"] and method in ("GET", "DELETE"):
+                try:
+                    job = service.get_job(parts[2]) if method == "GET" else service.cancel(parts[2])
+                except NotCancellable as e:
+                    return self._send(409, {"error": str(e), "job": service.get_job(parts[2]).as_dict(False)})
+                if job is None:
+                    return self._send(404, {"error": f"unknown job {parts[2]}"})
+                return self._send(200, job.as_dict())
+            if method != "POST":
+                return self._send(404, {"error": "not found"})
+
+            body = self._body()
+            wait = _wait_seconds(body.get("wait", self._query().get("wait")))
+            if len(parts) == 3 and parts[:2] == ["v1", "analyses"]:
+                params = {k: v for k, v in body.items() if k not in ("target", "wait")}
+                job = service.submit_analysis(parts[2], body.get("target"), params)
+            elif parts == ["v1", "chat"]:
+                job = service.submit_chat(body.get("message"), body.get("session_id"))
+            elif parts == ["v1", "batches"]:
+                job = service.submit_batch(body.get("kind"), body.get("targets"), body.get("params") or {})
+            else:
+                return self._send(404, {"error": "not found"})
+        except InvalidRequest as e:
+            return self._send(400, {"error": str(e)})
+        except QueueFull as e:
+            return self._send(429, {"error": str(e), "pool": service.pool.stats()}, {"Retry-After": "5"})
+
+        if wait is not False and not job.kind.startswith("batch"):
+            if job.wait(wait):
+                return self._send(200, job.as_dict())
+        return self._send(202, job.as_dict(include_result=False), {"Location": f"/v1/jobs/{job.id}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def make_server(service: AnalysisService, host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> ThreadingHTTPServer:
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+
+# --- CLI ---
+
+def _read_targets(args) -> list:
+    targets = [t for t in (args.targets or "").split(",") if t.strip()]
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            targets += [line.split("#", 1)[0].strip() for line in f]
+    return [t for t in targets if t]
+
+
+def _params(args) -> dict:
+    return {k: v for k, v in (("period", args.period), ("start_date", args.start_date),
+                              ("end_date", args.end_date), ("year", args.year), ("quarter", args.quarter))
+            if v is not None}
+
+
+def cmd_serve(args, service: AnalysisService):
+    httpd = make_server(service, args.host, args.port)
+    print(f"[Service] listening on http://{args.host}:{httpd.server_address[1]} "
+          f"({service.pool.workers} workers, queue {service.pool.queue_size})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.pool.shutdown(wait=False)
+
+
+def cmd_run(args, service: AnalysisService, out) -> int:
+    if args.kind == "chat":
+        job = service.submit_chat(args.target)
+    else:
+        job = service.submit_analysis(args.kind, args.target, _params(args))
+    job.wait()
+    if job.error:
+        print(f"error: {job.error}", file=sys.stderr)
+        return 1
+    print(job.result, file=out)
+    return 0
+
+
+def cmd_batch(args, service: AnalysisService, out) -> int:
+    job = service.submit_batch(args.kind, _read_targets(args), _params(args))
+    spinner = itertools.cycle("|/-\\")
+    while not job.wait(1.0):
+        progress = job.as_dict(include_result=False)["progress"]
+        print(f"\r{next(spinner)} {progress['done']}/{progress['total']} done, {progress['failed']} failed, "
+              f"pool {service.pool.stats()['running']} running", end="", file=sys.stderr, flush=True)
+    print(f"\r{job.done}/{job.total} done, {job.failed} failed in {job.finished - job.created:.0f}s",
+          file=sys.stderr)
+    with open(args.out, "w", encoding="utf-8") if args.out else contextlib.nullcontext(out) as f:
+        for target, outcome in (job.result or {}).items():
+            f.write(json.dumps({"target": target, **outcome}) + "\n")
+    return 1 if job.failed == job.total else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless analysis service")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the HTTP API")
+    serve.add_argument("--host", default=SERVICE_HOST)
+    serve.add_argument("--port", type=int, default=SERVICE_PORT)
+
+    def analysis_options(sub):
+        sub.add_argument("--period", help="technical: e.g. 6mo, 1y")
+        sub.add_argument("--start-date")
+        sub.add_argument("--end-date")
+        sub.add_argument("--year", type=int, help="fundamental")
+        sub.add_argument("--quarter", type=int, help="fundamental")
+
+    run = commands.add_parser("run", help="run one analysis or chat turn and print the report")
+    run.add_argument("kind", choices=ANALYSIS_KINDS + ("chat",))
+    run.add_argument("target", help="ticker, country, or the chat message")
+    analysis_options(run)
+
+    batch = commands.add_parser("batch", help="run one kind of analysis for many targets, JSONL out")
+    batch.add_argument("kind", choices=ANALYSIS_KINDS)
+    batch.add_argument("--targets", help="comma-separated tickers or countries")
+    batch.add_argument("--file", help="one target per line ('#' starts a comment)")
+    batch.add_argument("--out", help="JSONL output file (default stdout)")
+    analysis_options(batch)
+
+    args = parser.parse_args(argv)
+    if not os.getenv("OPENAI_API_KEY"):
+        parser.error("OPENAI_API_KEY is not set")
+    service = AnalysisService(pool=WorkerPool(args.workers, args.queue_size))
+    if args.command == "serve":
+        cmd_serve(args, service)
+        return 0
+    # Log pipeline/crewai ditulis ke stdout; dialihkan ke stderr supaya stdout hanya berisi hasil
+    out = sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.command == "run":
+                return cmd_run(args, service, out)
+            return cmd_batch(args, service, out)
+    except InvalidRequest as e:
+        parser.error(str(e))
+    finally:
+        service.pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import re
+import difflib
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]|_")
+
+# Daftar negara dan kode-nya
+COUNTRY_LIST = [
+    ('Albania', 'AL'), ('Algeria', 'DZ'), ('Angola', 'AO'), ('Argentina', 'AR'),
+    ('Australia', 'AU'), ('Austria', 'AT'), ('Azerbaijan', 'AZ'), ('Bangladesh', 'BD'),
+    ('Belarus', 'BY'), ('Belgium', 'BE'), ('Bolivia', 'BO'), ('Bosnia And Herzegovina', 'BA'),
+    ('Brazil', 'BR'), ('Bulgaria', 'BG'), ('Cambodia', 'KH'), ('Canada', 'CA'),
+    ('Chile', 'CL'), ('China', 'CN'), ('Colombia', 'CO'), ('Costa Rica', 'CR'),
+    ('Croatia', 'HR'), ('Cyprus', 'CY'), ('Czechia', 'CZ'), ('Democratic Republic Of Congo', 'CD'),
+    ('Denmark', 'DK'), ('Dominican Republic', 'DO'), ('Ecuador', 'EC'), ('Egypt', 'EG'),
+    ('El Salvador', 'SV'), ('Estonia', 'EE'), ('Ethiopia', 'ET'), ('European Union', 'EU'),
+    ('Finland', 'FI'), ('France', 'FR'), ('Germany', 'DE'), ('Ghana', 'GH'),
+    ('Greece', 'GR'), ('Guatemala', 'GT'), ('Honduras', 'HN'), ('Hong Kong', 'HK'),
+    ('Hungary', 'HU'), ('India', 'IN'), ('Indonesia', 'ID'), ('Iran', 'IR'),
+    ('Iraq', 'IQ'), ('Ireland', 'IE'), ('Israel', 'IL'), ('Italy', 'IT'),
+    ('Japan', 'JP'), ('Jordan', 'JO'), ('Kazakhstan', 'KZ'), ('Kenya', 'KE'),
+    ('Kuwait', 'KW'), ('Kyrgyzstan', 'KG'), ('Laos', 'LA'), ('Latvia', 'LV'),
+    ('Lebanon', 'LB'), ('Libya', 'LY'), ('Lithuania', 'LT'), ('Luxembourg', 'LU'),
+    ('Macao', 'MO'), ('Malaysia', 'MY'), ('Mexico', 'MX'), ('Mongolia', 'MN'),
+    ('Morocco', 'MA'), ('Myanmar', 'MM'), ('Nepal', 'NP'), ('Netherlands', 'NL'),
+    ('New Zealand', 'NZ'), ('Nicaragua', 'NI'), ('Nigeria', 'NG'), ('Norway', 'NO'),
+    ('Oman', 'OM'), ('Pakistan', 'PK'), ('Panama', 'PA'), ('Paraguay', 'PY'),
+    ('Peru', 'PE'), ('Philippines', 'PH'), ('Poland', 'PL'), ('Portugal', 'PT'),
+    ('Qatar', 'QA'), ('Romania', 'RO'), ('Russian Federation', 'RU'), ('Saudi Arabia', 'SA'),
+    ('Senegal', 'SN'), ('Serbia', 'RS'), ('Singapore', 'SG'), ('Slovakia', 'SK'),
+    ('Slovenia', 'SI'), ('South Africa', 'ZA'), ('South Korea', 'KR'), ('Spain', 'ES'),
+    ('Sri Lanka', 'LK'), ('Sudan', 'SD'), ('Sweden', 'SE'), ('Switzerland', 'CH'),
+    ('Taiwan', 'TW'), ('Tajikistan', 'TJ'), ('Tanzania', 'TZ'), ('Thailand', 'TH'),
+    ('Tunisia', 'TN'), ('Turkey', 'TR'), ('Turkmenistan', 'TM'), ('Ukraine', 'UA'),
+    ('United Arab Emirates', 'AE'), ('United Kingdom', 'UK'), ('United States', 'US'),
+    ('Uruguay', 'UY'), ('Uzbekistan', 'UZ'), ('Venezuela', 'VE'), ('Vietnam', 'VN')
+]
+
+# ISO 3166-1 alpha-3 per kode di atas (UK = GBR; EU tidak punya kode ISO)
+ISO3_CODES = {
+    'AL': 'ALB', 'DZ': 'DZA', 'AO': 'AGO', 'AR': 'ARG', 'AU': 'AUS', 'AT': 'AUT', 'AZ': 'AZE', 'BD': 'BGD',
+    'BY': 'BLR', 'BE': 'BEL', 'BO': 'BOL', 'BA': 'BIH', 'BR': 'BRA', 'BG': 'BGR', 'KH': 'KHM', 'CA': 'CAN',
+    'CL': 'CHL', 'CN': 'CHN', 'CO': 'COL', 'CR': 'CRI', 'HR': 'HRV', 'CY': 'CYP', 'CZ': 'CZE', 'CD': 'COD',
+    'DK': 'DNK', 'DO': 'DOM', 'EC': 'ECU', 'EG': 'EGY', 'SV': 'SLV', 'EE': 'EST', 'ET': 'ETH', 'FI': 'FIN',
+    'FR': 'FRA', 'DE': 'DEU', 'GH': 'GHA', 'GR': 'GRC', 'GT': 'GTM', 'HN': 'HND', 'HK': 'HKG', 'HU': 'HUN',
+    'IN': 'IND', 'ID': 'IDN', 'IR': 'IRN', 'IQ': 'IRQ', 'IE': 'IRL', 'IL': 'ISR', 'IT': 'ITA', 'JP': 'JPN',
+    'JO': 'JOR', 'KZ': 'KAZ', 'KE': 'KEN', 'KW': 'KWT', 'KG': 'KGZ', 'LA': 'LAO', 'LV': 'LVA', 'LB': 'LBN',
+    'LY': 'LBY', 'LT': 'LTU', 'LU': 'LUX', 'MO': 'MAC', 'MY': 'MYS', 'MX': 'MEX', 'MN': 'MNG', 'MA': 'MAR',
+    'MM': 'MMR', 'NP': 'NPL', 'NL': 'NLD', 'NZ': 'NZL', 'NI': 'NIC', 'NG': 'NGA', 'NO': 'NOR', 'OM': 'OMN',
+    'PK': 'PAK', 'PA': 'PAN', 'PY': 'PRY', 'PE': 'PER', 'PH': 'PHL', 'PL': 'POL', 'PT': 'PRT', 'QA': 'QAT',
+    'RO': 'ROU', 'RU': 'RUS', 'SA': 'SAU', 'SN': 'SEN', 'RS': 'SRB', 'SG': 'SGP', 'SK': 'SVK', 'SI': 'SVN',
+    'ZA': 'ZAF', 'KR': 'KOR', 'ES': 'ESP', 'LK': 'LKA', 'SD': 'SDN', 'SE': 'SWE', 'CH': 'CHE', 'TW': 'TWN',
+    'TJ': 'TJK', 'TZ': 'TZA', 'TH': 'THA', 'TN': 'TUN', 'TR': 'TUR', 'TM': 'TKM', 'UA': 'UKR', 'AE': 'ARE',
+    'UK': 'GBR', 'US': 'USA', 'UY': 'URY', 'UZ': 'UZB', 'VE': 'VEN', 'VN': 'VNM',
+}
+
+# Nama lain -> kode
+COUNTRY_ALIASES = {
+    'usa': 'US', 'us': 'US', 'u s': 'US', 'u s a': 'US', 'america': 'US', 'united states of america': 'US',
+    'uk': 'UK', 'gb': 'UK', 'britain': 'UK', 'great britain': 'UK', 'england': 'UK',
+    'korea': 'KR', 'republic of korea': 'KR', 'russia': 'RU', 'uae': 'AE', 'emirates': 'AE',
+    'czech republic': 'CZ', 'turkiye': 'TR', 'holland': 'NL', 'drc': 'CD', 'congo': 'CD',
+    'dr congo': 'CD', 'bosnia': 'BA', 'viet nam': 'VN', 'prc': 'CN', 'mainland china': 'CN',
+    'ksa': 'SA', 'eu': 'EU', 'eurozone': 'EU', 'euro area': 'EU', 'macau': 'MO', 'lao pdr': 'LA', 'burma': 'MM',
+}
+
+
+class Country(NamedTuple):
+    name: str
+    code: str
+    iso3: Optional[str]
+
+
+def normalize_country(text: str) -> str:
+    text = str(text or "").casefold().replace("&", " and ")
+    return " ".join(_PUNCTUATION_RE.sub(" ", text).split())
+
+
+class CountryIndex:
+    """
+    Immutable lookup table over COUNTRY_LIST, built once at import.
+
+    resolve() tries, in order: exact name, alias, ISO-3 code, then an unambiguous prefix of the name
+    or of one of its words (3+ letters). Fuzzy matching is opt-in. Bare two-letter codes are not
+    read from free text (BA, DE, IT, MA are also tickers); use by_code() for those, the aliases
+    cover US, UK and EU.
+    """
+    def __init__(self, countries=COUNTRY_LIST, aliases=COUNTRY_ALIASES, iso3_codes=ISO3_CODES,
+                 min_prefix: int = 3):
+        by_code = {code: Country(name, code, iso3_codes.get(code)) for name, code in countries}
+        exact = {}
+        for country in by_code.values():
+            exact[normalize_country(country.name)] = country
+        for alias, code in aliases.items():
+            exact.setdefault(normalize_country(alias), by_code[code])
+        for country in by_code.values():
+            if country.iso3:
+                exact.setdefault(country.iso3.casefold(), country)
+
+        # Prefix diambil dari nama dan alias panjang saja, bukan dari kode
+        sources = [(normalize_country(c.name), c) for c in by_code.values()]
+        sources += [(normalize_country(a), by_code[code]) for a, code in aliases.items() if len(a) > 3]
+        prefixes = {}
+        for key, country in sources:
+            words = key.split()
+            for start in [" ".join(words[i:]) for i in range(len(words))]:
+                for end in range(min_prefix, len(start) + 1):
+                    prefixes.setdefault(start[:end], set()).add(country.code)
+        unique_prefixes = {
+            prefix: by_code[next(iter(codes))]
+            for prefix, codes in prefixes.items() if len(codes) == 1 and prefix not in exact
+        }
+
+        self._by_code = MappingProxyType(by_code)
+        self._exact = MappingProxyType(exact)
+        self._prefixes = MappingProxyType(unique_prefixes)
+        self._names = tuple(normalize_country(name) for name, _ in countries)
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def by_code(self, code: str) -> Optional[Country]:
+        return self._by_code.get(str(code or "").strip().upper())
+
+    def resolve(self, text: str, fuzzy: bool = False, cutoff: float = 0.85) -> Optional[Country]:
+        key = normalize_country(text)
+        if not key:
+            return None
+        country = self._exact.get(key) or self._prefixes.get(key)
+        if country is not None or not fuzzy:
+            return country
+        match = difflib.get_close_matches(key, self._names, n=1, cutoff=cutoff)
+        return self._exact[match[0]] if match else None
+
+    def resolve_many(self, texts, fuzzy: bool = False) -> dict:
+        return {text: self.resolve(text, fuzzy=fuzzy) for text in texts}
+
+
+COUNTRY_INDEX = CountryIndex()
+
+
+def get_country_code(text: str, fuzzy: bool = False) -> Optional[str]:
+    country = COUNTRY_INDEX.resolve(text, fuzzy=fuzzy)
+    return country.code if country else None
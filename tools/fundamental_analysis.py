@@ -1,9 +1,12 @@
-import yfinance as yf
 import logging
 import pandas as pd
 import os
 from datetime import datetime
 from crewai.tools import BaseTool
+import tracing
+from tools.yf_cache import get_yahoo_cache
+from tools.payload import encode_payload
+from tools.peer_screener import get_peer_screener
 
 class FundamentalAnalysisTool(BaseTool):
     name: str = "FundamentalAnalysisTool"
@@ -15,8 +18,8 @@ class FundamentalAnalysisTool(BaseTool):
         """
         try:
             # Fetching stock data
-            stock = yf.Ticker(company_ticker)
-            data = stock.info
+            yahoo = get_yahoo_cache()
+            data = yahoo.info(company_ticker)
 
             # Financial Ratios
             ratios = {
@@ -51,13 +54,13 @@ class FundamentalAnalysisTool(BaseTool):
             }
 
             # Revenue and Earnings Growth Trends (3 years)
-            historical_data = stock.financials.infer_objects(copy=False)
+            historical_data = yahoo.financials(company_ticker).infer_objects(copy=False)
             historical_data = historical_data.ffill()
             revenue_growth = self.calculate_growth(historical_data.loc['Total Revenue'])
             earnings_growth = self.calculate_growth(historical_data.loc['Net Income'])
 
             # DCF Calculation
-            cash_flow = stock.cashflow.infer_objects(copy=False)
+            cash_flow = yahoo.cashflow(company_ticker).infer_objects(copy=False)
             cash_flow = cash_flow.ffill()
             free_cash_flow = cash_flow.loc['Free Cash Flow'].dropna().iloc[0] if 'Free Cash Flow' in cash_flow.index else None
             growtRate =  data.get('longTermPotentialGrowthRate', 0.03)
@@ -139,5 +142,18 @@ class FundamentalAnalysisTool(BaseTool):
         except Exception as e:
             return f"DCF valuation not available: {str(e)}"
 
-    def _run(self, company_ticker: str) -> dict:
-        return self.get_fundamental_data(company_ticker)
+    @tracing.traced("tool.FundamentalAnalysisTool")
+    def _run(self, company_ticker: str) -> str:
+        return encode_payload(self.get_fundamental_data(company_ticker))
+
+
+class PeerComparisonTool(BaseTool):
+    name: str = "PeerComparisonTool"
+    description: str = (
+        "Compare a company with its industry (or sector) peers: percentile ranks for P/E, P/B, margins, "
+        "ROE, debt to equity and growth, peer medians and the top-ranked peers."
+    )
+
+    @tracing.traced("tool.PeerComparisonTool")
+    def _run(self, company_ticker: str) -> str:
+        return encode_payload(get_peer_screener().screen(company_ticker))
@@ -0,0 +1,242 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import tracing
+from tools.yf_cache import get_yahoo_cache
+
+FUNDAMENTAL_FETCH_WORKERS = int(os.getenv("FUNDAMENTAL_FETCH_WORKERS", "8"))
+# Kuartal tahun lalu dicari di sekitar tanggal yang sama; akhir kuartal fiskal bisa bergeser beberapa hari
+YOY_TOLERANCE_DAYS = 15
+
+# Nama baris laporan yfinance; label pertama yang ada dan terisi yang dipakai (nama baris berubah antar versi)
+INCOME_LABELS = {
+    "revenue": ["Total Revenue", "Operating Revenue"],
+    "gross_profit": ["Gross Profit"],
+    "operating_income": ["Operating Income"],
+    "net_income": ["Net Income", "Net Income Common Stockholders"],
+    "eps": ["Diluted EPS", "Basic EPS"],
+}
+BALANCE_LABELS = {
+    "cash_equivalents": ["Cash And Cash Equivalents"],
+    "total_debt": ["Total Debt"],
+    "net_debt": ["Net Debt"],
+    "current_assets": ["Current Assets", "Total Current Assets"],
+    "current_liabilities": ["Current Liabilities", "Total Current Liabilities"],
+    "inventory": ["Inventory"],
+    "total_assets": ["Total Assets"],
+    "total_equity": ["Stockholders Equity", "Total Stockholder Equity", "Common Stock Equity"],
+}
+CASHFLOW_LABELS = {
+    "free_cash_flow": ["Free Cash Flow"],
+    "operating_cash_flow": ["Operating Cash Flow"],
+    "buyback": ["Repurchase Of Capital Stock"],
+    "dividend": ["Cash Dividends Paid", "Common Stock Dividend Paid"],
+}
+
+METRICS = [
+    "revenue", "net_income", "eps",
+    "gross_margin", "operating_margin", "net_margin",
+    "revenue_growth_vs_prev", "net_income_growth_vs_prev",
+    "revenue_growth_yoy", "net_income_growth_yoy",
+    "current_ratio", "quick_ratio", "debt_to_equity", "debt_to_assets",
+    "roe", "roa",
+    "free_cash_flow", "operating_cash_flow", "cash_equivalents",
+    "total_debt", "net_debt", "buyback", "dividend",
+]
+
+
+def line_items(statement: pd.DataFrame, labels: dict) -> pd.DataFrame:
+    """Statement (rows = line items, columns = quarter dates) -> quarters x named items."""
+    if statement is None or statement.empty:
+        return pd.DataFrame(columns=list(labels), dtype=float)
+    if not statement.index.is_unique:
+        statement = statement.loc[~statement.index.duplicated()]
+    try:
+        values = statement.to_numpy(dtype=float)
+    except (TypeError, ValueError):
+        values = statement.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    # Baris kosong tambahan di akhir untuk label yang tidak ada (indexer -1)
+    values = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+
+    wanted = [label for candidates in labels.values() for label in candidates]
+    rows = values[statement.index.get_indexer(wanted)]
+    items = np.empty((values.shape[1], len(labels)))
+    offset = 0
+    for i, candidates in enumerate(labels.values()):
+        block = rows[offset:offset + len(candidates)]
+        offset += len(candidates)
+        # Per kuartal: nilai pertama yang tidak NaN di antara label kandidat
+        first = np.argmax(~np.isnan(block), axis=0)
+        items[:, i] = block[first, np.arange(block.shape[1])]
+    return pd.DataFrame(items, index=pd.to_datetime(statement.columns), columns=list(labels))
+
+
+def statement_items(income: pd.DataFrame, balance: pd.DataFrame, cashflow: pd.DataFrame) -> pd.DataFrame:
+    """The three quarterly statements of one ticker -> quarters (oldest first) x line items."""
+    items = pd.concat([
+        line_items(income, INCOME_LABELS),
+        line_items(balance, BALANCE_LABELS),
+        line_items(cashflow, CASHFLOW_LABELS),
+    ], axis=1)
+    if not items.index.is_unique:
+        items = items.groupby(level=0).first()
+    return items.sort_index()
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = numerator / denominator * scale
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def _growth(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    return _ratio(current - previous, np.abs(previous), 100)
+
+
+def previous_reported(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Per row, the previous non-NaN value of the same group (rows sorted by group, then date)."""
+    previous = np.full_like(values, np.nan)
+    reported = np.flatnonzero(~np.isnan(values))
+    same_group = groups[reported[1:]] == groups[reported[:-1]]
+    previous[reported[1:][same_group]] = values[reported[:-1][same_group]]
+    return previous
+
+
+def same_quarter_last_year(values: np.ndarray, groups: np.ndarray, days: np.ndarray,
+                           tolerance_days: int = YOY_TOLERANCE_DAYS) -> np.ndarray:
+    """Per row, the reported value of the same group closest to one year earlier (within tolerance)."""
+    result = np.full_like(values, np.nan)
+    reported = np.flatnonzero(~np.isnan(values))
+    if reported.size == 0:
+        return result
+    # Kunci gabungan (grup, hari) menjaga urutan sehingga cukup satu searchsorted untuk semua ticker
+    span = int(days.max() - days.min()) + 2 * 366
+    keys = groups[reported] * span + (days[reported] - days.min() + 366)
+    targets = groups * span + (days - 365 - days.min() + 366)
+    right = np.clip(np.searchsorted(keys, targets), 0, reported.size - 1)
+    left = np.clip(right - 1, 0, reported.size - 1)
+    nearest = np.where(np.abs(keys[left] - targets) <= np.abs(keys[right] - targets), left, right)
+    found = reported[nearest]
+    ok = (groups[found] == groups) & (np.abs(keys[nearest] - targets) <= tolerance_days)
+    result[ok] = values[found[ok]]
+    return result
+
+
+def compute_metrics(items: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every metric for every (ticker, quarter) row at once. `items` is indexed by (ticker, quarter),
+    sorted, with the line-item columns of statement_items. Percentages are in percent; missing
+    inputs give NaN.
+    """
+    groups = np.zeros(len(items), dtype=np.int64)
+    if isinstance(items.index, pd.MultiIndex) and len(items):
+        # Nomor urut blok ticker (baris satu ticker berurutan), bukan kode level yang urutannya alfabetis
+        codes = items.index.codes[0]
+        groups[1:] = np.cumsum(codes[1:] != codes[:-1])
+    dates = items.index.get_level_values(-1)
+    days = dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    col = {name: items[name].to_numpy(dtype=float) for name in items.columns}
+
+    revenue, net_income, equity = col["revenue"], col["net_income"], col["total_equity"]
+    metrics = {
+        "revenue": revenue,
+        "net_income": net_income,
+        "eps": col["eps"],
+        "gross_margin": _ratio(col["gross_profit"], revenue, 100),
+        "operating_margin": _ratio(col["operating_income"], revenue, 100),
+        "net_margin": _ratio(net_income, revenue, 100),
+        "revenue_growth_vs_prev": _growth(revenue, previous_reported(revenue, groups)),
+        "net_income_growth_vs_prev": _growth(net_income, previous_reported(net_income, groups)),
+        "revenue_growth_yoy": _growth(revenue, same_quarter_last_year(revenue, groups, days)),
+        "net_income_growth_yoy": _growth(net_income, same_quarter_last_year(net_income, groups, days)),
+        "current_ratio": _ratio(col["current_assets"], col["current_liabilities"]),
+        "quick_ratio": _ratio(col["current_assets"] - np.nan_to_num(col["inventory"]), col["current_liabilities"]),
+        "debt_to_equity": _ratio(col["total_debt"], equity),
+        "debt_to_assets": _ratio(col["total_debt"], col["total_assets"]),
+        "roe": _ratio(net_income, equity, 100),
+        "roa": _ratio(net_income, col["total_assets"], 100),
+    }
+    for name in ["free_cash_flow", "operating_cash_flow", "cash_equivalents", "total_debt", "net_debt",
+                 "buyback", "dividend"]:
+        metrics[name] = col[name]
+    return pd.DataFrame(metrics, index=items.index, columns=METRICS)
+
+
+def quarterly_metrics(income: pd.DataFrame, balance: pd.DataFrame, cashflow: pd.DataFrame) -> pd.DataFrame:
+    """One ticker: rows are quarter dates (oldest first), columns follow METRICS."""
+    metrics = compute_metrics(statement_items(income, balance, cashflow))
+    metrics.index.name = "quarter"
+    return metrics
+
+
+def tidy(metrics: pd.DataFrame) -> pd.DataFrame:
+    """(ticker, quarter) x metrics frame -> long (ticker, quarter, metric, value) rows without NaN."""
+    n_rows, n_cols = metrics.shape
+    values = metrics.to_numpy(dtype=float).ravel()
+    keep = ~np.isnan(values)
+    return pd.DataFrame({
+        "ticker": np.repeat(metrics.index.get_level_values(0).to_numpy(dtype=object), n_cols)[keep],
+        "quarter": np.repeat(metrics.index.get_level_values(1).to_numpy(), n_cols)[keep],
+        "metric": np.tile(metrics.columns.to_numpy(dtype=object), n_rows)[keep],
+        "value": values[keep],
+    })
+
+
+def ticker_items(ticker: str, yahoo=None) -> pd.DataFrame:
+    yahoo = yahoo or get_yahoo_cache()
+    return statement_items(
+        yahoo.quarterly_financials(ticker),
+        yahoo.quarterly_balance_sheet(ticker),
+        yahoo.quarterly_cashflow(ticker),
+    )
+
+
+def fundamentals_table(tickers: list, metrics: list = None, quarters: int = None,
+                       max_workers: int = FUNDAMENTAL_FETCH_WORKERS, yahoo=None) -> pd.DataFrame:
+    """
+    Tidy (ticker, quarter, metric, value) table for many tickers. Statements are fetched
+    concurrently through the shared Yahoo cache, then the metrics of all tickers are computed
+    in one pass; `quarters` keeps the latest N per ticker. Tickers that fail are listed in
+    `table.attrs["errors"]` instead of aborting the batch.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    yahoo = yahoo or get_yahoo_cache()
+
+    def load(ticker):
+        try:
+            return ticker_items(ticker, yahoo)
+        except Exception as e:
+            return e
+
+    frames, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers) or 1))) as pool:
+        for ticker, result in zip(tickers, pool.map(tracing.wrap(load), tickers)):
+            if isinstance(result, Exception):
+                errors[ticker] = str(result)
+            elif not result.empty:
+                frames[ticker] = result
+
+    if frames:
+        items = pd.concat(frames, names=["ticker", "quarter"])
+        table = compute_metrics(items)
+        if quarters:
+            table = table.groupby(level=0, sort=False).tail(quarters)
+        if metrics:
+            table = table[[m for m in metrics if m in table.columns]]
+        table = tidy(table)
+    else:
+        table = pd.DataFrame(columns=["ticker", "quarter", "metric", "value"])
+    table.attrs["errors"] = errors
+    return table
+
+
+def nested(table: pd.DataFrame) -> dict:
+    """Tidy table -> {ticker: {metric: {quarter: value}}}, the shape tools.payload renders compactly."""
+    result = {}
+    for (ticker, metric), rows in table.groupby(["ticker", "metric"], sort=False):
+        result.setdefault(ticker, {})[metric] = dict(zip(rows["quarter"], rows["value"]))
+    return result
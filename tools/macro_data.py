@@ -0,0 +1,212 @@
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pandas as pd
+import requests
+
+import tracing
+
+ECONDB_URL = "https://www.econdb.com/api/series/{code}/"
+ECONDB_TOKEN = os.getenv("ECONDB_TOKEN", "6c2b3a95a441987ce777a9133aa601d957d4be35")
+MACRO_CACHE_DIR = os.getenv("MACRO_CACHE_DIR", os.path.join(".cache", "econdb"))
+# Data makro rilis bulanan/kuartalan, jadi cukup dicek ulang sekali sehari
+MACRO_SERIES_MAX_AGE_HOURS = float(os.getenv("MACRO_SERIES_MAX_AGE_HOURS", "24"))
+MACRO_LOOKBACK_YEARS = float(os.getenv("MACRO_LOOKBACK_YEARS", "5"))
+MACRO_FETCH_WORKERS = int(os.getenv("MACRO_FETCH_WORKERS", "6"))
+
+# Label output -> prefix kode seri econdb (kode lengkap = prefix + kode negara)
+DEFAULT_SERIES = {"GDP": "GDP", "Inflation": "CPI", "Unemployment": "URATE"}
+EXTRA_SERIES = {
+    "Policy rate": "POLIR",
+    "10Y bond yield": "Y10YD",
+    "Industrial production": "IP",
+    "Retail sales": "RETA",
+    "Current account": "CA",
+}
+
+
+def parse_series_setting(value: str) -> dict:
+    """"Label=PREFIX,Label2=PREFIX2" -> {"Label": "PREFIX", ...}; bare names use EXTRA_SERIES."""
+    series = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        if "=" in item:
+            label, prefix = (x.strip() for x in item.split("=", 1))
+            series[label] = prefix.upper()
+        else:
+            label = next((k for k in EXTRA_SERIES if k.lower() == item.lower()), None)
+            if label:
+                series[label] = EXTRA_SERIES[label]
+            else:
+                series[item] = item.upper()
+    return series
+
+
+# Seri tambahan yang selalu diambil, misalnya "Policy rate,PMI=PMI"
+CONFIGURED_EXTRA_SERIES = parse_series_setting(os.getenv("MACRO_EXTRA_SERIES", ""))
+
+
+class SeriesResponse:
+    def __init__(self, data: Optional[pd.DataFrame], etag: str = None, last_modified: str = None):
+        self.data = data  # None artinya tidak berubah (HTTP 304)
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class EconDBProvider:
+    """econdb CSV download over one shared keep-alive session, with conditional requests."""
+    def __init__(self, token: str = ECONDB_TOKEN, session: requests.Session = None, timeout: float = 20):
+        self.token = token
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.calls = 0
+
+    def fetch(self, code: str, etag: str = None, last_modified: str = None) -> SeriesResponse:
+        self.calls += 1
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        with tracing.span("http.econdb", series=code, conditional=bool(headers)) as http_span:
+            response = self.session.get(
+                ECONDB_URL.format(code=code), params={"token": self.token, "format": "csv"},
+                headers=headers, timeout=self.timeout,
+            )
+            http_span.set("http.response.status_code", response.status_code)
+            http_span.set("http.response.body.size", len(response.content or b""))
+        if response.status_code == 304:
+            return SeriesResponse(None, etag, last_modified)
+        response.raise_for_status()
+        data = pd.read_csv(io.StringIO(response.text), index_col="Date", parse_dates=["Date"])
+        return SeriesResponse(data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+class CSVFixtureProvider:
+    """Offline provider reading `<directory>/<CODE>.csv` (same layout as the econdb CSV)."""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.calls = 0
+
+    def fetch(self, code: str, etag: str = None, last_modified: str = None) -> SeriesResponse:
+        self.calls += 1
+        path = os.path.join(self.directory, f"{code}.csv")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No fixture for series {code}")
+        stamp = str(os.path.getmtime(path))
+        if etag == stamp:
+            return SeriesResponse(None, etag)
+        return SeriesResponse(pd.read_csv(path, index_col="Date", parse_dates=["Date"]), stamp)
+
+
+class MacroSeriesStore:
+    """
+    Full-history series cached in memory and on disk (`<cache_dir>/<CODE>.csv` plus metadata).
+    A series older than `max_age_hours` is revalidated with the provider; an unchanged answer
+    only refreshes the timestamp. Callers slice the lookback window themselves.
+    """
+    def __init__(self, provider=None, cache_dir: str = MACRO_CACHE_DIR,
+                 max_age_hours: float = MACRO_SERIES_MAX_AGE_HOURS, max_workers: int = MACRO_FETCH_WORKERS):
+        self.provider = provider or EconDBProvider()
+        self.cache_dir = cache_dir
+        self.max_age = max_age_hours * 3600
+        self.max_workers = max_workers
+        self._memory = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _lock_for(self, code: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(code, threading.Lock())
+
+    def _paths(self, code: str):
+        return os.path.join(self.cache_dir, f"{code}.csv"), os.path.join(self.cache_dir, f"{code}.json")
+
+    def _load_disk(self, code: str):
+        if not self.cache_dir:
+            return None, {}
+        data_path, meta_path = self._paths(code)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, {}
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return pd.read_csv(data_path, index_col="Date", parse_dates=["Date"]), meta
+
+    def _save(self, code: str, meta: dict, data: pd.DataFrame = None):
+        if not self.cache_dir:
+            return
+        data_path, meta_path = self._paths(code)
+        if data is not None:
+            data.to_csv(data_path, index_label="Date")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def get(self, code: str) -> pd.DataFrame:
+        with self._lock_for(code):
+            data, meta = self._memory.get(code) or self._load_disk(code)
+            if data is not None and time.time() - meta.get("checked_at", 0) < self.max_age:
+                self._memory[code] = (data, meta)
+                tracing.add("macro.cache_hits")
+                return data
+
+            tracing.add("macro.cache_misses")
+            try:
+                response = self.provider.fetch(code, meta.get("etag"), meta.get("last_modified"))
+            except Exception:
+                if data is not None:
+                    print(f"[Macro Store] refresh of {code} failed, serving cached copy")
+                    return data
+                raise
+            fresh = response.data is not None
+            if fresh:
+                data = response.data.sort_index()
+                meta = {"etag": response.etag, "last_modified": response.last_modified}
+            meta["checked_at"] = time.time()
+            # 304: cukup perbarui metadata, CSV di disk tetap
+            self._save(code, meta, data if fresh else None)
+            self._memory[code] = (data, meta)
+            return data
+
+    def get_many(self, codes: list) -> dict:
+        """{code: DataFrame or Exception}; series are fetched concurrently."""
+        codes = list(dict.fromkeys(codes))
+
+        def safe_get(code):
+            try:
+                return self.get(code)
+            except Exception as e:
+                return e
+
+        with tracing.span("macro.get_many", series=len(codes)), \
+                ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(codes) or 1))) as pool:
+            return dict(zip(codes, pool.map(tracing.wrap(safe_get), codes)))
+
+
+def last_years(data: pd.DataFrame, years: float = MACRO_LOOKBACK_YEARS) -> pd.DataFrame:
+    end = pd.Timestamp.today()
+    start = end - pd.DateOffset(months=int(round(years * 12)))
+    return data.loc[start:end]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_macro_store() -> MacroSeriesStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MacroSeriesStore()
+        return _default_store
+
+
+def set_macro_store(store: MacroSeriesStore):
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
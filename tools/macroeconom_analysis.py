@@ -1,92 +1,117 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
-import yfinance as yf
 import pandas as pd
 import os
+import re
 from dotenv import load_dotenv
-from typing import Type
+from typing import Optional, Type
+import tracing
+from tools.yf_cache import get_yahoo_cache
+from tools.countries import get_country_code
+from tools.symbol_index import get_symbol_index
+from tools.payload import encode_payload
+from tools.macro_data import (
+    CONFIGURED_EXTRA_SERIES,
+    DEFAULT_SERIES,
+    MACRO_LOOKBACK_YEARS,
+    get_macro_store,
+    last_years,
+    parse_series_setting,
+)
 load_dotenv()
 
+
 class MacroeconomicToolInput(BaseModel):
-    description: str 
+    description: str = Field(..., description="Country name or stock ticker; several countries can be separated by commas.")
+    lookback_years: Optional[float] = Field(None, description="Years of history to return (default 5).")
+    extra_series: Optional[str] = Field(
+        None, description="Comma separated extra series, e.g. 'Policy rate, 10Y bond yield, Industrial production'."
+    )
 
 class MacroeconomicTool(BaseTool):
     name: str = "MacroEconomicDataTool"
-    description: str = "Tool to fetch macroeconomic data such as GDP, inflation, unemployment, etc. Accepts either a stock ticker or a country name."
+    description: str = "Tool to fetch macroeconomic data such as GDP, inflation, unemployment, etc. Accepts either a stock ticker or a country name, or several countries separated by commas for a regional comparison."
     args_schema: Type[BaseModel] = MacroeconomicToolInput
 
     def get_country_code(self, country_name: str) -> str:
-        # Daftar negara dan kode-nya
-        country_list = [
-            ('Albania', 'AL'), ('Algeria', 'DZ'), ('Angola', 'AO'), ('Argentina', 'AR'),
-            ('Australia', 'AU'), ('Austria', 'AT'), ('Azerbaijan', 'AZ'), ('Bangladesh', 'BD'),
-            ('Belarus', 'BY'), ('Belgium', 'BE'), ('Bolivia', 'BO'), ('Bosnia And Herzegovina', 'BA'),
-            ('Brazil', 'BR'), ('Bulgaria', 'BG'), ('Cambodia', 'KH'), ('Canada', 'CA'),
-            ('Chile', 'CL'), ('China', 'CN'), ('Colombia', 'CO'), ('Costa Rica', 'CR'),
-            ('Croatia', 'HR'), ('Cyprus', 'CY'), ('Czechia', 'CZ'), ('Democratic Republic Of Congo', 'CD'),
-            ('Denmark', 'DK'), ('Dominican Republic', 'DO'), ('Ecuador', 'EC'), ('Egypt', 'EG'),
-            ('El Salvador', 'SV'), ('Estonia', 'EE'), ('Ethiopia', 'ET'), ('European Union', 'EU'),
-            ('Finland', 'FI'), ('France', 'FR'), ('Germany', 'DE'), ('Ghana', 'GH'),
-            ('Greece', 'GR'), ('Guatemala', 'GT'), ('Honduras', 'HN'), ('Hong Kong', 'HK'),
-            ('Hungary', 'HU'), ('India', 'IN'), ('Indonesia', 'ID'), ('Iran', 'IR'),
-            ('Iraq', 'IQ'), ('Ireland', 'IE'), ('Israel', 'IL'), ('Italy', 'IT'),
-            ('Japan', 'JP'), ('Jordan', 'JO'), ('Kazakhstan', 'KZ'), ('Kenya', 'KE'),
-            ('Kuwait', 'KW'), ('Kyrgyzstan', 'KG'), ('Laos', 'LA'), ('Latvia', 'LV'),
-            ('Lebanon', 'LB'), ('Libya', 'LY'), ('Lithuania', 'LT'), ('Luxembourg', 'LU'),
-            ('Macao', 'MO'), ('Malaysia', 'MY'), ('Mexico', 'MX'), ('Mongolia', 'MN'),
-            ('Morocco', 'MA'), ('Myanmar', 'MM'), ('Nepal', 'NP'), ('Netherlands', 'NL'),
-            ('New Zealand', 'NZ'), ('Nicaragua', 'NI'), ('Nigeria', 'NG'), ('Norway', 'NO'),
-            ('Oman', 'OM'), ('Pakistan', 'PK'), ('Panama', 'PA'), ('Paraguay', 'PY'),
-            ('Peru', 'PE'), ('Philippines', 'PH'), ('Poland', 'PL'), ('Portugal', 'PT'),
-            ('Qatar', 'QA'), ('Romania', 'RO'), ('Russian Federation', 'RU'), ('Saudi Arabia', 'SA'),
-            ('Senegal', 'SN'), ('Serbia', 'RS'), ('Singapore', 'SG'), ('Slovakia', 'SK'),
-            ('Slovenia', 'SI'), ('South Africa', 'ZA'), ('South Korea', 'KR'), ('Spain', 'ES'),
-            ('Sri Lanka', 'LK'), ('Sudan', 'SD'), ('Sweden', 'SE'), ('Switzerland', 'CH'),
-            ('Taiwan', 'TW'), ('Tajikistan', 'TJ'), ('Tanzania', 'TZ'), ('Thailand', 'TH'),
-            ('Tunisia', 'TN'), ('Turkey', 'TR'), ('Turkmenistan', 'TM'), ('Ukraine', 'UA'),
-            ('United Arab Emirates', 'AE'), ('United Kingdom', 'UK'), ('United States', 'US'),
-            ('Uruguay', 'UY'), ('Uzbekistan', 'UZ'), ('Venezuela', 'VE'), ('Vietnam', 'VN')
-        ]
-        df = pd.DataFrame(country_list, columns=['name', 'code'])
-        country_name_clean = country_name.strip().lower()
-
-        match = df[df['name'].str.lower() == country_name_clean]
-        if not match.empty:
-            return match.iloc[0]['code']
-
-        partial = df[df['name'].str.lower().str.contains(country_name_clean)]
-        if not partial.empty:
-            return partial.iloc[0]['code']
-        return None
-
-    def get_macro_data(self, series_code: str) -> pd.DataFrame:
-        url = f"https://www.econdb.com/api/series/{series_code}/?token=6c2b3a95a441987ce777a9133aa601d957d4be35&format=csv"
-        df = pd.read_csv(url, index_col='Date', parse_dates=['Date'])
-        end = pd.Timestamp.today()
-        start = end - pd.DateOffset(years=5)
-        df = df.loc[start:end]
-        return df
-
-    def _run(self, description: str) -> dict:
+        return get_country_code(country_name)
+
+    def get_macro_data(self, series_code: str, lookback_years: float = MACRO_LOOKBACK_YEARS) -> pd.DataFrame:
+        return last_years(get_macro_store().get(series_code), lookback_years)
+
+    def resolve_country_code(self, text: str):
+        # Input huruf besar yang dikenal sebagai ticker dibaca sebagai ticker dulu, bukan kode negara
+        text = text.strip()
+        if not (text.isupper() and text in get_symbol_index()):
+            country_code = self.get_country_code(text)
+            if country_code:
+                return country_code
+        info = get_yahoo_cache().info(text)
+        if not info or "country" not in info:
+            return None
+        return self.get_country_code(info["country"])
+
+    def split_inputs(self, text: str) -> list:
+        # "Indonesia, Malaysia and Thailand" -> tiga negara; satu nama utuh tetap satu input
+        if self.get_country_code(text):
+            return [text]
+        parts = [p.strip() for p in re.split(r",|;|/|\band\b|\bvs\.?\b", text) if p.strip()]
+        if len(parts) > 1 and all(self.get_country_code(p) for p in parts):
+            return parts
+        return [text]
+
+    @tracing.traced("tool.MacroeconomicTool")
+    def _run(self, description: str, lookback_years: Optional[float] = None, extra_series: Optional[str] = None) -> str:
+        return encode_payload(self.get_macro_report(description, lookback_years, extra_series))
+
+    def get_macro_report(self, description: str, lookback_years: Optional[float] = None, extra_series: Optional[str] = None) -> dict:
         # Defensive: handle if input is unexpectedly a dict
         input = description.strip()
+        lookback_years = lookback_years or MACRO_LOOKBACK_YEARS
+        series = {**DEFAULT_SERIES, **CONFIGURED_EXTRA_SERIES, **parse_series_setting(extra_series)}
 
         try:
-            country_code = self.get_country_code(input)
-            if not country_code:
-                info = yf.Ticker(input).info
-                if not info or "country" not in info:
-                    return {"error": "Could not resolve country from input."}
-                country_code = self.get_country_code(info["country"])
-
-            if not country_code:
-                return {"error": f"Unrecognized country: {input}"}
-
-            return {
-                "GDP": self.get_macro_data(f"GDP{country_code}").to_dict(),
-                "Inflation": self.get_macro_data(f"CPI{country_code}").to_dict(),
-                "Unemployment": self.get_macro_data(f"URATE{country_code}").to_dict(),
-            }
+            inputs = self.split_inputs(input)
+            codes = {}
+            for item in inputs:
+                country_code = self.resolve_country_code(item)
+                if not country_code:
+                    if len(inputs) == 1:
+                        return {"error": f"Unrecognized country: {item}"}
+                    codes[item] = None
+                else:
+                    codes[item] = country_code
+
+            # Semua seri untuk semua negara diambil paralel
+            frames = get_macro_store().get_many(
+                [prefix + code for code in codes.values() if code for prefix in series.values()]
+            )
+
+            def country_result(code):
+                result = {}
+                for label, prefix in series.items():
+                    frame = frames[prefix + code]
+                    if isinstance(frame, Exception):
+                        if label in DEFAULT_SERIES:
+                            raise frame
+                        result[label] = {"error": str(frame)}
+                    else:
+                        result[label] = last_years(frame, lookback_years).to_dict()
+                return result
+
+            if len(codes) == 1:
+                return country_result(next(iter(codes.values())))
+
+            def comparison_entry(item, code):
+                # Satu negara yang gagal tidak membuang hasil negara lain
+                if not code:
+                    return {"error": f"Unrecognized country: {item}"}
+                try:
+                    return country_result(code)
+                except Exception as e:
+                    return {"error": str(e)}
+
+            return {item: comparison_entry(item, code) for item, code in codes.items()}
 
         except Exception as e:
             return {"error": str(e)}
@@ -0,0 +1,176 @@
+import datetime as dt
+import json
+import math
+import os
+from numbers import Number
+
+import tracing
+from chat_history import count_tokens
+
+# "table" (baris key: value), "json" (JSON ringkas) atau "raw" (dict apa adanya, perilaku lama)
+TOOL_PAYLOAD_FORMAT = os.getenv("TOOL_PAYLOAD_FORMAT", "table")
+TOOL_PAYLOAD_TOKEN_BUDGET = int(os.getenv("TOOL_PAYLOAD_TOKEN_BUDGET", "1200"))
+SIGNIFICANT_DIGITS = 4
+# Seri waktu yang lebih panjang dari ini diringkas jadi statistik + beberapa titik jangkar
+SERIES_MAX_POINTS = 12
+SERIES_ANCHORS = 6
+# Tingkat kompresi yang dicoba berurutan sampai payload muat di budget
+COMPRESSION_LEVELS = [(SERIES_ANCHORS, SIGNIFICANT_DIGITS), (3, 3), (0, 3)]
+
+_SUFFIXES = [(1e12, "T"), (1e9, "B"), (1e6, "M")]
+
+
+def _is_date(value) -> bool:
+    return isinstance(value, (dt.date, dt.datetime)) or type(value).__name__ == "Timestamp"
+
+
+def format_key(key) -> str:
+    if _is_date(key):
+        if isinstance(key, dt.datetime) and (key.hour, key.minute, key.second) != (0, 0, 0):
+            return key.isoformat(sep=" ", timespec="minutes")
+        return key.strftime("%Y-%m-%d")
+    return str(key)
+
+
+def to_number(value):
+    """numpy/pandas scalars -> plain Python; NaN and infinities -> None."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if hasattr(value, "item") and not isinstance(value, (list, dict)):
+        try:
+            value = value.item()
+        except (ValueError, AttributeError):
+            pass
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def round_number(value, digits: int = SIGNIFICANT_DIGITS):
+    """Rounds to `digits` significant digits; millions and up become 1.23M / 4.5B / 2.1T."""
+    value = to_number(value)
+    if isinstance(value, bool) or not isinstance(value, Number):
+        return value
+    for threshold, suffix in _SUFFIXES:
+        if abs(value) >= threshold:
+            return f"{float(f'{value / threshold:.{digits - 1}g}'):g}{suffix}"
+    if isinstance(value, int):
+        return value
+    rounded = float(f"{value:.{digits}g}")
+    return int(rounded) if rounded.is_integer() and abs(rounded) >= 10 ** (digits - 1) else rounded
+
+
+def _is_series(obj: dict) -> bool:
+    return len(obj) > 1 and all(_is_date(k) for k in obj) and all(
+        v is None or isinstance(to_number(v), Number) for v in obj.values()
+    )
+
+
+def summarize_series(series: dict, anchors: int = SERIES_ANCHORS, digits: int = SIGNIFICANT_DIGITS) -> dict:
+    """Date-keyed series -> range, last value, min/max/mean, change and a few evenly spaced points."""
+    items = sorted(
+        ((k, to_number(v)) for k, v in series.items() if to_number(v) is not None),
+        key=lambda kv: kv[0],
+    )
+    if not items:
+        return {"points": 0}
+    values = [v for _, v in items]
+    first, last = values[0], values[-1]
+    summary = {
+        "points": len(items),
+        "range": f"{format_key(items[0][0])}..{format_key(items[-1][0])}",
+        "last": round_number(last, digits),
+        "min": round_number(min(values), digits),
+        "max": round_number(max(values), digits),
+        "mean": round_number(sum(values) / len(values), digits),
+    }
+    if first:
+        summary["change_%"] = round_number((last - first) / abs(first) * 100, 3)
+    if anchors > 0:
+        step = (len(items) - 1) / max(anchors - 1, 1)
+        picks = sorted({round(i * step) for i in range(anchors)})
+        summary["anchors"] = {format_key(items[i][0]): round_number(items[i][1], digits) for i in picks}
+    return summary
+
+
+def compact(obj, anchors: int = SERIES_ANCHORS, digits: int = SIGNIFICANT_DIGITS,
+            max_points: int = SERIES_MAX_POINTS):
+    """Recursively converts a tool result into small JSON-safe values."""
+    if hasattr(obj, "to_dict") and not isinstance(obj, dict):
+        obj = obj.to_dict()  # DataFrame -> {kolom: {tanggal: nilai}}, Series -> {tanggal: nilai}
+    if isinstance(obj, dict):
+        if _is_series(obj) and len(obj) > max_points:
+            return summarize_series(obj, anchors, digits)
+        return {format_key(k): compact(v, anchors, digits, max_points) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [compact(v, anchors, digits, max_points) for v in obj]
+    if _is_date(obj):
+        return format_key(obj)
+    return round_number(obj, digits)
+
+
+def _scalar(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def render_table(obj, prefix: str = "", lines: list = None) -> list:
+    """Flattens nested dicts into `path: value` lines; leaf-only dicts go on one line."""
+    lines = [] if lines is None else lines
+    if not isinstance(obj, dict):
+        lines.append(f"{prefix}: {_scalar(obj)}" if prefix else _scalar(obj))
+        return lines
+    for key, value in obj.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict) and value and not any(isinstance(v, (dict, list)) for v in value.values()):
+            lines.append(f"{path}: " + ", ".join(f"{k}={_scalar(v)}" for k, v in value.items()))
+        elif isinstance(value, dict):
+            render_table(value, path, lines)
+        elif isinstance(value, list):
+            lines.append(f"{path}: {json.dumps(value, separators=(',', ':'), default=str)}")
+        else:
+            lines.append(f"{path}: {_scalar(value)}")
+    return lines
+
+
+def render(obj, fmt: str = "table") -> str:
+    if fmt == "json":
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+    return "\n".join(render_table(obj))
+
+
+def encode_payload(result, fmt: str = None, token_budget: int = None, model: str = "gpt-3.5-turbo"):
+    """
+    Tool result -> compact text for the agent prompt. Compression is increased step by step
+    (fewer anchor points, fewer digits) until the text fits `token_budget`; a table that still
+    does not fit is cut at the last whole line.
+    """
+    fmt = fmt or TOOL_PAYLOAD_FORMAT
+    token_budget = token_budget or TOOL_PAYLOAD_TOKEN_BUDGET
+    if fmt == "raw" or isinstance(result, str):
+        return result
+    text = _encode(result, fmt, token_budget, model)
+    if tracing.enabled():
+        tracing.set_attribute("payload.format", fmt)
+        tracing.set_attribute("payload.chars", len(text))
+        tracing.set_attribute("payload.tokens", count_tokens(text, model))
+    return text
+
+
+def _encode(result, fmt: str, token_budget: int, model: str) -> str:
+    text = ""
+    for anchors, digits in COMPRESSION_LEVELS:
+        text = render(compact(result, anchors, digits), fmt)
+        if count_tokens(text, model) <= token_budget:
+            return text
+    if fmt != "table":
+        return text
+
+    kept, used = [], 0
+    for line in text.splitlines():
+        tokens = count_tokens(line, model) + 1
+        if used + tokens > token_budget - 12:
+            break
+        kept.append(line)
+        used += tokens
+    kept.append(f"... (truncated to ~{token_budget} tokens)")
+    return "\n".join(kept)
@@ -0,0 +1,334 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+import tracing
+from tools.symbol_index import get_symbol_index, normalize_symbol
+from tools.yf_cache import get_yahoo_cache
+
+PEER_UNIVERSE_PATH = os.getenv("PEER_UNIVERSE_PATH", os.path.join(".cache", "peer_universe.csv"))
+PEER_FETCH_WORKERS = int(os.getenv("PEER_FETCH_WORKERS", "16"))
+# Batas waktu total untuk mengambil data peer; yang belum selesai dilewati dan dilaporkan
+PEER_SCREEN_BUDGET_SECONDS = float(os.getenv("PEER_SCREEN_BUDGET_SECONDS", "20"))
+PEER_MAX_PEERS = int(os.getenv("PEER_MAX_PEERS", "50"))
+# Simbol universe yang belum terklasifikasi dicoba ulang sebanyak ini per screen
+PEER_RETRY_BATCH = int(os.getenv("PEER_RETRY_BATCH", "16"))
+PEER_RETRY_BUDGET_SECONDS = float(os.getenv("PEER_RETRY_BUDGET_SECONDS", "2"))
+# Warm-up universe di background: budget per putaran dan jeda sebelum mencoba ulang yang gagal
+PEER_WARMUP_BUDGET_SECONDS = float(os.getenv("PEER_WARMUP_BUDGET_SECONDS", "120"))
+PEER_WARMUP_RETRY_SECONDS = float(os.getenv("PEER_WARMUP_RETRY_SECONDS", "600"))
+# Industri dengan peer lebih sedikit dari ini dibandingkan di level sektor
+PEER_MIN_INDUSTRY_PEERS = int(os.getenv("PEER_MIN_INDUSTRY_PEERS", "5"))
+
+UNIVERSE_COLUMNS = ["symbol", "name", "sector", "industry", "country", "market_cap"]
+
+# Kolom rasio -> key yfinance info, sama dengan FundamentalAnalysisTool
+RATIO_FIELDS = {
+    "pe": "trailingPE",
+    "forward_pe": "forwardPE",
+    "pb": "priceToBook",
+    "gross_margin": "grossMargins",
+    "operating_margin": "operatingMargins",
+    "net_margin": "profitMargins",
+    "roe": "returnOnEquity",
+    "debt_to_equity": "debtToEquity",
+    "revenue_growth": "revenueGrowth",
+    "earnings_growth": "earningsGrowth",
+    "market_cap": "marketCap",
+}
+# Metrik yang diranking; False berarti makin kecil makin baik
+RANKED_METRICS = {
+    "pe": False,
+    "forward_pe": False,
+    "pb": False,
+    "gross_margin": True,
+    "operating_margin": True,
+    "net_margin": True,
+    "roe": True,
+    "debt_to_equity": False,
+    "revenue_growth": True,
+    "earnings_growth": True,
+}
+# Valuasi negatif (rugi / ekuitas negatif) tidak bisa dibandingkan sebagai "murah"
+POSITIVE_ONLY = {"pe", "forward_pe", "pb", "debt_to_equity"}
+
+
+def ratios_from_info(info: dict) -> dict:
+    ratios = {}
+    for column, key in RATIO_FIELDS.items():
+        value = info.get(key) if isinstance(info, dict) else None
+        ratios[column] = float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+    return ratios
+
+
+class PeerUniverse:
+    """
+    Symbol -> sector / industry table persisted at `path`. Classification comes from the Yahoo
+    info of each symbol and is fetched once; peers are then a filter on the cached frame.
+    """
+    def __init__(self, path: str = PEER_UNIVERSE_PATH, yahoo=None):
+        self.path = path
+        self.yahoo = yahoo or get_yahoo_cache()
+        self._lock = threading.Lock()
+        self.frame = self._load()
+        # Simbol yang info-nya terjawab tapi tanpa sektor (ETF, indeks); tidak dicoba ulang
+        self.unclassifiable = set()
+
+    def _load(self) -> pd.DataFrame:
+        if self.path and os.path.exists(self.path):
+            frame = pd.read_csv(self.path, dtype={"symbol": str})
+            return frame.reindex(columns=UNIVERSE_COLUMNS).drop_duplicates("symbol", keep="last").set_index("symbol")
+        return pd.DataFrame(columns=UNIVERSE_COLUMNS).set_index("symbol")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            self.frame.reset_index().to_csv(self.path, index=False)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def add(self, rows: dict):
+        """{symbol: info dict} -> rows of the universe."""
+        new = pd.DataFrame.from_dict({
+            symbol: {
+                "name": info.get("shortName") or info.get("longName") or "",
+                "sector": info.get("sector"),
+                "industry": info.get("industry"),
+                "country": info.get("country"),
+                "market_cap": info.get("marketCap"),
+            }
+            for symbol, info in rows.items() if isinstance(info, dict) and info.get("sector")
+        }, orient="index", columns=UNIVERSE_COLUMNS[1:])
+        no_sector = {symbol for symbol, info in rows.items() if isinstance(info, dict) and not info.get("sector")}
+        with self._lock:
+            self.unclassifiable |= no_sector
+        if new.empty:
+            return
+        new.index.name = "symbol"
+        with self._lock:
+            self.frame = pd.concat([self.frame[~self.frame.index.isin(new.index)], new])
+
+    def pending(self, symbols: list) -> list:
+        """Symbols that are neither in the universe nor known to have no sector."""
+        frame = self.frame
+        return [s for s in dict.fromkeys(map(normalize_symbol, symbols))
+                if s and s not in frame.index and s not in self.unclassifiable]
+
+    def classify(self, symbols: list, max_workers: int = PEER_FETCH_WORKERS,
+                 budget_seconds: float = PEER_SCREEN_BUDGET_SECONDS) -> dict:
+        """Fetches info for symbols not in the universe yet (within the time budget) and saves."""
+        missing = self.pending(symbols)
+        if not missing:
+            return {"classified": 0, "skipped": []}
+        infos, skipped = fetch_infos(missing, self.yahoo, max_workers, budget_seconds)
+        self.add(infos)
+        self.save()
+        return {"classified": len(infos), "skipped": skipped}
+
+    def get(self, symbol: str):
+        symbol = normalize_symbol(symbol)
+        return self.frame.loc[symbol] if symbol in self.frame.index else None
+
+    def peers(self, symbol: str, min_industry_peers: int = PEER_MIN_INDUSTRY_PEERS,
+              max_peers: int = PEER_MAX_PEERS):
+        """
+        (level, group name, peer symbols): same industry, or the whole sector when the industry
+        is too small. The largest `max_peers` by market cap are kept; the symbol itself is excluded.
+        """
+        row = self.get(symbol)
+        if row is None or pd.isna(row["sector"]):
+            return None, None, []
+        frame = self.frame.drop(index=normalize_symbol(symbol))
+        level, group = "industry", row["industry"]
+        candidates = frame[frame["industry"] == group] if pd.notna(group) else frame.iloc[0:0]
+        if len(candidates) < min_industry_peers:
+            level, group = "sector", row["sector"]
+            candidates = frame[frame["sector"] == group]
+        if max_peers:
+            candidates = candidates.sort_values("market_cap", ascending=False, na_position="last").head(max_peers)
+        return level, group, list(candidates.index)
+
+
+def fetch_infos(symbols: list, yahoo=None, max_workers: int = PEER_FETCH_WORKERS,
+                budget_seconds: float = PEER_SCREEN_BUDGET_SECONDS):
+    """
+    ({symbol: info}, skipped) fetched in parallel through the Yahoo cache. Whatever has not
+    finished within `budget_seconds` is skipped; those calls keep running and land in the cache.
+    """
+    yahoo = yahoo or get_yahoo_cache()
+    if not symbols:
+        return {}, []
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols))))
+    try:
+        info = tracing.wrap(yahoo.info)
+        futures = {pool.submit(info, symbol): symbol for symbol in symbols}
+        done, _ = wait(futures, timeout=budget_seconds)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    infos, skipped = {}, []
+    for future, symbol in futures.items():
+        if future in done and future.exception() is None and isinstance(future.result(), dict):
+            infos[symbol] = future.result()
+        else:
+            skipped.append(symbol)
+    return infos, skipped
+
+
+def ratio_frame(infos: dict) -> pd.DataFrame:
+    """{symbol: info} -> symbols x RATIO_FIELDS float frame."""
+    return pd.DataFrame.from_dict(
+        {symbol: ratios_from_info(info) for symbol, info in infos.items()},
+        orient="index", columns=list(RATIO_FIELDS), dtype=float,
+    )
+
+
+def percentile_ranks(ratios: pd.DataFrame) -> pd.DataFrame:
+    """
+    Percentile (0-100, higher = better) of every ranked metric within the frame, plus `score`,
+    the mean of the available percentiles.
+    """
+    values = ratios.reindex(columns=list(RANKED_METRICS))
+    positive = [m for m in RANKED_METRICS if m in POSITIVE_ONLY]
+    values[positive] = values[positive].where(values[positive] > 0)
+    higher = [m for m, better_high in RANKED_METRICS.items() if better_high]
+    lower = [m for m, better_high in RANKED_METRICS.items() if not better_high]
+    ranks = pd.concat([
+        values[higher].rank(pct=True, ascending=True),
+        values[lower].rank(pct=True, ascending=False),
+    ], axis=1)[list(RANKED_METRICS)] * 100
+    ranks["score"] = ranks.mean(axis=1, skipna=True)
+    return ranks
+
+
+class PeerScreener:
+    """
+    Ranks a ticker against its peers from the local universe. Candidate symbols (default: the
+    symbol index) are classified by `warm_universe`, normally from the background thread started
+    with `start_background_warmup`; a screen itself only classifies the ticker plus at most
+    `retry_batch` still pending candidates (given at most `retry_budget_seconds`), all inside one
+    time budget.
+    """
+    def __init__(self, universe: PeerUniverse = None, yahoo=None, candidates: list = None,
+                 max_workers: int = PEER_FETCH_WORKERS, budget_seconds: float = PEER_SCREEN_BUDGET_SECONDS,
+                 retry_batch: int = PEER_RETRY_BATCH, retry_budget_seconds: float = PEER_RETRY_BUDGET_SECONDS):
+        self.yahoo = yahoo or get_yahoo_cache()
+        self.universe = universe if universe is not None else PeerUniverse(yahoo=self.yahoo)
+        self._candidates = candidates
+        self.max_workers = max_workers
+        self.budget_seconds = budget_seconds
+        self.retry_batch = retry_batch
+        self.retry_budget_seconds = retry_budget_seconds
+        self._warmup_thread = None
+
+    def candidates(self) -> list:
+        return self._candidates if self._candidates is not None else get_symbol_index().symbols()
+
+    def warm_universe(self, budget_seconds: float = PEER_WARMUP_BUDGET_SECONDS) -> dict:
+        """Classifies every pending candidate; whatever misses the budget stays pending."""
+        with tracing.span("peers.warm_universe") as warm_span:
+            result = self.universe.classify(self.candidates(), self.max_workers, budget_seconds)
+            warm_span.set("classified", result["classified"])
+            warm_span.set("skipped", len(result["skipped"]))
+        return result
+
+    def start_background_warmup(self, retry_seconds: float = PEER_WARMUP_RETRY_SECONDS):
+        if self._warmup_thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    result = self.warm_universe()
+                    print(f"[Peer Screener] universe warm-up: {result['classified']} classified, "
+                          f"{len(result['skipped'])} pending")
+                except Exception as e:
+                    print(f"[Peer Screener] universe warm-up failed: {e}")
+                if not self.universe.pending(self.candidates()):
+                    return
+                time.sleep(retry_seconds)
+
+        self._warmup_thread = threading.Thread(target=loop, name="peer-universe-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def screen(self, ticker: str, max_peers: int = PEER_MAX_PEERS, top: int = 10) -> dict:
+        """Percentile ranking of `ticker` against its industry (or sector) peers."""
+        started = time.monotonic()
+        ticker = normalize_symbol(ticker)
+
+        def deadline():
+            return max(0.0, self.budget_seconds - (time.monotonic() - started))
+
+        if ticker not in self.universe.frame.index:
+            self.universe.classify([ticker], self.max_workers, deadline())
+        # Kandidat yang terlewat (budget habis saat cold start) dicoba ulang sedikit demi sedikit
+        retry = self.universe.pending(self.candidates())[:self.retry_batch]
+        if retry:
+            self.universe.classify(retry, self.max_workers, min(deadline(), self.retry_budget_seconds))
+        level, group, peers = self.universe.peers(ticker, max_peers=max_peers)
+        if level is None:
+            return {"error": f"No sector data for {ticker}."}
+        if not peers:
+            return {"error": f"No peers of {ticker} in the local universe ({level}: {group})."}
+
+        infos, skipped = fetch_infos([ticker] + peers, self.yahoo, self.max_workers, deadline())
+        if ticker not in infos:
+            return {"error": f"Ratios for {ticker} could not be fetched within the time budget."}
+        ratios = ratio_frame(infos)
+        ranks = percentile_ranks(ratios)
+        return self.report(ticker, level, group, ratios, ranks, skipped, top, time.monotonic() - started)
+
+    def report(self, ticker, level, group, ratios, ranks, skipped, top, seconds) -> dict:
+        medians = ratios.drop(index=ticker).median(numeric_only=True)
+        target = {
+            metric: {
+                "value": ratios.at[ticker, metric],
+                "peer_median": medians.get(metric),
+                "percentile": ranks.at[ticker, metric],
+            }
+            for metric in RANKED_METRICS
+        }
+        order = ranks["score"].sort_values(ascending=False)
+        position = int(order.index.get_loc(ticker)) + 1
+        leaders = {
+            symbol: {"score": score, "pe": ratios.at[symbol, "pe"], "roe": ratios.at[symbol, "roe"],
+                     "net_margin": ratios.at[symbol, "net_margin"]}
+            for symbol, score in order.head(top).items()
+        }
+        return {
+            "Ticker": ticker,
+            "Peer Group": f"{level}: {group}",
+            "Peers Compared": len(ratios) - 1,
+            "Overall Rank": f"{position} of {len(ratios)}",
+            "Composite Score (0-100)": ranks.at[ticker, "score"],
+            "Versus Peers": target,
+            "Top By Score": leaders,
+            "Skipped (time budget)": len(skipped),
+            "Universe Pending": len(self.universe.pending(self.candidates())),
+            "Seconds": seconds,
+        }
+
+
+_default_screener = None
+_default_screener_lock = threading.Lock()
+
+
+def get_peer_screener() -> PeerScreener:
+    global _default_screener
+    with _default_screener_lock:
+        if _default_screener is None:
+            _default_screener = PeerScreener()
+            _default_screener.start_background_warmup()
+        return _default_screener
+
+
+def set_peer_screener(screener: PeerScreener):
+    global _default_screener
+    with _default_screener_lock:
+        _default_screener = screener
@@ -0,0 +1,270 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import yfinance as yf
+
+import tracing
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DEFAULT_STORE_PATH = os.getenv("PRICE_STORE_PATH", os.path.join(".cache", "prices.sqlite"))
+# Bar terakhir bisa masih berjalan (intraday), jadi di-refresh ulang setelah interval ini
+LATEST_BAR_MAX_AGE = timedelta(minutes=int(os.getenv("PRICE_STORE_LATEST_MAX_AGE_MIN", "15")))
+
+# Selisih relatif close bar lama yang dianggap penyesuaian harga baru (split/dividen), bukan pembulatan
+ADJUSTMENT_TOLERANCE = float(os.getenv("PRICE_STORE_ADJUSTMENT_TOLERANCE", "0.0005"))
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_to_start(period: Optional[str], today: pd.Timestamp) -> pd.Timestamp:
+    """
+    Converts a yfinance style period ("5d", "3mo", "1y", "ytd", "max") to a start date.
+    """
+    period = (period or "1y").strip().lower()
+    if period == "max":
+        return pd.Timestamp("1900-01-01")
+    if period == "ytd":
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    value, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return today - pd.DateOffset(days=value)
+    if unit == "wk":
+        return today - pd.DateOffset(weeks=value)
+    if unit == "mo":
+        return today - pd.DateOffset(months=value)
+    return today - pd.DateOffset(years=value)
+
+
+def normalize_ohlcv(data: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """
+    Flattens a yf.download frame into plain OHLCV columns indexed by naive dates.
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.swaplevel(axis=1)
+        if symbol not in data.columns:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        data = data[symbol]
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data = data.set_axis(index.normalize(), axis=0)
+    data = data[[col for col in OHLCV_COLUMNS if col in data.columns]]
+    return data[~data.index.duplicated(keep="last")].sort_index()
+
+
+class YFinanceProvider:
+    def fetch(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        data = yf.download(
+            symbol,
+            start=start.strftime("%Y-%m-%d"),
+            end=end.strftime("%Y-%m-%d"),
+            progress=False,
+        )
+        return normalize_ohlcv(data, symbol)
+
+
+class LocalCSVProvider:
+    """
+    Offline provider reading `<directory>/<SYMBOL>.csv` files with a Date column.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.calls = 0
+
+    def fetch(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        self.calls += 1
+        path = os.path.join(self.directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        data = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        data = normalize_ohlcv(data, symbol)
+        return data.loc[(data.index >= start) & (data.index < end)]
+
+
+class PriceStore:
+    """
+    Persistent daily OHLCV store (SQLite) that only asks the provider for bars it does not have yet.
+
+    Coverage per symbol is tracked as the half-open range [start, end) that the provider has
+    answered with bars, so windows inside it are served from disk. An empty answer (yf.download
+    returns one on errors too) never extends coverage, so the window is asked for again next time.
+    Bars are auto-adjusted by the provider; when a refresh shows that an already stored bar has
+    changed (new split or dividend), the symbol is dropped and downloaded again.
+    """
+    def __init__(self, path: str = DEFAULT_STORE_PATH, provider=None):
+        self.path = path
+        self.provider = provider or YFinanceProvider()
+        self.provider_calls = 0
+        self.invalidations = 0
+        # _lock hanya melindungi koneksi SQLite; download jaringan memegang lock per simbol
+        self._lock = threading.RLock()
+        self._symbol_locks = {}
+        self._symbol_locks_lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                "symbol TEXT NOT NULL, date TEXT NOT NULL, "
+                "open REAL, high REAL, low REAL, close REAL, volume REAL, "
+                "PRIMARY KEY (symbol, date))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                "symbol TEXT PRIMARY KEY, start TEXT NOT NULL, end TEXT NOT NULL, fetched_at TEXT NOT NULL)"
+            )
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._symbol_locks_lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _query(self, sql: str, params: tuple) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_history(self, symbol: str, period: str = None, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        today = pd.Timestamp.today().normalize()
+        if start_date and end_date:
+            start = pd.Timestamp(start_date).normalize()
+            end = pd.Timestamp(end_date).normalize()
+        else:
+            start = period_to_start(period, today)
+            end = today + pd.Timedelta(days=1)
+        if start >= end:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        with self._symbol_lock(symbol):
+            self._refresh(symbol, start, end, today)
+            return self._read(symbol, start, end)
+
+    def _refresh(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, today: pd.Timestamp):
+        horizon = min(end, today + pd.Timedelta(days=1))
+        now = datetime.now()
+        rows = self._query("SELECT start, end, fetched_at FROM coverage WHERE symbol = ?", (symbol,))
+
+        if not rows:
+            if self._store(symbol, self._download(symbol, start, end)):
+                self._save_coverage(symbol, start, horizon, now)
+            return
+
+        cov_start, cov_end = pd.Timestamp(rows[0][0]), pd.Timestamp(rows[0][1])
+        fetched_at = datetime.fromisoformat(rows[0][2])
+
+        if start < cov_start and self._store(symbol, self._download(symbol, start, cov_start)):
+            cov_start = start
+
+        stale_latest = end > today and now - fetched_at > LATEST_BAR_MAX_AGE
+        if horizon > cov_end or stale_latest:
+            # Mulai dari bar kedua terakhir: bar terakhir bisa belum final, bar sebelumnya sudah
+            # final dan dipakai untuk mendeteksi penyesuaian harga (split/dividen) sejak disimpan
+            recent = self._query(
+                "SELECT date, close FROM bars WHERE symbol = ? ORDER BY date DESC LIMIT 2", (symbol,)
+            )
+            resume = min(cov_end, pd.Timestamp(recent[-1][0])) if recent else cov_end
+            data = self._download(symbol, max(resume, cov_start), end)
+            if len(recent) == 2 and self._readjusted(recent[-1], data):
+                print(f"[Price Store] {symbol} bars were re-adjusted upstream (split/dividend); downloading again")
+                self.invalidations += 1
+                self._delete(symbol)
+                self._refresh(symbol, start, end, today)
+                return
+            if self._store(symbol, data):
+                cov_end = max(cov_end, horizon)
+                fetched_at = now
+
+        self._save_coverage(symbol, cov_start, cov_end, fetched_at)
+
+    @staticmethod
+    def _readjusted(stored_bar: tuple, data: pd.DataFrame) -> bool:
+        date, close = pd.Timestamp(stored_bar[0]), stored_bar[1]
+        if data is None or date not in data.index or close is None or pd.isna(data.at[date, "Close"]):
+            return False
+        return abs(float(data.at[date, "Close"]) - close) > ADJUSTMENT_TOLERANCE * abs(close)
+
+    def _download(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        with self._lock:
+            self.provider_calls += 1
+        print(f"[Price Store] Fetching {symbol} bars {start.date()} -> {end.date()}")
+        with tracing.span("prices.fetch", symbol=symbol, start=str(start.date()), end=str(end.date())) as fetch_span:
+            data = self.provider.fetch(symbol, start, end)
+            fetch_span.set("rows", 0 if data is None else len(data))
+        return data
+
+    def _store(self, symbol: str, data: pd.DataFrame) -> bool:
+        """Saves the bars; False when there were none (coverage must not move)."""
+        if data is None or data.empty:
+            return False
+        rows = [
+            (
+                symbol,
+                idx.strftime("%Y-%m-%d"),
+                *(None if pd.isna(bar.get(col)) else float(bar.get(col)) for col in OHLCV_COLUMNS),
+            )
+            for idx, bar in data.iterrows()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars (symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return True
+
+    def _save_coverage(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, fetched_at: datetime):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage (symbol, start, end, fetched_at) VALUES (?, ?, ?, ?)",
+                (symbol, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), fetched_at.isoformat()),
+            )
+
+    def _read(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        rows = self._query(
+            "SELECT date, open, high, low, close, volume FROM bars "
+            "WHERE symbol = ? AND date >= ? AND date < ? ORDER BY date",
+            (symbol, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+        )
+        data = pd.DataFrame(rows, columns=["Date"] + OHLCV_COLUMNS)
+        data["Date"] = pd.to_datetime(data["Date"])
+        return data.set_index("Date")
+
+    def _delete(self, symbol: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+            self._conn.execute("DELETE FROM coverage WHERE symbol = ?", (symbol,))
+
+    def clear(self, symbol: str = None):
+        if symbol is not None:
+            with self._symbol_lock(symbol):
+                self._delete(symbol)
+            return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bars")
+            self._conn.execute("DELETE FROM coverage")
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
+
+
+def set_price_store(store: PriceStore):
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
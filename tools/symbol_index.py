@@ -0,0 +1,272 @@
+import csv
+import os
+import difflib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+import tracing
+from tools.yf_cache import get_yahoo_cache
+
+SYMBOL_INDEX_PATH = os.getenv(
+    "SYMBOL_INDEX_PATH", os.path.join(os.path.dirname(__file__), "data", "symbols.csv")
+)
+# Simbol yang ditemukan lewat jaringan disimpan di sini supaya proses berikutnya tidak bertanya lagi
+SYMBOL_INDEX_LEARNED_PATH = os.getenv("SYMBOL_INDEX_LEARNED_PATH", os.path.join(".cache", "symbols_learned.csv"))
+# Simbol yang tidak lagi dikenal upstream (delisting) dicatat di sini dan tidak dimuat lagi
+SYMBOL_INDEX_DELISTED_PATH = os.getenv("SYMBOL_INDEX_DELISTED_PATH", os.path.join(".cache", "symbols_delisted.csv"))
+SYMBOL_INDEX_REFRESH_HOURS = float(os.getenv("SYMBOL_INDEX_REFRESH_HOURS", "24"))
+# Kalau lebih dari porsi ini hilang sekaligus, anggap upstream bermasalah dan jangan hapus apa pun
+SYMBOL_INDEX_MAX_DELIST_FRACTION = float(os.getenv("SYMBOL_INDEX_MAX_DELIST_FRACTION", "0.2"))
+# Simbol yang tidak ditemukan tidak dicek ulang ke jaringan selama jangka waktu ini
+SYMBOL_NEGATIVE_TTL_SECONDS = float(os.getenv("SYMBOL_NEGATIVE_TTL_SECONDS", "3600"))
+SYMBOL_NETWORK_WORKERS = int(os.getenv("SYMBOL_NETWORK_WORKERS", "8"))
+
+FIELDS = ["symbol", "name", "exchange", "country"]
+
+
+class SymbolInfo(NamedTuple):
+    symbol: str
+    name: str
+    exchange: str
+    country: Optional[str]
+
+
+def normalize_symbol(symbol: str) -> str:
+    return str(symbol or "").strip().upper().lstrip("$")
+
+
+def yahoo_symbol_lookup(symbol: str) -> Optional[SymbolInfo]:
+    """Network fallback: same acceptance rule as the original ticker validation."""
+    yahoo = get_yahoo_cache()
+    info = yahoo.info(symbol)
+    if not isinstance(info, dict) or "shortName" not in info or info.get("regularMarketPrice") is None:
+        return None
+    if yahoo.history(symbol, period="1d").empty:
+        return None
+    return SymbolInfo(symbol, info.get("shortName") or "", info.get("exchange") or "", info.get("country"))
+
+
+def read_symbol_file(path: str) -> dict:
+    symbols = {}
+    if not os.path.exists(path):
+        return symbols
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            symbol = normalize_symbol(row.get("symbol"))
+            if symbol:
+                symbols[symbol] = SymbolInfo(symbol, row.get("name") or "", row.get("exchange") or "",
+                                             row.get("country") or None)
+    return symbols
+
+
+class SymbolIndex:
+    """
+    Local symbol table (ticker incl. exchange suffix, short name, exchange, country).
+
+    Lookups are dict hits. Unknown symbols go to `network_lookup` once; found symbols are added
+    to the index and appended to `learned_path`, misses are remembered for a while. `revalidate`
+    asks `network_lookup` about every indexed symbol and drops (and records in `delisted_path`)
+    the ones upstream no longer knows.
+    """
+    def __init__(self, path: str = SYMBOL_INDEX_PATH, learned_path: str = SYMBOL_INDEX_LEARNED_PATH,
+                 network_lookup: Callable[[str], Optional[SymbolInfo]] = yahoo_symbol_lookup,
+                 negative_ttl: float = SYMBOL_NEGATIVE_TTL_SECONDS, delisted_path: str = SYMBOL_INDEX_DELISTED_PATH):
+        self.path = path
+        self.learned_path = learned_path
+        self.delisted_path = delisted_path
+        self.network_lookup = network_lookup
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._missing = {}
+        # Simbol yang dipelajari proses ini sejak start; ikut digabung saat tabel ditukar
+        self._learned = {}
+        self._refresh_thread = None
+        self.network_lookups = 0
+        self.delisted = 0
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the bundled file and the learned symbols; safe while lookups are running."""
+        symbols = read_symbol_file(self.path)
+        if self.learned_path:
+            symbols.update(read_symbol_file(self.learned_path))
+        if self.delisted_path:
+            for symbol in read_symbol_file(self.delisted_path):
+                symbols.pop(symbol, None)
+        # Tabel baru dibangun penuh lalu ditukar sekaligus; simbol dari _remember selama file
+        # dibaca digabung di dalam lock supaya tidak hilang
+        with self._lock:
+            symbols.update(self._learned)
+            names = {}
+            for info in symbols.values():
+                names.setdefault(info.name.lower(), info.symbol)
+            self._symbols = symbols
+            self._names = names
+            self.loaded_at = time.time()
+
+    def revalidate(self, max_workers: int = SYMBOL_NETWORK_WORKERS,
+                   max_delist_fraction: float = SYMBOL_INDEX_MAX_DELIST_FRACTION) -> list:
+        """
+        Checks every indexed symbol upstream and drops the ones that are gone. Lookups that raise
+        keep their symbol; when more than `max_delist_fraction` disappear at once nothing is dropped,
+        since that looks like an upstream outage rather than delistings. Returns the dropped symbols.
+        """
+        if self.network_lookup is None:
+            return []
+        symbols = list(self._symbols)
+        if not symbols:
+            return []
+
+        def check(symbol):
+            try:
+                return self.network_lookup(symbol) is not None
+            except Exception:
+                return True
+
+        with tracing.span("symbol.revalidate", symbols=len(symbols)) as span:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+                gone = [symbol for symbol, found in zip(symbols, pool.map(tracing.wrap(check), symbols)) if not found]
+            span.set("gone", len(gone))
+        if not gone:
+            return []
+        if len(gone) > max_delist_fraction * len(symbols):
+            print(f"[Symbol Index] {len(gone)} of {len(symbols)} symbols missing upstream; skipped as an outage")
+            return []
+
+        infos = [self._symbols[symbol] for symbol in gone if symbol in self._symbols]
+        with self._lock:
+            symbols_now = {s: info for s, info in self._symbols.items() if s not in gone}
+            self._symbols = symbols_now
+            self._names = {name: s for name, s in self._names.items() if s in symbols_now}
+            for symbol in gone:
+                self._learned.pop(symbol, None)
+            self.delisted += len(gone)
+        if self.delisted_path:
+            self._append(self.delisted_path, infos)
+        print(f"[Symbol Index] dropped {len(gone)} symbols no longer listed upstream: {', '.join(gone)}")
+        return gone
+
+    def start_background_refresh(self, interval_hours: float = SYMBOL_INDEX_REFRESH_HOURS):
+        """Every `interval_hours`: reload the files, then revalidate the symbols upstream."""
+        if self._refresh_thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval_hours * 3600)
+                try:
+                    self.refresh()
+                    self.revalidate()
+                except Exception as e:
+                    print(f"[Symbol Index] refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=loop, name="symbol-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return normalize_symbol(symbol) in self._symbols
+
+    def symbols(self) -> list:
+        return list(self._symbols)
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        return self._symbols.get(normalize_symbol(symbol))
+
+    def _remember(self, info: SymbolInfo):
+        with self._lock:
+            self._symbols = {**self._symbols, info.symbol: info}
+            self._names = {info.name.lower(): info.symbol, **self._names}
+            self._learned[info.symbol] = info
+        if self.learned_path:
+            self._append(self.learned_path, [info])
+
+    def _append(self, path: str, infos: list):
+        with self._write_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            new_file = not os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(FIELDS)
+                for info in infos:
+                    writer.writerow([info.symbol, info.name, info.exchange, info.country or ""])
+
+    def resolve(self, symbol: str) -> Optional[SymbolInfo]:
+        """Index lookup with network fallback for symbols the index does not know."""
+        symbol = normalize_symbol(symbol)
+        if not symbol:
+            return None
+        info = self._symbols.get(symbol)
+        if info is not None:
+            return info
+        missing_until = self._missing.get(symbol)
+        if missing_until is not None and missing_until > time.monotonic():
+            return None
+        if self.network_lookup is None:
+            return None
+
+        self.network_lookups += 1
+        try:
+            with tracing.span("symbol.network_lookup", symbol=symbol):
+                info = self.network_lookup(symbol)
+        except Exception as e:
+            print(f"[Symbol Index] network lookup failed for {symbol}: {e}")
+            return None
+        if info is None:
+            self._missing[symbol] = time.monotonic() + self.negative_ttl
+            return None
+        self._remember(info)
+        return info
+
+    def is_valid(self, symbol: str) -> bool:
+        return self.resolve(symbol) is not None
+
+    def validate_many(self, symbols: list, max_workers: int = SYMBOL_NETWORK_WORKERS) -> dict:
+        """{symbol: bool} for every input; unknown symbols are checked over the network in parallel."""
+        result = {symbol: normalize_symbol(symbol) in self._symbols for symbol in symbols}
+        unknown = [symbol for symbol, found in result.items() if not found and normalize_symbol(symbol)]
+        if unknown:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unknown)))) as pool:
+                for symbol, valid in zip(unknown, pool.map(tracing.wrap(self.is_valid), unknown)):
+                    result[symbol] = valid
+        return result
+
+    def suggest(self, query: str, limit: int = 5, cutoff: float = 0.6) -> list:
+        """Close matches on ticker and company name, e.g. "APPL" -> AAPL."""
+        query = str(query or "").strip()
+        if not query:
+            return []
+        symbols, names = self._symbols, self._names
+        matches = difflib.get_close_matches(normalize_symbol(query), list(symbols), n=limit, cutoff=cutoff)
+        lowered = query.lower()
+        by_name = [names[name] for name in names if lowered in name]
+        by_name += [names[name] for name in difflib.get_close_matches(lowered, list(names), n=limit, cutoff=cutoff)]
+        for symbol in by_name:
+            if symbol not in matches:
+                matches.append(symbol)
+        return [symbols[symbol] for symbol in matches[:limit]]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SymbolIndex()
+            _default_index.start_background_refresh()
+        return _default_index
+
+
+def set_symbol_index(index: SymbolIndex):
+    global _default_index
+    with _default_index_lock:
+        _default_index = index
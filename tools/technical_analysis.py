@@ -1,48 +1,108 @@
-import yfinance as yf
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from crewai.tools import BaseTool
 from pydantic import BaseModel
 from typing import Optional, ClassVar
+import tracing
+from tools.price_store import get_price_store
+from tools.payload import encode_payload
+
+MA_WINDOWS = [20, 50, 100, 200]
+EMA_SPANS = [12, 26, 50, 200]
+
+
+def fibonacci_levels(max_price, min_price) -> dict:
+    diff = max_price - min_price
+    return {
+        '0%': max_price,
+        '23.6%': max_price - 0.236 * diff,
+        '38.2%': max_price - 0.382 * diff,
+        '50%': max_price - 0.5 * diff,
+        '61.8%': max_price - 0.618 * diff,
+        '100%': min_price
+    }
+
+
+def build_analysis_results(latest, statistics: dict, fib_levels: dict) -> dict:
+    """
+    Builds the analysis dict from the latest indicator row (a Series or a plain dict).
+    Shared by the single-symbol, batch and streaming indicator paths.
+    """
+    return {
+        'Current_Price': latest['Close'],
+        'Moving_Averages': {f'{ma}_MA': latest.get(f'{ma}_MA', None) for ma in MA_WINDOWS},
+        'Exponential_MAs': {f'{ema}_EMA': latest.get(f'{ema}_EMA', None) for ema in EMA_SPANS},
+        'MACD': {
+            'MACD': latest.get('MACD', None),
+            'Signal_Line': latest.get('Signal_Line', None),
+            'Histogram': latest.get('MACD_Histogram', None)
+        },
+        'RSI': latest.get('RSI', None),
+        'Bollinger_Bands': {
+            'Upper': latest.get('Upper_BB', None),
+            'Middle': latest.get('20_MA', None),
+            'Lower': latest.get('Lower_BB', None)
+        },
+        'Stochastic': {
+            '%K': latest.get('%K', None),
+            '%D': latest.get('%D', None)
+        },
+        'ATR': latest.get('ATR', None),
+        'OBV': latest.get('OBV', None),
+        'Fibonacci_Levels': fib_levels,
+        'Support_Resistance': {
+            'Support': latest.get('Support', None),
+            'Resistance': latest.get('Resistance', None)
+        },
+        'Potential_Breakout': latest.get('Potential_Breakout', None),
+        'Trend': latest.get('Trend', None),
+        'Volume': {
+            'Current': latest.get('Volume', None),
+            'MA': latest.get('Volume_MA', None),
+            'Trend': latest.get('Volume_Trend', None)
+        },
+        'Statistics': statistics,
+        'Interpretation': {
+            'Trend': 'Bullish' if latest['Close'] > latest.get('200_MA', 0) else 'Bearish',
+            'RSI': 'Overbought' if latest.get('RSI', 0) > 70 else ('Oversold' if latest.get('RSI', 0) < 30 else 'Neutral'),
+            'MACD': 'Bullish' if latest.get('MACD', 0) > latest.get('Signal_Line', 0) else 'Bearish',
+            'Stochastic': 'Overbought' if latest.get('%K', 0) > 80 else ('Oversold' if latest.get('%K', 0) < 20 else 'Neutral'),
+            'Bollinger_Bands': 'Overbought' if latest['Close'] > latest.get('Upper_BB', 0) else ('Oversold' if latest['Close'] < latest.get('Lower_BB', 0) else 'Neutral'),
+            'Volume': 'High' if latest.get('Volume', 0) > latest.get('Volume_MA', 0) else 'Low'
+        }
+    }
 
 
 class TechnicalAnalysisTool(BaseTool):
     name: str = "TechnicalAnalysisTool"
     description: str = "Performs technical analysis for a given stock."  
-    def _run(self, stock_symbol: str, period: str = None, start_date:str=None, end_date:str=None, progress=False) -> dict:
+    @tracing.traced("tool.TechnicalAnalysisTool")
+    def _run(self, stock_symbol: str, period: str = None, start_date:str=None, end_date:str=None, progress=False) -> str:
+        return encode_payload(self.analyze(stock_symbol, period, start_date, end_date))
+
+    def analyze(self, stock_symbol: str, period: str = None, start_date:str=None, end_date:str=None) -> dict:
         try:
             print(f"[Technical Tool] Requesting data for {stock_symbol}...")
+            store = get_price_store()
             if start_date and end_date:
                 print(f"Using date range: {start_date} to {end_date}")
-                data = yf.download(stock_symbol, start=start_date, end=end_date, progress=False)
+                data = store.get_history(stock_symbol, start_date=start_date, end_date=end_date)
             else:
                 print(f"Using period: {period}")
-                data = yf.download(stock_symbol, period=period, progress=False)
+                data = store.get_history(stock_symbol, period=period)
 
             print(f"Raw data shape: {data.shape}, Columns: {data.columns}")
 
-            # Handle MultiIndex if present
-            if isinstance(data.columns, pd.MultiIndex):
-                print("MultiIndex detected. Flattening...")
-                data = data.swaplevel(axis=1)
-                if stock_symbol in data.columns:
-                    data = data[stock_symbol]
-                    print(f"Flattened data columns: {data.columns}")
-                else:
-                    return {"error": f"Symbol {stock_symbol} not found in data columns after flattening."}
-
             if data.empty or 'Close' not in data.columns:
                 return {"error": "No data available for symbol."}
             if data['Close'].dropna().shape[0] < 30:
                 return {"error": "Too few data points to compute indicators. Try a longer period."}
 
             # Moving Averages
-            for ma in [20, 50, 100, 200]:
+            for ma in MA_WINDOWS:
                 data[f'{ma}_MA'] = data['Close'].rolling(window=ma).mean()
 
             # Exponential Moving Averages
-            for ema in [12, 26, 50, 200]:
+            for ema in EMA_SPANS:
                 data[f'{ema}_EMA'] = data['Close'].ewm(span=ema, adjust=False).mean()
 
             expected_ema_columns = ['12_EMA', '26_EMA']
@@ -64,7 +124,7 @@ class TechnicalAnalysisTool(BaseTool):
             rs = gain / loss
             data['RSI'] = 100 - (100 / (1 + rs))
 
-            data['20_MA'] = data['Close'].rolling(window=20).mean()
+            # 20_MA sudah dihitung di blok Moving Averages
             data['20_SD'] = data['Close'].rolling(window=20).std()
             data['Upper_BB'] = data['20_MA'] + (data['20_SD'] * 2)
             data['Lower_BB'] = data['20_MA'] - (data['20_SD'] * 2)
@@ -80,17 +140,7 @@ class TechnicalAnalysisTool(BaseTool):
             data['ATR'] = data['TR'].rolling(window=14).mean()
             data['OBV'] = (np.sign(data['Close'].diff()) * data['Volume']).cumsum()
 
-            max_price = data['High'].max()
-            min_price = data['Low'].min()
-            diff = max_price - min_price
-            fibonacci_levels = {
-                '0%': max_price,
-                '23.6%': max_price - 0.236 * diff,
-                '38.2%': max_price - 0.382 * diff,
-                '50%': max_price - 0.5 * diff,
-                '61.8%': max_price - 0.618 * diff,
-                '100%': min_price
-            }
+            fib_levels = fibonacci_levels(data['High'].max(), data['Low'].min())
 
             data['Support'] = data['Low'].rolling(window=20).min()
             data['Resistance'] = data['High'].rolling(window=20).max()
@@ -104,54 +154,13 @@ class TechnicalAnalysisTool(BaseTool):
             data['Volume_Trend'] = np.where(data['Volume'] > data['Volume_MA'], 'Above Average', 'Below Average')
 
             latest = data.iloc[-1]
-            analysis_results = {
-                'Current_Price': latest['Close'],
-                'Moving_Averages': {f'{ma}_MA': latest.get(f'{ma}_MA', None) for ma in [20, 50, 100, 200]},
-                'Exponential_MAs': {f'{ema}_EMA': latest.get(f'{ema}_EMA', None) for ema in [12, 26, 50, 200]},
-                'MACD': {
-                    'MACD': latest.get('MACD', None),
-                    'Signal_Line': latest.get('Signal_Line', None),
-                    'Histogram': latest.get('MACD_Histogram', None)
-                },
-                'RSI': latest.get('RSI', None),
-                'Bollinger_Bands': {
-                    'Upper': latest.get('Upper_BB', None),
-                    'Middle': latest.get('20_MA', None),
-                    'Lower': latest.get('Lower_BB', None)
-                },
-                'Stochastic': {
-                    '%K': latest.get('%K', None),
-                    '%D': latest.get('%D', None)
-                },
-                'ATR': latest.get('ATR', None),
-                'OBV': latest.get('OBV', None),
-                'Fibonacci_Levels': fibonacci_levels,
-                'Support_Resistance': {
-                    'Support': latest.get('Support', None),
-                    'Resistance': latest.get('Resistance', None)
-                },
-                'Potential_Breakout': latest.get('Potential_Breakout', None),
-                'Trend': latest.get('Trend', None),
-                'Volume': {
-                    'Current': latest.get('Volume', None),
-                    'MA': latest.get('Volume_MA', None),
-                    'Trend': latest.get('Volume_Trend', None)
-                },
-                'Statistics': {
-                    'Yearly_High': data['High'].max(),
-                    'Yearly_Low': data['Low'].min(),
-                    'Average_Volume': data['Volume'].mean(),
-                    'Volatility': data['Close'].pct_change().std() * (252 ** 0.5)
-                },
-                'Interpretation': {
-                    'Trend': 'Bullish' if latest['Close'] > latest.get('200_MA', 0) else 'Bearish',
-                    'RSI': 'Overbought' if latest.get('RSI', 0) > 70 else ('Oversold' if latest.get('RSI', 0) < 30 else 'Neutral'),
-                    'MACD': 'Bullish' if latest.get('MACD', 0) > latest.get('Signal_Line', 0) else 'Bearish',
-                    'Stochastic': 'Overbought' if latest.get('%K', 0) > 80 else ('Oversold' if latest.get('%K', 0) < 20 else 'Neutral'),
-                    'Bollinger_Bands': 'Overbought' if latest['Close'] > latest.get('Upper_BB', 0) else ('Oversold' if latest['Close'] < latest.get('Lower_BB', 0) else 'Neutral'),
-                    'Volume': 'High' if latest.get('Volume', 0) > latest.get('Volume_MA', 0) else 'Low'
-                }
+            statistics = {
+                'Yearly_High': data['High'].max(),
+                'Yearly_Low': data['Low'].min(),
+                'Average_Volume': data['Volume'].mean(),
+                'Volatility': data['Close'].pct_change().std() * (252 ** 0.5)
             }
+            analysis_results = build_analysis_results(latest, statistics, fib_levels)
 
             return analysis_results
         except Exception as e:
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from tools.price_store import OHLCV_COLUMNS
+from tools.technical_analysis import (
+    MA_WINDOWS,
+    EMA_SPANS,
+    build_analysis_results,
+    fibonacci_levels,
+)
+
+MIN_BARS = 30
+
+
+def _field_matrix(data: pd.DataFrame, field: str, symbols: list) -> np.ndarray:
+    if isinstance(data.columns, pd.MultiIndex):
+        level = 0 if field in data.columns.get_level_values(0) else 1
+        frame = data.xs(field, axis=1, level=level)
+    else:
+        # Frame satu simbol dengan kolom OHLCV biasa
+        frame = data[[field]].set_axis(symbols[:1], axis=1)
+    return frame.reindex(columns=symbols).to_numpy(dtype=float)
+
+
+def _right_align(fields: dict) -> dict:
+    """
+    Moves every symbol's valid bars to the bottom of its column so that all symbols end on the
+    last row and only carry leading NaN padding. Exchanges with different holidays then behave
+    exactly like a single-symbol download.
+    """
+    valid = ~np.isnan(fields["Close"])
+    order = np.argsort(valid, axis=0, kind="stable")
+    valid_sorted = np.take_along_axis(valid, order, axis=0)
+    aligned = {}
+    for name, values in fields.items():
+        values = np.take_along_axis(values, order, axis=0)
+        values[~valid_sorted] = np.nan
+        aligned[name] = values
+    return aligned
+
+
+def _ewm(values: np.ndarray, span: int) -> np.ndarray:
+    # Sama dengan pandas ewm(span, adjust=False) untuk kolom dengan NaN di awal saja
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1], np.nan)
+    for t in range(values.shape[0]):
+        x = values[t]
+        prev = np.where(np.isnan(prev), x, alpha * x + (1 - alpha) * prev)
+        out[t] = prev
+    return out
+
+
+def _window(values: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    end = values.shape[0] - lag
+    if end - window < 0:
+        return np.full((window, values.shape[1]), np.nan)
+    return values[end - window:end]
+
+
+def _rolling_last(values: np.ndarray, window: int, func, lag: int = 0) -> np.ndarray:
+    """Rolling(window).func() evaluated only at row -1 - lag, NaN when the window is incomplete."""
+    return func(_window(values, window, lag), axis=0)
+
+
+def analyze_batch(symbols: list, data: pd.DataFrame) -> dict:
+    """
+    Computes the technical analysis dict for many symbols from one multi-ticker yf.download frame.
+
+    Every indicator is computed over a (bars x symbols) matrix at once; only the EMA recursions
+    iterate over time. Returns {symbol: analysis_results} with the same shape as
+    TechnicalAnalysisTool.analyze, or {"error": ...} for symbols without enough data.
+    """
+    symbols = list(symbols)
+    if data is None or data.empty:
+        return {symbol: {"error": "No data available for symbol."} for symbol in symbols}
+
+    fields = _right_align({field: _field_matrix(data, field, symbols) for field in OHLCV_COLUMNS})
+    close, high, low, volume = fields["Close"], fields["High"], fields["Low"], fields["Volume"]
+    counts = (~np.isnan(close)).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        latest = {
+            "Close": close[-1],
+            "Volume": volume[-1],
+        }
+        for ma in MA_WINDOWS:
+            latest[f"{ma}_MA"] = _rolling_last(close, ma, np.mean)
+
+        emas = {}
+        for ema in EMA_SPANS:
+            emas[ema] = _ewm(close, ema)
+            latest[f"{ema}_EMA"] = emas[ema][-1]
+
+        macd = emas[12] - emas[26]
+        signal = _ewm(macd, 9)
+        latest["MACD"] = macd[-1]
+        latest["Signal_Line"] = signal[-1]
+        latest["MACD_Histogram"] = macd[-1] - signal[-1]
+
+        delta = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+        gain = _rolling_last(np.where(delta > 0, delta, 0), 14, np.mean)
+        loss = -_rolling_last(np.where(delta < 0, delta, 0), 14, np.mean)
+        latest["RSI"] = 100 - (100 / (1 + gain / loss))
+
+        sd_20 = _rolling_last(close, 20, lambda w, axis: np.std(w, axis=axis, ddof=1))
+        latest["Upper_BB"] = latest["20_MA"] + sd_20 * 2
+        latest["Lower_BB"] = latest["20_MA"] - sd_20 * 2
+
+        k_values = np.vstack([
+            (close[-1 - lag] - _rolling_last(low, 14, np.min, lag))
+            / (_rolling_last(high, 14, np.max, lag) - _rolling_last(low, 14, np.min, lag)) * 100
+            for lag in (2, 1, 0)
+        ])
+        latest["%K"] = k_values[-1]
+        latest["%D"] = np.mean(k_values, axis=0)
+
+        prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        latest["ATR"] = _rolling_last(tr, 14, np.mean)
+        latest["OBV"] = np.nansum(np.sign(delta) * volume, axis=0)
+
+        latest["Support"] = _rolling_last(low, 20, np.min)
+        latest["Resistance"] = _rolling_last(high, 20, np.max)
+        prev_support = _rolling_last(low, 20, np.min, lag=1)
+        prev_resistance = _rolling_last(high, 20, np.max, lag=1)
+        breakout = np.where(close[-1] > prev_resistance, "Bullish Breakout",
+                            np.where(close[-1] < prev_support, "Bearish Breakdown", "No Breakout"))
+
+        ma_50, ma_200 = latest["50_MA"], latest["200_MA"]
+        trend = np.where((close[-1] > ma_200) & (ma_50 > ma_200), "Bullish",
+                         np.where((close[-1] < ma_200) & (ma_50 < ma_200), "Bearish", "Neutral"))
+
+        latest["Volume_MA"] = _rolling_last(volume, 20, np.mean)
+        volume_trend = np.where(volume[-1] > latest["Volume_MA"], "Above Average", "Below Average")
+
+        yearly_high = np.nanmax(high, axis=0, initial=-np.inf, where=~np.isnan(high))
+        yearly_low = np.nanmin(low, axis=0, initial=np.inf, where=~np.isnan(low))
+        average_volume = np.nanmean(volume, axis=0)
+        returns = close[1:] / close[:-1] - 1
+        volatility = np.nanstd(returns, axis=0, ddof=1) * (252 ** 0.5)
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        if counts[i] == 0:
+            results[symbol] = {"error": "No data available for symbol."}
+            continue
+        if counts[i] < MIN_BARS:
+            results[symbol] = {"error": "Too few data points to compute indicators. Try a longer period."}
+            continue
+        row = {name: values[i] for name, values in latest.items()}
+        row["Potential_Breakout"] = str(breakout[i])
+        row["Trend"] = str(trend[i])
+        row["Volume_Trend"] = str(volume_trend[i])
+        statistics = {
+            "Yearly_High": yearly_high[i],
+            "Yearly_Low": yearly_low[i],
+            "Average_Volume": average_volume[i],
+            "Volatility": volatility[i],
+        }
+        results[symbol] = build_analysis_results(row, statistics, fibonacci_levels(yearly_high[i], yearly_low[i]))
+    return results
+
+
+def run_technical_batch(symbols: list, period: str = None, start_date: str = None, end_date: str = None) -> dict:
+    """
+    Downloads one multi-ticker frame and analyzes all symbols in a single pass.
+    """
+    if start_date and end_date:
+        data = yf.download(list(symbols), start=start_date, end=end_date, progress=False, group_by="column")
+    else:
+        data = yf.download(list(symbols), period=period or "1y", progress=False, group_by="column")
+    return analyze_batch(symbols, data)
@@ -0,0 +1,344 @@
+import copy
+import math
+import threading
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+from tools.price_store import get_price_store
+from tools.technical_analysis import (
+    MA_WINDOWS,
+    EMA_SPANS,
+    build_analysis_results,
+    fibonacci_levels,
+)
+
+NAN = float("nan")
+
+
+def _isnan(value) -> bool:
+    return value is None or value != value
+
+
+class _RollingWindow:
+    """
+    Fixed-size window with O(1) mean/std. Sums are kept relative to a shift value and fully
+    recomputed once per window length, which keeps float drift bounded at O(1) amortized cost.
+    A window holding any NaN yields NaN, like pandas rolling(window).
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.nan_count = 0
+        self.shift = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self._since_rebuild = 0
+
+    def copy(self) -> "_RollingWindow":
+        clone = copy.copy(self)
+        clone.values = deque(self.values)
+        return clone
+
+    def push(self, value: float):
+        self.values.append(value)
+        self._add(value, 1)
+        if len(self.values) > self.size:
+            self._add(self.values.popleft(), -1)
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.size:
+            self._rebuild()
+
+    def _add(self, value: float, sign: int):
+        if _isnan(value):
+            self.nan_count += sign
+            return
+        d = value - self.shift
+        self.sum += sign * d
+        self.sumsq += sign * d * d
+
+    def _rebuild(self):
+        valid = [v for v in self.values if not _isnan(v)]
+        self.shift = valid[-1] if valid else 0.0
+        self.sum = math.fsum(v - self.shift for v in valid)
+        self.sumsq = math.fsum((v - self.shift) ** 2 for v in valid)
+        self._since_rebuild = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size and self.nan_count == 0
+
+    def mean(self) -> float:
+        if not self.full:
+            return NAN
+        return self.shift + self.sum / self.size
+
+    def std(self) -> float:
+        if not self.full or self.size < 2:
+            return NAN
+        var = (self.sumsq - self.sum * self.sum / self.size) / (self.size - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class _RollingExtreme:
+    """Rolling min or max over a fixed window using a monotonic deque (amortized O(1))."""
+    def __init__(self, size: int, mode: str):
+        self.size = size
+        self.better = (lambda a, b: a <= b) if mode == "min" else (lambda a, b: a >= b)
+        self.candidates = deque()
+        self.count = 0
+        self.last_nan = -1
+
+    def copy(self) -> "_RollingExtreme":
+        clone = copy.copy(self)
+        clone.candidates = deque(self.candidates)
+        return clone
+
+    def push(self, value: float):
+        index = self.count
+        self.count += 1
+        if _isnan(value):
+            self.last_nan = index
+        else:
+            while self.candidates and self.better(value, self.candidates[-1][1]):
+                self.candidates.pop()
+            self.candidates.append((index, value))
+        while self.candidates and self.candidates[0][0] <= index - self.size:
+            self.candidates.popleft()
+
+    def value(self) -> float:
+        if self.count < self.size or self.last_nan > self.count - 1 - self.size or not self.candidates:
+            return NAN
+        return self.candidates[0][1]
+
+
+class _EMA:
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1)
+        self.value = NAN
+
+    def copy(self) -> "_EMA":
+        return copy.copy(self)
+
+    def push(self, x: float) -> float:
+        if _isnan(self.value):
+            self.value = x
+        elif not _isnan(x):
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingIndicators:
+    """
+    Stateful version of the TechnicalAnalysisTool indicators.
+
+    Seed it with history, then call update(bar) for each new bar; every indicator advances in
+    O(1) and snapshot() returns the same analysis dict as analyze() over the same bars.
+    Statistics and Fibonacci levels cover every bar seen since seeding.
+
+    A bar dated like the last one replaces it, e.g. an intraday bar that keeps changing: the state
+    from before the last bar is kept for that (one copy of the rolling windows per update). A bar
+    older than the last one raises ValueError.
+    """
+    def __init__(self, symbol: str = None):
+        self.symbol = symbol
+        self.bars = 0
+        self.last_date = None
+        self.latest = {}
+        self._prev_close = NAN
+        self._ma = {ma: _RollingWindow(ma) for ma in MA_WINDOWS}
+        self._ema = {ema: _EMA(ema) for ema in EMA_SPANS}
+        self._signal = _EMA(9)
+        self._gain = _RollingWindow(14)
+        self._loss = _RollingWindow(14)
+        self._low_14 = _RollingExtreme(14, "min")
+        self._high_14 = _RollingExtreme(14, "max")
+        self._k = _RollingWindow(3)
+        self._tr = _RollingWindow(14)
+        self._support = _RollingExtreme(20, "min")
+        self._resistance = _RollingExtreme(20, "max")
+        self._volume = _RollingWindow(20)
+        self._obv = NAN
+        self._high = -math.inf
+        self._low = math.inf
+        self._volume_sum = 0.0
+        self._volume_count = 0
+        # Welford untuk volatilitas (std dari pct_change)
+        self._ret_count = 0
+        self._ret_mean = 0.0
+        self._ret_m2 = 0.0
+        # State sebelum bar terakhir, untuk mengganti bar terakhir (tanggal sama) tanpa dihitung dua kali
+        self._before_last = None
+
+    @classmethod
+    def from_history(cls, data: pd.DataFrame, symbol: str = None) -> "StreamingIndicators":
+        state = cls(symbol)
+        rows = list(data[["Open", "High", "Low", "Close", "Volume"]].itertuples())
+        for position, row in enumerate(rows):
+            bar = {"Date": row.Index, "Open": row.Open, "High": row.High,
+                   "Low": row.Low, "Close": row.Close, "Volume": row.Volume}
+            # Salinan state hanya perlu sebelum bar terakhir (bar hari ini bisa belum final)
+            if position == len(rows) - 1:
+                state.update(bar)
+            else:
+                state._apply(bar)
+        return state
+
+    def _saved_state(self) -> dict:
+        # Hanya objek yang dimutasi yang disalin (jendela rolling, EMA); sisanya angka/immutable
+        saved = {}
+        for key, value in self.__dict__.items():
+            if key == "_before_last":
+                continue
+            if isinstance(value, dict):
+                value = {k: v.copy() if hasattr(v, "push") else v for k, v in value.items()}
+            elif hasattr(value, "push"):
+                value = value.copy()
+            saved[key] = value
+        return saved
+
+    def update(self, bar) -> dict:
+        date = bar.get("Date")
+        if date is not None and self.last_date is not None:
+            date, last_date = pd.Timestamp(date), pd.Timestamp(self.last_date)
+            if date < last_date:
+                raise ValueError(f"{self.symbol}: bar for {date.date()} is older than the last bar ({last_date.date()})")
+            if date == last_date and self._before_last is not None:
+                self.__dict__.update(self._before_last)
+        self._before_last = self._saved_state()
+        return self._apply(bar)
+
+    def _apply(self, bar) -> dict:
+        close, high, low = float(bar["Close"]), float(bar["High"]), float(bar["Low"])
+        volume = float(bar.get("Volume", NAN))
+        prev_close = self._prev_close
+        prev_support = self._support.value()
+        prev_resistance = self._resistance.value()
+        latest = {"Close": close, "Volume": volume}
+
+        for ma, window in self._ma.items():
+            window.push(close)
+            latest[f"{ma}_MA"] = window.mean()
+        for ema, average in self._ema.items():
+            latest[f"{ema}_EMA"] = average.push(close)
+
+        macd = latest["12_EMA"] - latest["26_EMA"]
+        signal = self._signal.push(macd)
+        latest["MACD"] = macd
+        latest["Signal_Line"] = signal
+        latest["MACD_Histogram"] = macd - signal
+
+        delta = close - prev_close
+        self._gain.push(delta if delta > 0 else 0.0)
+        self._loss.push(delta if delta < 0 else 0.0)
+        gain, loss = self._gain.mean(), -self._loss.mean()
+        latest["RSI"] = 100 - (100 / (1 + gain / loss)) if loss else (NAN if _isnan(gain) or not gain else 100.0)
+
+        sd_20 = self._ma[20].std()
+        latest["Upper_BB"] = latest["20_MA"] + sd_20 * 2
+        latest["Lower_BB"] = latest["20_MA"] - sd_20 * 2
+
+        self._low_14.push(low)
+        self._high_14.push(high)
+        low_14, high_14 = self._low_14.value(), self._high_14.value()
+        span = high_14 - low_14
+        k = (close - low_14) / span * 100 if span else NAN
+        self._k.push(k)
+        latest["%K"] = k
+        latest["%D"] = self._k.mean()
+
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close)) if not _isnan(prev_close) else NAN
+        self._tr.push(tr)
+        latest["ATR"] = self._tr.mean()
+        if not _isnan(delta) and not _isnan(volume):
+            sign = (delta > 0) - (delta < 0)
+            self._obv = (0.0 if _isnan(self._obv) else self._obv) + sign * volume
+        latest["OBV"] = self._obv
+
+        self._support.push(low)
+        self._resistance.push(high)
+        latest["Support"] = self._support.value()
+        latest["Resistance"] = self._resistance.value()
+        latest["Potential_Breakout"] = (
+            "Bullish Breakout" if close > prev_resistance
+            else "Bearish Breakdown" if close < prev_support
+            else "No Breakout"
+        )
+
+        ma_50, ma_200 = latest["50_MA"], latest["200_MA"]
+        latest["Trend"] = (
+            "Bullish" if close > ma_200 and ma_50 > ma_200
+            else "Bearish" if close < ma_200 and ma_50 < ma_200
+            else "Neutral"
+        )
+
+        self._volume.push(volume)
+        latest["Volume_MA"] = self._volume.mean()
+        latest["Volume_Trend"] = "Above Average" if volume > latest["Volume_MA"] else "Below Average"
+
+        self._high = max(self._high, high)
+        self._low = min(self._low, low)
+        if not _isnan(volume):
+            self._volume_sum += volume
+            self._volume_count += 1
+        if not _isnan(prev_close) and prev_close:
+            ret = close / prev_close - 1
+            self._ret_count += 1
+            step = ret - self._ret_mean
+            self._ret_mean += step / self._ret_count
+            self._ret_m2 += step * (ret - self._ret_mean)
+
+        self._prev_close = close
+        self.bars += 1
+        self.last_date = bar.get("Date", self.last_date)
+        self.latest = latest
+        return self.snapshot()
+
+    def statistics(self) -> dict:
+        volatility = math.sqrt(self._ret_m2 / (self._ret_count - 1)) * (252 ** 0.5) if self._ret_count > 1 else NAN
+        return {
+            'Yearly_High': self._high,
+            'Yearly_Low': self._low,
+            'Average_Volume': self._volume_sum / self._volume_count if self._volume_count else NAN,
+            'Volatility': volatility,
+        }
+
+    def snapshot(self) -> dict:
+        if not self.latest:
+            return {"error": "No data available for symbol."}
+        return build_analysis_results(self.latest, self.statistics(), fibonacci_levels(self._high, self._low))
+
+
+class StreamingIndicatorRegistry:
+    """
+    Keeps StreamingIndicators warm in memory for many symbols (LRU bounded).
+    """
+    def __init__(self, max_symbols: int = 5000, period: str = "1y"):
+        self.max_symbols = max_symbols
+        self.period = period
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> StreamingIndicators:
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is not None:
+                self._states.move_to_end(symbol)
+                return state
+        data = get_price_store().get_history(symbol, period=self.period)
+        state = StreamingIndicators.from_history(data, symbol)
+        with self._lock:
+            self._states[symbol] = state
+            self._states.move_to_end(symbol)
+            while len(self._states) > self.max_symbols:
+                self._states.popitem(last=False)
+        return state
+
+    def update(self, symbol: str, bar) -> dict:
+        state = self.get(symbol)
+        with self._lock:
+            return state.update(bar)
+
+    def drop(self, symbol: str):
+        with self._lock:
+            self._states.pop(symbol, None)
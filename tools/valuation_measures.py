@@ -0,0 +1,334 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+
+import pandas as pd
+import requests
+
+import tracing
+
+KEY_STATISTICS_URL = "https://finance.yahoo.com/quote/{ticker}/key-statistics?p={ticker}"
+DEFAULT_CACHE_DIR = os.getenv("VALUATION_CACHE_DIR", os.path.join(".cache", "valuation"))
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def quarter_column(year: int, quarter: int) -> str:
+    return {
+        1: f"3/31/{year}",
+        2: f"6/30/{year}",
+        3: f"9/30/{year}",
+        4: f"12/31/{year}",
+    }.get(int(quarter))
+
+
+class _KeyStatisticsParser(HTMLParser):
+    """
+    Collects only the valuation measures table (the one whose first column has "Market Cap")
+    and stops looking once it has been read.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.table = None
+        self._rows = None
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.table is not None:
+            return
+        if tag == "table":
+            self._rows = []
+        elif self._rows is not None and tag == "tr":
+            self._row = []
+        elif self._row is not None and tag in ("td", "th"):
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self.table is not None or self._rows is None:
+            return
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self._rows.append(self._row)
+            self._row = None
+        elif tag == "table":
+            if any(row and row[0] == "Market Cap" for row in self._rows):
+                self.table = self._rows
+            self._rows = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_key_statistics(html: str) -> dict:
+    """
+    Parses the Yahoo key-statistics page into {column header: {measure: value}},
+    e.g. {"3/31/2024": {"Market Cap": "2.6T", ...}, "Current": {...}}.
+    """
+    parser = _KeyStatisticsParser()
+    parser.feed(html)
+    if not parser.table:
+        return {}
+    header, rows = parser.table[0], parser.table[1:]
+    columns = {}
+    for position, name in enumerate(header[1:], start=1):
+        columns[name] = {row[0]: row[position] for row in rows if len(row) > position}
+    return columns
+
+
+class BrowserPool:
+    """
+    Bounded pool of headless Chrome drivers, created lazily and reused between calls. A caller
+    waits at most `acquire_timeout` seconds for a driver; a broken driver is quit and its slot
+    freed, so the next waiter launches a replacement.
+    """
+    def __init__(self, max_size: int = 2, page_timeout: int = 5, acquire_timeout: float = 60):
+        self.max_size = max_size
+        self.page_timeout = page_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+        self._all = []
+
+    def _create(self):
+        # Selenium hanya di-import kalau fallback browser benar-benar dipakai
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(30)
+        return driver
+
+    def _checkout(self):
+        """Returns (driver, False) for an idle driver or (None, True) when the caller should launch one."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop(), False
+                if self._created < self.max_size:
+                    self._created += 1
+                    return None, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no browser free after {self.acquire_timeout:.0f}s ({self.max_size} in use)")
+                self._cond.wait(remaining)
+
+    @contextmanager
+    def driver(self):
+        driver, create = self._checkout()
+        if create:
+            try:
+                with tracing.span("browser.launch"):
+                    driver = self._create()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._all.append(driver)
+
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if healthy:
+                with self._cond:
+                    self._idle.append(driver)
+                    self._cond.notify()
+            else:
+                self._discard(driver)
+
+    def _discard(self, driver):
+        with self._cond:
+            self._created -= 1
+            if driver in self._all:
+                self._all.remove(driver)
+            # Slot kosong: waiter berikutnya meluncurkan driver pengganti
+            self._cond.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def fetch_html(self, url: str) -> str:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        with self.driver() as driver:
+            driver.get(url)
+            WebDriverWait(driver, self.page_timeout).until(
+                EC.presence_of_element_located((By.TAG_NAME, "table"))
+            )
+            return driver.page_source
+
+    def close_all(self):
+        with self._cond:
+            drivers, self._all = self._all, []
+            self._created = 0
+            self._idle.clear()
+            self._cond.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+class ValuationMeasuresProvider:
+    """
+    Fetches Yahoo valuation measures per ticker and quarter.
+
+    The page is fetched over plain HTTP and only the valuation table is parsed; a headless browser
+    from a BrowserPool is used only when that fails. Columns of past quarters never change, so
+    they are cached in memory and on disk; the rest is cached in memory for `page_ttl` seconds.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, use_browser_fallback: bool = True,
+                 browser_pool: BrowserPool = None, timeout: float = 10, page_ttl: float = 6 * 60 * 60,
+                 session: requests.Session = None):
+        self.cache_dir = cache_dir
+        self.use_browser_fallback = use_browser_fallback
+        self.browser_pool = browser_pool or BrowserPool()
+        self.timeout = timeout
+        self.page_ttl = page_ttl
+        self.session = session or requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+        self._memory = {}
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, year: int, quarter: int):
+        column = quarter_column(year, quarter)
+        if column is None:
+            return None
+        key = (ticker.upper(), column)
+        with self._lock:
+            if key in self._memory:
+                tracing.add("valuation.cache_hits")
+                return self._memory[key]
+        cached = self._read_disk(*key)
+        if cached is not None:
+            with self._lock:
+                self._memory[key] = cached
+            tracing.add("valuation.cache_hits")
+            return cached
+        tracing.add("valuation.cache_misses")
+
+        columns = self._page_columns(ticker)
+        for name, values in columns.items():
+            self._store(ticker, name, values)
+        return columns.get(column)
+
+    def _page_columns(self, ticker: str) -> dict:
+        now = pd.Timestamp.now()
+        with self._lock:
+            page = self._pages.get(ticker.upper())
+        if page and (now - page[0]).total_seconds() < self.page_ttl:
+            return page[1]
+
+        url = KEY_STATISTICS_URL.format(ticker=ticker)
+        columns = {}
+        try:
+            with tracing.span("http.yahoo_key_statistics", ticker=ticker) as http_span:
+                response = self.session.get(url, timeout=self.timeout)
+                http_span.set("http.response.status_code", response.status_code)
+                http_span.set("http.response.body.size", len(response.content or b""))
+                if response.ok:
+                    columns = parse_key_statistics(response.text)
+                http_span.set("columns", len(columns))
+        except requests.RequestException as e:
+            print(f"[Valuation Measures] HTTP fetch failed for {ticker}: {e}")
+
+        if not columns and self.use_browser_fallback:
+            print(f"[Valuation Measures] Falling back to browser for {ticker}")
+            try:
+                with tracing.span("browser.yahoo_key_statistics", ticker=ticker) as browser_span:
+                    html = self.browser_pool.fetch_html(url)
+                    browser_span.set("html.size", len(html))
+                    columns = parse_key_statistics(html)
+            except Exception as e:
+                print(f"[Valuation Measures] Browser fetch failed for {ticker}: {e}")
+
+        if columns:
+            # Hasil kosong (gagal fetch/parse) tidak disimpan supaya request berikutnya mencoba lagi
+            with self._lock:
+                self._pages[ticker.upper()] = (now, columns)
+        return columns
+
+    def _store(self, ticker: str, column: str, values: dict):
+        try:
+            column_date = pd.Timestamp(column)
+        except (ValueError, TypeError):
+            return  # kolom "Current" berubah setiap hari
+        key = (ticker.upper(), column)
+        with self._lock:
+            self._memory[key] = values
+        if column_date < pd.Timestamp.today().normalize():
+            self._write_disk(*key, values)
+
+    def _disk_path(self, ticker: str, column: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}_{column.replace('/', '-')}.json")
+
+    def _read_disk(self, ticker: str, column: str):
+        path = self._disk_path(ticker, column)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, ticker: str, column: str, values: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._disk_path(ticker, column), "w", encoding="utf-8") as f:
+                json.dump(values, f)
+        except OSError as e:
+            print(f"[Valuation Measures] Could not write cache: {e}")
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_valuation_provider() -> ValuationMeasuresProvider:
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            _default_provider = ValuationMeasuresProvider()
+            atexit.register(_default_provider.browser_pool.close_all)
+        return _default_provider
+
+
+def set_valuation_provider(provider: ValuationMeasuresProvider):
+    global _default_provider
+    with _default_provider_lock:
+        _default_provider = provider
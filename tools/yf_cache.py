@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+
+import tracing
+
+
+# Masa berlaku per field (detik): harga cepat basi, laporan keuangan cukup sehari
+DEFAULT_TTLS = {
+    "info": 15 * 60,
+    "history": 5 * 60,
+    "quarterly_financials": 24 * 60 * 60,
+    "quarterly_balance_sheet": 24 * 60 * 60,
+    "quarterly_cashflow": 24 * 60 * 60,
+    "financials": 24 * 60 * 60,
+    "cashflow": 24 * 60 * 60,
+}
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache where every entry carries its own expiry time.
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (found, value); expired entries are dropped and count as missing."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _handout(value):
+    """Copy of a cached value, so callers adding columns or popping keys never touch the cache."""
+    if isinstance(value, dict):
+        return dict(value)
+    copier = getattr(value, "copy", None)  # DataFrame / Series
+    return copier() if callable(copier) else value
+
+
+class YahooDataCache:
+    """
+    Shared access layer for yfinance Ticker metadata and statements.
+
+    Every field is cached per symbol with its own TTL. Concurrent requests for the same key wait
+    for a single upstream call instead of issuing their own. Hit/miss counters are kept per field.
+    Callers get a copy of the cached DataFrame / info dict and are free to modify it.
+    """
+    def __init__(self, maxsize: int = 1024, ttls: dict = None):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._cache = TTLCache(maxsize)
+        self._stats_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def _count(self, counter: dict, field: str):
+        with self._stats_lock:
+            counter[field] = counter.get(field, 0) + 1
+
+    def get(self, symbol: str, field: str, **kwargs):
+        key = (symbol.strip().upper(), field, tuple(sorted(kwargs.items())))
+        found, value = self._cache.get(key)
+        if found:
+            self._count(self.hits, field)
+            tracing.add("yf.cache_hits")
+            return _handout(value)
+
+        with self._inflight_lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            found, value = self._cache.get(key)
+            if found:
+                self._count(self.hits, field)
+                tracing.add("yf.cache_hits")
+                return _handout(value)
+            self._count(self.misses, field)
+            tracing.add("yf.cache_misses")
+            try:
+                with tracing.span("yf.fetch", symbol=key[0], field=field):
+                    value = self._fetch(symbol, field, **kwargs)
+                self._cache.set(key, value, self.ttls.get(field, 60))
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+        return _handout(value)
+
+    def _fetch(self, symbol: str, field: str, **kwargs):
+        import yfinance as yf  # import berat, baru dimuat saat data pertama diminta
+        ticker = yf.Ticker(symbol)
+        if field == "history":
+            return ticker.history(**kwargs)
+        return getattr(ticker, field)
+
+    def info(self, symbol: str) -> dict:
+        return self.get(symbol, "info")
+
+    def history(self, symbol: str, period: str = "1d", **kwargs):
+        return self.get(symbol, "history", period=period, **kwargs)
+
+    def quarterly_financials(self, symbol: str):
+        return self.get(symbol, "quarterly_financials")
+
+    def quarterly_balance_sheet(self, symbol: str):
+        return self.get(symbol, "quarterly_balance_sheet")
+
+    def quarterly_cashflow(self, symbol: str):
+        return self.get(symbol, "quarterly_cashflow")
+
+    def financials(self, symbol: str):
+        return self.get(symbol, "financials")
+
+    def cashflow(self, symbol: str):
+        return self.get(symbol, "cashflow")
+
+    def invalidate(self, symbol: str, field: str = None):
+        """Drops every cached entry of `symbol` (optionally only `field`), whatever its arguments."""
+        symbol = symbol.strip().upper()
+        self._cache.delete(lambda key: key[0] == symbol and (field is None or key[1] == field))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = dict(self.hits), dict(self.misses)
+        total_hits, total_misses = sum(hits.values()), sum(misses.values())
+        total = total_hits + total_misses
+        return {
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": total_hits / total if total else 0.0,
+            "fields": {
+                field: {"hits": hits.get(field, 0), "misses": misses.get(field, 0)}
+                for field in sorted(set(hits) | set(misses))
+            },
+        }
+
+    @staticmethod
+    def stats_delta(before: dict, after: dict) -> dict:
+        """Difference between two stats() snapshots, e.g. the upstream calls saved by one chat turn."""
+        hits = after["hits"] - before["hits"]
+        misses = after["misses"] - before["misses"]
+        return {"hits": hits, "misses": misses, "upstream_calls_saved": hits}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_yahoo_cache() -> YahooDataCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = YahooDataCache()
+        return _default_cache
+
+
+def set_yahoo_cache(cache: YahooDataCache):
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
@@ -0,0 +1,300 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Tracing mati secara default; saat mati span() hanya mengembalikan objek no-op bersama
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_PATH = os.getenv("TRACE_PATH", ".cache/traces.jsonl")
+# Jumlah trace terakhir yang disimpan di memori untuk panel debug
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "50"))
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+def _attribute(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class Span:
+    """One timed operation. Attributes follow OpenTelemetry naming where one exists."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes",
+                 "status", "message", "_token")
+
+    def __init__(self, name: str, parent: "Span" = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: _attribute(v) for k, v in (attributes or {}).items()}
+        self.status = "UNSET"
+        self.message = ""
+        self._token = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = _attribute(value)
+
+    def add(self, key: str, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error):
+        self.status = "ERROR"
+        self.message = str(error)[:500]
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def record(self) -> dict:
+        """OTLP/JSON-style span record (one JSONL line)."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.message},
+        }
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off: every operation does nothing."""
+    __slots__ = ()
+    trace_id = None
+    span_id = None
+    name = ""
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _SpanScope:
+    __slots__ = ("tracer", "span")
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.span._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None and span.status != "ERROR":
+            span.fail(f"{exc_type.__name__}: {exc}")
+        elif span.status == "UNSET":
+            span.status = "OK"
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # Span ditutup di context lain (mis. generator yang dilanjutkan thread lain)
+            pass
+        self.tracer.finish(span)
+        return False
+
+
+class Tracer:
+    """
+    Collects finished spans per trace. A trace is written to `path` as JSONL (one span per line)
+    when its root span ends and kept in a ring buffer of the last `buffer` traces.
+    Spans that end after their root (background threads) are written on their own.
+    """
+    def __init__(self, enabled: bool = TRACE_ENABLED, path: str = TRACE_PATH, buffer: int = TRACE_BUFFER):
+        self.enabled = enabled
+        self.path = path
+        self._open = {}
+        self._recent = OrderedDict()
+        self._buffer = buffer
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.exported = 0
+
+    def span(self, name: str, attributes: dict = None):
+        if not self.enabled:
+            return NOOP_SPAN
+        return _SpanScope(self, Span(name, _current.get(), attributes))
+
+    def finish(self, span: Span):
+        with self._lock:
+            if span.parent_id is None:
+                spans = self._open.pop(span.trace_id, [])
+                spans.append(span)
+                self._recent[span.trace_id] = spans
+                while len(self._recent) > self._buffer:
+                    self._recent.popitem(last=False)
+            else:
+                spans = self._open.get(span.trace_id)
+                if spans is None and span.trace_id not in self._recent:
+                    spans = self._open[span.trace_id] = []
+                if spans is not None:
+                    spans.append(span)
+                    return
+                self._recent[span.trace_id].append(span)
+                spans = [span]
+        self.export(spans)
+
+    def export(self, spans: list):
+        if not self.path:
+            return
+        lines = "".join(json.dumps(s.record(), default=str) + "\n" for s in spans)
+        try:
+            with self._write_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                self.exported += len(spans)
+        except OSError as e:
+            print(f"[Tracing] export failed: {e}")
+
+    def trace(self, trace_id: str) -> list:
+        """Span records of a finished trace, parents before children."""
+        with self._lock:
+            spans = list(self._recent.get(trace_id, []))
+        return [s.record() for s in sorted(spans, key=lambda s: s.start_ns)]
+
+    def recent(self, limit: int = 10) -> list:
+        with self._lock:
+            trace_ids = list(self._recent)[-limit:]
+        return [self.trace(trace_id) for trace_id in trace_ids]
+
+    def clear(self):
+        with self._lock:
+            self._open.clear()
+            self._recent.clear()
+
+
+_tracer = Tracer()
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    with _tracer_lock:
+        _tracer = tracer
+
+
+def enabled() -> bool:
+    return _tracer.enabled
+
+
+def span(name: str, **attributes):
+    """
+    `with span("yf.fetch", symbol=s) as sp: ...` nests under the current span. Returns the shared
+    no-op span when tracing is off.
+    """
+    tracer = _tracer
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return tracer.span(name, attributes)
+
+
+def current():
+    return _current.get() or NOOP_SPAN
+
+
+def set_attribute(key: str, value):
+    span_ = _current.get()
+    if span_ is not None:
+        span_.set(key, value)
+
+
+def add(key: str, amount=1):
+    span_ = _current.get()
+    if span_ is not None:
+        span_.add(key, amount)
+
+
+def traced(name: str = None):
+    """Decorator: runs the (sync or async) function inside a span named `name`."""
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def wrap(fn):
+    """
+    Binds `fn` to the current span so work handed to a thread pool nests under it. Returns `fn`
+    itself when tracing is off or no span is open.
+    """
+    parent = _current.get()
+    if parent is None:
+        return fn
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return bound
+
+
+def span_tree(records: list) -> list:
+    """[(depth, record)] in depth-first start order, for printing a trace as an indented tree."""
+    children = {}
+    ids = {r["spanId"] for r in records}
+    for record in sorted(records, key=lambda r: r["startTimeUnixNano"]):
+        parent = record["parentSpanId"] if record["parentSpanId"] in ids else ""
+        children.setdefault(parent, []).append(record)
+    rows, stack = [], [(0, r) for r in reversed(children.get("", []))]
+    while stack:
+        depth, record = stack.pop()
+        rows.append((depth, record))
+        stack.extend((depth + 1, child) for child in reversed(children.get(record["spanId"], [])))
+    return rows